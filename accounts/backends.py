@@ -0,0 +1,45 @@
+"""
+Authentication backend that caches the logged-in user.
+
+Every authenticated request loads its user by the pk kept in the session.
+``CachedModelBackend`` keeps that row in the cache for
+``USER_CACHE_TIMEOUT`` seconds instead, and saving or deleting the user
+drops it (see signals.py). A password change saves the user too, and the
+session hash is checked against the password of the user loaded here, so
+the other sessions are still logged out right away.
+
+``update()`` sends no signals, so rows changed with it are served from the
+cache until the entry expires. A user deactivated with
+``User.objects.filter(...).update(is_active=False)`` stays logged in, one
+whose ``is_staff`` or ``is_superuser`` flag changed that way keeps the old
+admin access, and a password set that way doesn't log the other sessions
+out. Call ``invalidate_user()`` for each updated row after such an update.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _key(user_id):
+    return f'auth:user:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = _key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, getattr(settings, 'USER_CACHE_TIMEOUT', 60))
+            return user
+        return user if self.user_can_authenticate(user) else None
+
+
+def invalidate_user(user_id):
+    key = _key(user_id)
+    cache.delete(key)
+    # Once more after commit: a request may have cached the old row while
+    # the writing transaction was still open.
+    transaction.on_commit(lambda: cache.delete(key))
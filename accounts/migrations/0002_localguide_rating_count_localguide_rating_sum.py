@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='localguide',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='localguide',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
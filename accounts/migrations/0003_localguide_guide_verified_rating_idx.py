@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_localguide_rating_count_localguide_rating_sum'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='localguide',
+            index=models.Index(condition=models.Q(('is_verified', True)), fields=['-rating', '-created_at'], name='guide_verified_rating_idx'),
+        ),
+    ]
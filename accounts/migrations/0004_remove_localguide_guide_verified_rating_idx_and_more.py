@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_localguide_guide_verified_rating_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='localguide',
+            name='guide_verified_rating_idx',
+        ),
+        migrations.AddIndex(
+            model_name='localguide',
+            index=models.Index(condition=models.Q(('is_verified', True)), fields=['-rating', '-created_at', '-id'], name='guide_verified_rating_idx'),
+        ),
+    ]
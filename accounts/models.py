@@ -26,8 +26,19 @@ class LocalGuide(models.Model):
     references = models.TextField(blank=True)
     is_verified = models.BooleanField(default=True)  # Auto-verified since admin creates
     rating = models.DecimalField(max_digits=3, decimal_places=1, default=0.0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-rating', '-created_at', '-id'],
+                condition=models.Q(is_verified=True),
+                name='guide_verified_rating_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.region}"
\ No newline at end of file
@@ -0,0 +1,23 @@
+from safar_sathi.autocomplete import SuggestionIndex
+from .models import LocalGuide
+
+
+def guide_name(row):
+    return f"{row['first_name']} {row['last_name']}".strip() or row['username']
+
+
+guide_suggestions = SuggestionIndex(
+    'guide',
+    LocalGuide,
+    fields={
+        'username': 'user__username',
+        'first_name': 'user__first_name',
+        'last_name': 'user__last_name',
+        'region': 'region',
+    },
+    terms=['first_name', 'last_name', 'username', 'region'],
+    label=guide_name,
+    detail=lambda row: row['region'],
+    url_name='accounts:guide_detail',
+    queryset=LocalGuide.objects.filter(is_verified=True),
+)
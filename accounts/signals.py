@@ -0,0 +1,35 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from safar_sathi import images
+from safar_sathi.detail_cache import invalidate_detail
+from .backends import invalidate_user
+from .models import User, LocalGuide
+from .search import guide_suggestions
+
+images.register(LocalGuide, 'guide_photo')
+images.register(User, 'profile_picture')
+guide_suggestions.connect()
+
+
+@receiver(post_save, sender=LocalGuide)
+@receiver(post_delete, sender=LocalGuide)
+def invalidate_guide_page(sender, instance, **kwargs):
+    invalidate_detail(LocalGuide, [instance.pk])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_guide_page(sender, instance, created, update_fields, **kwargs):
+    # Guide pages show the guide's name and contact details. Logins only
+    # touch last_login, which isn't shown anywhere.
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    guide_ids = list(LocalGuide.objects.filter(user=instance).values_list('pk', flat=True))
+    invalidate_detail(LocalGuide, guide_ids)
+    guide_suggestions.refresh(guide_ids)
@@ -1,3 +1,106 @@
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from safar_sathi.testing import QueryBudgetTestMixin, QueryPlanTestMixin, create_catalog, grow_catalog
+from .backends import invalidate_user
+from .models import User
+
+
+class GuideQueryPlanTests(QueryPlanTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+
+    def test_guide_list(self):
+        self.assertIndexedQueries(reverse('accounts:guide_list'))
+
+    def test_guide_detail(self):
+        self.client.force_login(self.catalog['user'])
+        self.assertIndexedQueries(reverse('accounts:guide_detail', args=[self.catalog['guide'].pk]))
+
+
+class GuideDetailCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+
+    def test_invalidated_when_guide_user_changes(self):
+        url = reverse('accounts:guide_detail', args=[self.catalog['guide'].pk])
+        self.client.get(url)
+        # Only the page state lookup for conditional GETs.
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+        user = self.catalog['guide'].user
+        user.first_name = 'Shapla'
+        user.save()
+        self.assertContains(self.client.get(url), 'Shapla')
+
+
+class CachedUserTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+
+    def setUp(self):
+        self.url = reverse('accounts:profile')
+        self.client.force_login(self.catalog['user'])
+        self.client.get(self.url)
+
+    def test_session_and_user_are_cached(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.context['user'], self.catalog['user'])
+
+    def test_invalidated_when_user_changes(self):
+        user = User.objects.get(pk=self.catalog['user'].pk)
+        user.first_name = 'Shapla'
+        user.save()
+        self.assertEqual(self.client.get(self.url).context['user'].first_name, 'Shapla')
+
+    def test_password_change_logs_other_sessions_out(self):
+        user = User.objects.get(pk=self.catalog['user'].pk)
+        user.set_password('changed-password')
+        user.save()
+        self.assertRedirects(
+            self.client.get(self.url), f"{reverse('accounts:login')}?next={self.url}", fetch_redirect_response=False
+        )
+
+
+    def test_update_needs_explicit_invalidation(self):
+        User.objects.filter(pk=self.catalog['user'].pk).update(is_active=False)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        invalidate_user(self.catalog['user'].pk)
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_sessions_from_the_plain_backend_still_work(self):
+        self.client.force_login(self.catalog['user'], backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(self.client.get(self.url).context['user'], self.catalog['user'])
+
+
+class GuideQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = grow_catalog(create_catalog())
+        cls.catalog['user'].is_staff = True
+        cls.catalog['user'].save()
+
+    def test_login_and_signup(self):
+        self.assertWithinQueryBudget(reverse('accounts:login'))
+        self.assertWithinQueryBudget(reverse('accounts:signup'))
+
+    def test_profile(self):
+        self.client.force_login(self.catalog['user'])
+        self.assertWithinQueryBudget(reverse('accounts:profile'))
+
+    def test_guide_list(self):
+        self.assertWithinQueryBudget(reverse('accounts:guide_list'))
+
+    def test_guide_detail(self):
+        self.client.force_login(self.catalog['user'])
+        self.assertWithinQueryBudget(reverse('accounts:guide_detail', args=[self.catalog['guide'].pk]))
+
+    def test_guide_forms(self):
+        self.client.force_login(self.catalog['user'])
+        self.assertWithinQueryBudget(reverse('accounts:guide_create'))
+        self.assertWithinQueryBudget(reverse('accounts:guide_update', args=[self.catalog['guide'].pk]))
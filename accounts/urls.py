@@ -12,6 +12,7 @@ urlpatterns = [
     # Public guide views
     path('guides/', views.GuideListView.as_view(), name='guide_list'),
     path('guides/<int:pk>/', views.guide_detail, name='guide_detail'),
+    path('guides/<int:pk>/async/', views.guide_detail_async, name='guide_detail_async'),
 
     # Admin-only guide management
     path('admin/guides/create/', views.guide_create, name='guide_create'),
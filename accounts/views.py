@@ -1,14 +1,25 @@
+from functools import partial
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.views.generic import ListView
+from django.db.models import Exists, F, OuterRef
+from safar_sathi.budgets import query_budget
+from safar_sathi.conditional import detail_condition, detail_stamp, latest
+from safar_sathi.concurrency import gather
+from safar_sathi.detail_cache import acached_detail, cached_detail
+from safar_sathi.forms import save_edited_fields
+from safar_sathi.pagination import KeysetPaginationMixin
 from django.db import transaction
 from .models import User, LocalGuide
 from .forms import SignUpForm, UserProfileForm, LocalGuideForm
 
 
+@query_budget(9)
 def user_login(request):
     if request.method == 'POST':
         username = request.POST['username']
@@ -22,11 +33,13 @@ def user_login(request):
     return render(request, 'accounts/login.html')
 
 
+@query_budget(3)
 def user_logout(request):
     logout(request)
     return redirect('home')
 
 
+@query_budget(4)
 def user_signup(request):
     if request.method == 'POST':
         form = SignUpForm(request.POST)
@@ -40,6 +53,7 @@ def user_signup(request):
     return render(request, 'accounts/signup.html', {'form': form})
 
 
+@query_budget(5)
 @login_required
 def profile(request):
     if request.method == 'POST':
@@ -54,6 +68,7 @@ def profile(request):
 
 
 # Fixed Admin-only guide management views
+@query_budget(8)
 @staff_member_required
 def guide_create(request):
     if request.method == 'POST':
@@ -87,6 +102,7 @@ def guide_create(request):
     })
 
 
+@query_budget(10)
 @staff_member_required
 def guide_update(request, pk):
     guide = get_object_or_404(LocalGuide, pk=pk)
@@ -104,8 +120,9 @@ def guide_update(request, pk):
                     user.last_name = form.cleaned_data['user_last_name']
                     user.save()
 
-                    # Update guide profile
-                    form.save()
+                    # Update guide profile, leaving the rating columns to
+                    # the review signals.
+                    save_edited_fields(form)
 
                     messages.success(request, f'Guide profile updated for {user.get_full_name()}!')
                     return redirect('accounts:guide_detail', pk=guide.pk)
@@ -120,6 +137,7 @@ def guide_update(request, pk):
     })
 
 
+@query_budget(23)
 @staff_member_required
 def guide_delete(request, pk):
     guide = get_object_or_404(LocalGuide, pk=pk)
@@ -132,36 +150,77 @@ def guide_delete(request, pk):
     return redirect('accounts:guide_list')
 
 # Public views for users
-class GuideListView(ListView):
+class GuideListView(KeysetPaginationMixin, ListView):
     model = LocalGuide
     template_name = 'accounts/guide_list.html'
     context_object_name = 'guides'
     paginate_by = 12
+    query_budget = 4
+    keyset_ordering = ('-rating', '-created_at', '-id')
 
     def get_queryset(self):
-        return LocalGuide.objects.filter(is_verified=True).order_by('-rating', '-created_at')
+        return LocalGuide.objects.filter(is_verified=True).select_related('user')
 
 
-def guide_detail(request, pk):
-    guide = get_object_or_404(LocalGuide, pk=pk)
+def guide_page_state(request):
     from reviews.models import GuideReview
 
-    reviews = GuideReview.objects.filter(
-        guide=guide,
-        is_approved=True
-    ).order_by('-created_at')[:5]
-
-    # Check if user has already reviewed this guide
-    user_has_reviewed = False
+    state = {
+        'first_name': F('user__first_name'),
+        'last_name': F('user__last_name'),
+        'reviews_changed': latest(GuideReview, 'guide', is_approved=True),
+        'review_count': F('rating_count'),
+    }
     if request.user.is_authenticated:
-        user_has_reviewed = GuideReview.objects.filter(
-            guide=guide,
-            user=request.user
-        ).exists()
+        state['user_has_reviewed'] = Exists(
+            GuideReview.objects.filter(guide=OuterRef('pk'), user=request.user)
+        )
+    return state
+
+
+def guide_reads(pk):
+    """The reads behind a guide's page, by pk, to run one after another or concurrently."""
+    from reviews.models import GuideReview
+
+    return [
+        partial(get_object_or_404, LocalGuide.objects.select_related('user'), pk=pk),
+        partial(list, GuideReview.objects.filter(
+            guide_id=pk,
+            is_approved=True
+        ).select_related('user').order_by('-created_at')[:5]),
+    ]
 
-    context = {
+
+def guide_context(guide, reviews):
+    return {
         'guide': guide,
         'reviews': reviews,
-        'user_has_reviewed': user_has_reviewed,
     }
+
+
+@query_budget(5)
+@detail_condition(LocalGuide, guide_page_state)
+def guide_detail(request, pk):
+    def build():
+        return guide_context(*[call() for call in guide_reads(pk)])
+
+    context = dict(cached_detail(LocalGuide, pk, build))
+
+    # Whether the user has already reviewed this guide was read with the
+    # page state (see guide_page_state)
+    state = detail_stamp(request) or {}
+    context['user_has_reviewed'] = state.get('user_has_reviewed', False)
     return render(request, 'accounts/guide_detail.html', context)
+
+
+@query_budget(5)
+@detail_condition(LocalGuide, guide_page_state)
+async def guide_detail_async(request, pk):
+    """``guide_detail`` running its reads concurrently."""
+    async def build():
+        return guide_context(*await gather(*guide_reads(pk)))
+
+    context = dict(await acached_detail(LocalGuide, pk, build))
+    state = detail_stamp(request) or {}
+    context['user_has_reviewed'] = state.get('user_has_reviewed', False)
+    return await sync_to_async(render)(request, 'accounts/guide_detail.html', context)
@@ -0,0 +1,188 @@
+from django.core.files.storage import default_storage
+from django.db.models import Count, Max, OuterRef, Subquery
+
+from accounts.models import LocalGuide
+from bookings.models import Accommodation
+from bookings.search import accommodation_index
+from destinations.models import Destination
+from destinations.search import destination_index
+from reviews.models import AccommodationReview, DestinationReview, GuideReview
+
+REVIEW_FIELDS = {
+    'id': 'id',
+    'rating': 'rating',
+    'content': 'content',
+    'user': 'user__username',
+    'created_at': 'created_at',
+}
+
+
+def file_url(name):
+    return default_storage.url(name) if name else None
+
+
+class Resource:
+    """
+    How one catalog model is exposed through the API.
+
+    ``fields`` maps API field names to ORM lookups; rows are read with
+    ``.values()`` on just the lookups a request asks for, so no model
+    instances are built and unrequested columns and joins are skipped.
+    """
+
+    model = None
+    fields = {}
+    # API fields holding a file name to be returned as a URL.
+    file_fields = ()
+    # Query parameter -> ORM lookup for exact-match filters.
+    filters = {}
+    # ?sort= value -> keyset ordering; the first entry is the default.
+    orderings = {'newest': ('-created_at', '-id')}
+    search_index = None
+    review_model = None
+    review_field = None
+    # Lookups that change whenever a listed row does; list ETags are built
+    # from these. The rating aggregates are written with update(), which
+    # leaves updated_at alone.
+    stamp = ('id', 'updated_at', 'rating_sum', 'rating_count')
+
+    def get_queryset(self):
+        return self.model.objects.all()
+
+    def filter_queryset(self, queryset, params):
+        for param, lookup in self.filters.items():
+            if params.get(param):
+                queryset = queryset.filter(**{lookup: params[param]})
+        if self.search_index is not None and params.get('search'):
+            queryset = self.search_index.filter_queryset(queryset, params['search'])
+        return queryset
+
+    def get_ordering(self, params):
+        if self.search_index is not None and params.get('search'):
+            return ('search_rank', '-id')
+        return self.orderings.get(params.get('sort'), next(iter(self.orderings.values())))
+
+    def serialize(self, row, fields):
+        data = {name: row[self.fields[name]] for name in fields}
+        for name in self.file_fields:
+            if name in data:
+                data[name] = file_url(data[name])
+        return data
+
+    def review_stamp(self):
+        """
+        Annotations that change whenever the approved reviews do, so detail
+        ETags notice new, edited and removed reviews.
+        """
+        reviews = self.review_model.objects.filter(
+            **{self.review_field: OuterRef('pk')}, is_approved=True
+        ).order_by().values(self.review_field)
+        return {
+            'reviews_updated': Subquery(reviews.annotate(latest=Max('updated_at')).values('latest')),
+            'reviews_count': Subquery(reviews.annotate(total=Count('pk')).values('total')),
+        }
+
+    def recent_reviews(self, pk, limit):
+        rows = self.review_model.objects.filter(
+            **{self.review_field: pk}, is_approved=True
+        ).order_by('-created_at').values(*REVIEW_FIELDS.values())[:limit]
+        return [{name: row[lookup] for name, lookup in REVIEW_FIELDS.items()} for row in rows]
+
+
+class DestinationResource(Resource):
+    model = Destination
+    fields = {
+        'id': 'id',
+        'name': 'name',
+        'description': 'description',
+        'category': 'category',
+        'location': 'location',
+        'country': 'country',
+        'latitude': 'latitude',
+        'longitude': 'longitude',
+        'best_time_to_visit': 'best_time_to_visit',
+        'entry_fee': 'entry_fee',
+        'rating': 'rating',
+        'rating_count': 'rating_count',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+    filters = {'category': 'category'}
+    orderings = {
+        'newest': ('-created_at', '-id'),
+        'rating': ('-rating', '-created_at', '-id'),
+    }
+    search_index = destination_index
+    review_model = DestinationReview
+    review_field = 'destination'
+
+
+class AccommodationResource(Resource):
+    model = Accommodation
+    fields = {
+        'id': 'id',
+        'name': 'name',
+        'type': 'accommodation_type',
+        'destination': 'destination_id',
+        'destination_name': 'destination__name',
+        'address': 'address',
+        'latitude': 'latitude',
+        'longitude': 'longitude',
+        'description': 'description',
+        'amenities': 'amenities',
+        'price_per_night': 'price_per_night',
+        'max_guests': 'max_guests',
+        'phone': 'phone',
+        'email': 'email',
+        'website': 'website',
+        'image': 'image',
+        'rating': 'rating',
+        'rating_count': 'rating_count',
+        'check_in_time': 'check_in_time',
+        'check_out_time': 'check_out_time',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+    file_fields = ('image',)
+    filters = {'type': 'accommodation_type', 'destination': 'destination_id'}
+    stamp = (*Resource.stamp, 'destination__updated_at')
+    search_index = accommodation_index
+    review_model = AccommodationReview
+    review_field = 'accommodation'
+
+    def get_queryset(self):
+        return Accommodation.objects.filter(is_available=True)
+
+
+class GuideResource(Resource):
+    model = LocalGuide
+    fields = {
+        'id': 'id',
+        'first_name': 'user__first_name',
+        'last_name': 'user__last_name',
+        'region': 'region',
+        'description': 'description',
+        'experience_years': 'experience_years',
+        'languages': 'languages',
+        'hourly_rate': 'hourly_rate',
+        'photo': 'guide_photo',
+        'rating': 'rating',
+        'rating_count': 'rating_count',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+    file_fields = ('photo',)
+    filters = {'region': 'region__iexact'}
+    # The names live on the user, which has no updated_at.
+    stamp = (*Resource.stamp, 'user__first_name', 'user__last_name')
+    orderings = {'rating': ('-rating', '-created_at', '-id')}
+    review_model = GuideReview
+    review_field = 'guide'
+
+    def get_queryset(self):
+        return LocalGuide.objects.filter(is_verified=True)
+
+
+destinations = DestinationResource()
+accommodations = AccommodationResource()
+guides = GuideResource()
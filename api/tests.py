@@ -0,0 +1,268 @@
+import time
+from unittest import mock
+
+from django.core.signals import request_started
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from safar_sathi import autocomplete
+from safar_sathi.testing import QueryBudgetTestMixin, QueryPlanTestMixin, create_catalog, grow_catalog
+from destinations.models import Destination
+from reviews.models import DestinationReview
+
+
+class CatalogApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = grow_catalog(create_catalog())
+
+    def test_list_pages_through_everything(self):
+        url = reverse('api:destination_list') + '?limit=2&fields=id'
+        seen = []
+        while url:
+            data = self.client.get(url).json()
+            seen.extend(row['id'] for row in data['results'])
+            url = data['next']
+        expected = list(Destination.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_sparse_fields_select_only_those_columns(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('api:accommodation_list'), {
+                'fields': 'name,destination_name', 'destination': self.catalog['destination'].pk,
+            })
+        self.assertEqual(response.json()['results'][0], {
+            'name': 'Sea Pearl Resort', 'destination_name': "Cox's Bazar",
+        })
+        [query] = context.captured_queries
+        self.assertNotIn('"description"', query['sql'])
+        self.assertNotIn('"amenities"', query['sql'])
+
+    def test_filters(self):
+        response = self.client.get(reverse('api:destination_list'), {'category': 'beach', 'fields': 'name'})
+        self.assertEqual(response.json()['results'], [{'name': "Cox's Bazar"}])
+        response = self.client.get(reverse('api:destination_list'), {'search': 'cox', 'fields': 'name'})
+        self.assertEqual(response.json()['results'], [{'name': "Cox's Bazar"}])
+
+    def test_detail_with_recent_reviews(self):
+        destination = self.catalog['destination']
+        data = self.client.get(reverse('api:destination_detail', args=[destination.pk])).json()
+        latest = destination.reviews.filter(is_approved=True).select_related('user').latest('created_at')
+        self.assertEqual(data['name'], destination.name)
+        self.assertEqual(data['reviews'][0]['id'], latest.pk)
+        self.assertEqual(data['reviews'][0]['user'], latest.user.username)
+        self.assertEqual(len(data['reviews']), min(5, destination.reviews.filter(is_approved=True).count()))
+
+    def test_bad_requests(self):
+        response = self.client.get(reverse('api:destination_list'), {'fields': 'name,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', response.json()['detail'])
+        response = self.client.get(reverse('api:destination_list'), {'cursor': 'forged'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('api:destination_detail', args=[0]))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post(reverse('api:destination_list'))
+        self.assertEqual(response.status_code, 405)
+
+
+class CatalogApiETagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+
+    def test_revalidation(self):
+        url = reverse('api:destination_detail', args=[self.catalog['destination'].pk])
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertFalse(etag.startswith('W/'))
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        # The reviews aren't loaded when the client's copy is current.
+        self.assertEqual(len(context), 1)
+
+        destination = Destination.objects.get(pk=self.catalog['destination'].pk)
+        destination.best_time_to_visit = 'All year'
+        destination.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_new_review_changes_detail_etag(self):
+        url = reverse('api:destination_detail', args=[self.catalog['destination'].pk])
+        etag = self.client.get(url, {'fields': 'name,reviews'})['ETag']
+        DestinationReview.objects.create(
+            destination=self.catalog['destination'], user=self.catalog['guide'].user, content='Windy.', rating=3,
+        )
+        response = self.client.get(url, {'fields': 'name,reviews'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['reviews']), 2)
+
+    def test_etag_depends_on_fields(self):
+        url = reverse('api:destination_list')
+        etag = self.client.get(url, {'fields': 'name'})['ETag']
+        self.assertNotEqual(self.client.get(url, {'fields': 'name,rating'})['ETag'], etag)
+        self.assertEqual(self.client.get(url, {'fields': 'name'}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_list_revalidates_across_clock_ticks(self):
+        grow_catalog(self.catalog)
+        url = self.client.get(reverse('api:destination_list'), {'limit': 1}).json()['next']
+        response = self.client.get(url)
+        etag, links = response['ETag'], response.json()['next']
+        # Cursors carry no timestamp, so the page and its links stay the same.
+        with mock.patch('time.time', return_value=time.time() + 5):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            self.assertEqual(self.client.get(url).json()['next'], links)
+
+    def test_rating_change_changes_list_etag(self):
+        url = reverse('api:destination_list')
+        etag = self.client.get(url, {'fields': 'name,rating'})['ETag']
+        DestinationReview.objects.create(
+            destination=self.catalog['destination'], user=self.catalog['guide'].user, content='Windy.', rating=1,
+        )
+        response = self.client.get(url, {'fields': 'name,rating'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class CatalogApiQueryTests(QueryBudgetTestMixin, QueryPlanTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = grow_catalog(create_catalog())
+
+    def test_query_budgets(self):
+        for name, pk in [
+            ('destination', self.catalog['destination'].pk),
+            ('accommodation', self.catalog['accommodation'].pk),
+            ('guide', self.catalog['guide'].pk),
+        ]:
+            self.assertWithinQueryBudget(reverse(f'api:{name}_list'))
+            self.assertWithinQueryBudget(reverse(f'api:{name}_detail', args=[pk]))
+
+    def test_lists_use_indexes(self):
+        self.assertIndexedQueries(reverse('api:destination_list'))
+        self.assertIndexedQueries(reverse('api:destination_list') + '?sort=rating')
+        self.assertIndexedQueries(reverse('api:accommodation_list'))
+        self.assertIndexedQueries(reverse('api:guide_list'))
+
+
+class AutocompleteTests(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+        Destination.objects.create(
+            name='Coxcomb Hill', description='A quiet hill.', category='natural', location='Bandarban',
+            best_time_to_visit='Winter', created_by=cls.catalog['user'], rating=3.0,
+        )
+
+    def setUp(self):
+        for index in autocomplete.registry.values():
+            index.unload()
+
+    tearDown = setUp
+
+    def suggest(self, **params):
+        response = self.client.get(reverse('api:autocomplete'), params)
+        self.assertEqual(response.status_code, 200)
+        return [(result['type'], result['label']) for result in response.json()['results']]
+
+    def test_prefixes_ranked_by_popularity(self):
+        # Cox's Bazar has a five-star review; Coxcomb Hill none.
+        self.assertEqual(self.suggest(q='cox', type='destination'), [
+            ('destination', "Cox's Bazar"), ('destination', 'Coxcomb Hill'),
+        ])
+        self.assertEqual(self.suggest(q='Bandar'), [('destination', 'Coxcomb Hill')])
+        self.assertEqual(self.suggest(q='cox hi'), [('destination', 'Coxcomb Hill')])
+        self.assertEqual(self.suggest(q='sea pe'), [('accommodation', 'Sea Pearl Resort')])
+        self.assertEqual(self.suggest(q='local'), [('guide', 'Local Guide')])
+        self.assertEqual(self.suggest(q='zzz'), [])
+        self.assertEqual(self.suggest(q=''), [])
+
+    def test_result_links(self):
+        response = self.client.get(reverse('api:autocomplete'), {'q': 'pearl'})
+        [result] = response.json()['results']
+        self.assertEqual(result['url'], reverse('bookings:accommodation_detail', args=[self.catalog['accommodation'].pk]))
+        self.assertEqual(result['detail'], "Cox's Bazar")
+
+    def test_no_queries_once_loaded(self):
+        self.suggest(q='cox')
+        self.assertWithinQueryBudget(reverse('api:autocomplete') + '?q=coxs')
+
+    def test_first_request_loads_within_budget(self):
+        self.assertWithinQueryBudget(reverse('api:autocomplete') + '?q=cox')
+
+    def test_warms_once_per_process(self):
+        autocomplete.warm_on_first_request()
+        self.addCleanup(request_started.disconnect, dispatch_uid='autocomplete-warm')
+        with mock.patch.object(autocomplete, 'warm') as warm, mock.patch.object(autocomplete, '_warmed_pid', None):
+            self.client.get(reverse('api:autocomplete'), {'q': 'cox'})
+            self.client.get(reverse('api:autocomplete'), {'q': 'cox'})
+            self.assertEqual(warm.call_count, 1)
+            # A worker forked after that request warms its own indexes.
+            autocomplete._warmed_pid = -1
+            self.client.get(reverse('api:autocomplete'), {'q': 'cox'})
+            self.assertEqual(warm.call_count, 2)
+
+    def test_follows_saves_and_deletes(self):
+        self.suggest(q='cox')
+        destination = self.catalog['destination']
+        destination.name = 'Inani Beach'
+        with self.captureOnCommitCallbacks(execute=True):
+            destination.save()
+        self.assertEqual(self.suggest(q='cox'), [('destination', 'Coxcomb Hill')])
+        self.assertEqual(self.suggest(q='inani', type='destination'), [('destination', 'Inani Beach')])
+        # Accommodations show their destination's name.
+        self.assertEqual(self.client.get(reverse('api:autocomplete'), {'q': 'pearl'}).json()['results'][0]['detail'], 'Inani Beach')
+
+        user = self.catalog['guide'].user
+        user.first_name = 'Rafiq'
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertEqual(self.suggest(q='rafiq'), [('guide', 'Rafiq Guide')])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.catalog['accommodation'].delete()
+        self.assertEqual(self.suggest(q='pearl'), [])
+
+    def test_rolled_back_writes_are_not_indexed(self):
+        self.suggest(q='cox')
+        destination = self.catalog['destination']
+        destination.name = 'Inani Beach'
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(DatabaseError), transaction.atomic():
+                destination.save()
+                Destination.objects.create(
+                    name='Phantom Falls', description='Never committed.', category='natural',
+                    location='Nowhere', best_time_to_visit='Never', created_by=self.catalog['user'],
+                )
+                raise DatabaseError('rolled back')
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.suggest(q='phantom'), [])
+        self.assertEqual(self.suggest(q='inani'), [])
+        self.assertEqual(self.suggest(q='cox', type='destination'), [
+            ('destination', "Cox's Bazar"), ('destination', 'Coxcomb Hill'),
+        ])
+
+    def test_delete_after_matching(self):
+        self.suggest(q='cox')
+        index = autocomplete.registry['destination']
+        search = index.search
+
+        def search_then_delete(*args):
+            found = search(*args)
+            # Another request's delete commits before this one formats.
+            index._remove({self.catalog['destination'].pk})
+            return found
+
+        with mock.patch.object(index, 'search', side_effect=search_then_delete):
+            self.assertEqual(self.suggest(q='cox', type='destination'), [
+                ('destination', "Cox's Bazar"), ('destination', 'Coxcomb Hill'),
+            ])
+        self.assertEqual(self.suggest(q='cox', type='destination'), [('destination', 'Coxcomb Hill')])
+
+    def test_bad_requests(self):
+        url = reverse('api:autocomplete')
+        self.assertEqual(self.client.get(url, {'q': 'cox', 'type': 'hotel'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'q': 'cox', 'limit': 'x'}).status_code, 400)
@@ -0,0 +1,14 @@
+from django.urls import path
+from . import resources, views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('destinations/', views.resource_list, {'resource': resources.destinations}, name='destination_list'),
+    path('destinations/<int:pk>/', views.resource_detail, {'resource': resources.destinations}, name='destination_detail'),
+    path('accommodations/', views.resource_list, {'resource': resources.accommodations}, name='accommodation_list'),
+    path('accommodations/<int:pk>/', views.resource_detail, {'resource': resources.accommodations}, name='accommodation_detail'),
+    path('guides/', views.resource_list, {'resource': resources.guides}, name='guide_list'),
+    path('guides/<int:pk>/', views.resource_detail, {'resource': resources.guides}, name='guide_detail'),
+    path('autocomplete/', views.autocomplete, name='autocomplete'),
+]
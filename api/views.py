@@ -0,0 +1,172 @@
+import hashlib
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_safe
+
+from safar_sathi import autocomplete as suggestions
+from safar_sathi.budgets import query_budget
+from safar_sathi.pagination import KeysetPaginator
+
+API_VERSION = 'v1'
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+RECENT_REVIEWS = 5
+SUGGESTION_LIMIT = 8
+MAX_SUGGESTION_LIMIT = 20
+
+
+class BadRequest(Exception):
+    pass
+
+
+def error_response(status, message):
+    return JsonResponse({'detail': message}, status=status)
+
+
+def parse_fields(resource, params, extra=()):
+    """The API fields listed in ?fields= (all by default), checked against the resource."""
+    available = [*resource.fields, *extra]
+    requested = [name.strip() for name in params.get('fields', '').split(',') if name.strip()]
+    if not requested:
+        return available
+    unknown = [name for name in requested if name not in available]
+    if unknown:
+        raise BadRequest(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(available)}.")
+    # Keep the resource's order so equal field sets share an ETag.
+    return [name for name in available if name in requested]
+
+
+def parse_limit(params):
+    try:
+        limit = int(params.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise BadRequest('limit must be a number.')
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def conditional_json(request, data, etag_source):
+    """
+    Serialize ``data`` with a strong ETag over ``etag_source``.
+
+    ``data`` may be a callable so nothing is built when the client's copy
+    is still current and a 304 is returned.
+    """
+    digest = hashlib.sha1(json.dumps(
+        [API_VERSION, etag_source], cls=DjangoJSONEncoder, sort_keys=True,
+    ).encode()).hexdigest()
+    etag = quote_etag(digest)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        if callable(data):
+            data = data()
+        response = HttpResponse(
+            json.dumps(data, cls=DjangoJSONEncoder), content_type='application/json',
+        )
+    response['ETag'] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+@query_budget(1)
+@require_safe
+def resource_list(request, resource):
+    params = request.GET
+    try:
+        fields = parse_fields(resource, params)
+        limit = parse_limit(params)
+    except BadRequest as e:
+        return error_response(400, str(e))
+
+    try:
+        queryset = resource.filter_queryset(resource.get_queryset(), params)
+    except (ValueError, ValidationError):
+        return error_response(400, 'Invalid filter value.')
+    ordering = resource.get_ordering(params)
+    lookups = {resource.fields[name] for name in fields}
+    lookups.update(term.lstrip('-') for term in ordering)
+    lookups.update(resource.stamp)
+    queryset = queryset.values(*lookups)
+
+    paginator = KeysetPaginator(queryset, limit, ordering)
+    try:
+        page = paginator.page(params.get('cursor'))
+    except Http404:
+        return error_response(400, 'Invalid cursor.')
+
+    def link(cursor):
+        if cursor is None:
+            return None
+        query = params.copy()
+        query['cursor'] = cursor
+        return request.build_absolute_uri('?' + query.urlencode())
+
+    def build():
+        return {
+            'results': [resource.serialize(row, fields) for row in page],
+            'next': link(page.next_cursor),
+            'previous': link(page.previous_cursor),
+        }
+
+    # The page's row stamps and the request decide the response, so a 304
+    # is answered without serializing the rows or signing the cursors.
+    stamps = [[row[lookup] for lookup in resource.stamp] for row in page]
+    etag_source = [sorted(params.lists()), stamps, page.has_next(), page.has_previous()]
+    return conditional_json(request, build, etag_source)
+
+
+@query_budget(2)
+@require_safe
+def resource_detail(request, resource, pk):
+    try:
+        fields = parse_fields(resource, request.GET, extra=['reviews'])
+    except BadRequest as e:
+        return error_response(400, str(e))
+
+    include_reviews = 'reviews' in fields
+    fields = [name for name in fields if name != 'reviews']
+    lookups = {resource.fields[name] for name in fields}
+    queryset = resource.get_queryset().filter(pk=pk)
+    if include_reviews:
+        stamp = resource.review_stamp()
+        queryset = queryset.annotate(**stamp)
+        lookups.update(stamp)
+    row = queryset.values(*lookups).first()
+    if row is None:
+        return error_response(404, 'Not found.')
+
+    item = resource.serialize(row, fields)
+
+    def build():
+        if include_reviews:
+            item['reviews'] = resource.recent_reviews(pk, RECENT_REVIEWS)
+        return item
+
+    stamp = [row['reviews_updated'], row['reviews_count']] if include_reviews else None
+    return conditional_json(request, build, [item, stamp])
+
+
+# Answered from in-process indexes; only the first request in a process
+# reads the database, one query per index.
+@query_budget(3)
+@require_safe
+def autocomplete(request):
+    params = request.GET
+    query = params.get('q', '').strip()
+    kinds = [kind.strip() for kind in params.get('type', '').split(',') if kind.strip()]
+    unknown = [kind for kind in kinds if kind not in suggestions.registry]
+    if unknown:
+        return error_response(400, f"Unknown type(s): {', '.join(unknown)}. Available: {', '.join(suggestions.registry)}.")
+    try:
+        limit = max(1, min(int(params.get('limit', SUGGESTION_LIMIT)), MAX_SUGGESTION_LIMIT))
+    except ValueError:
+        return error_response(400, 'limit must be a number.')
+
+    results = suggestions.suggest(query, kinds, limit) if query else []
+    response = JsonResponse({'query': query, 'results': results})
+    patch_cache_control(response, max_age=60)
+    return response
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Accommodation
+from .availability import cancel
+from .models import Accommodation, Booking, NightInventory
 # Register your models here.
 @admin.register(Accommodation)
 class AccommodationAdmin(admin.ModelAdmin):
@@ -7,3 +8,36 @@ class AccommodationAdmin(admin.ModelAdmin):
     list_filter = ['accommodation_type', 'destination', 'is_available', 'created_at']
     search_fields = ['name', 'destination__name', 'address']
 
+
+@admin.register(Booking)
+class BookingAdmin(admin.ModelAdmin):
+    list_display = ['accommodation', 'user', 'check_in_date', 'check_out_date', 'number_of_guests', 'total_amount', 'booking_status']
+    list_filter = ['booking_status', 'check_in_date']
+    search_fields = ['accommodation__name', 'user__username']
+    raw_id_fields = ['accommodation', 'user']
+    # Bookings hold rooms in NightInventory; they are made and cancelled
+    # through bookings.availability, never edited or deleted here.
+    readonly_fields = [
+        'accommodation', 'user', 'check_in_date', 'check_out_date', 'number_of_guests',
+        'rooms', 'total_amount', 'booking_status', 'created_at', 'updated_at',
+    ]
+    actions = ['cancel_bookings']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def cancel_bookings(self, request, queryset):
+        count = sum(cancel(booking) for booking in queryset.filter(booking_status='confirmed'))
+        self.message_user(request, f"{count} booking(s) cancelled.")
+
+    cancel_bookings.short_description = "Cancel selected bookings"
+
+
+@admin.register(NightInventory)
+class NightInventoryAdmin(admin.ModelAdmin):
+    list_display = ['accommodation', 'date', 'booked_rooms']
+    list_filter = ['date']
+    raw_id_fields = ['accommodation']
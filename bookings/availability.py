@@ -0,0 +1,111 @@
+"""
+Per-night inventory: availability searches and race-free booking.
+
+``NightInventory`` holds one row per accommodation and booked night. A
+search for free rooms is a NOT EXISTS over the stay's nights, which seeks
+into the (accommodation, date) unique index for each candidate. A booking
+raises each night's count with a conditional UPDATE inside a transaction,
+so two requests for the last room can't both succeed.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Value
+
+from safar_sathi.facets import invalidate_facets
+from .models import Accommodation, Booking, NightInventory
+
+
+class BookingUnavailable(Exception):
+    pass
+
+
+def stay_nights(check_in, check_out):
+    return [check_in + timedelta(days=n) for n in range((check_out - check_in).days)]
+
+
+def rooms_for(accommodation, guests):
+    return -(-guests // max(accommodation.max_guests, 1))
+
+
+def rooms_needed_expression(guests):
+    # ceil(guests / max_guests) in integer SQL arithmetic.
+    return (Value(guests) + F('max_guests') - 1) / F('max_guests')
+
+
+def with_availability(queryset, check_in, check_out, guests):
+    """
+    Accommodations in ``queryset`` with enough free rooms for ``guests``
+    on every night from ``check_in`` up to ``check_out``.
+    """
+    queryset = queryset.filter(max_guests__gt=0).alias(
+        rooms_needed=rooms_needed_expression(guests),
+    ).filter(rooms_needed__lte=F('rooms')).alias(
+        # The most rooms a night may already have booked.
+        booked_limit=F('rooms') - F('rooms_needed'),
+    )
+    full_night = NightInventory.objects.filter(
+        accommodation=OuterRef('pk'),
+        date__gte=check_in,
+        date__lt=check_out,
+        booked_rooms__gt=OuterRef('booked_limit'),
+    )
+    return queryset.filter(~Exists(full_night))
+
+
+def book(accommodation, user, check_in, check_out, guests):
+    """
+    Book a stay, or raise ``BookingUnavailable`` if any night is full.
+
+    Every night's row is created if missing, then raised only where enough
+    rooms remain; that check and the increment are a single UPDATE, so
+    concurrent bookings serialize on the rows and none can overbook. If
+    any night is short the whole transaction rolls back.
+    """
+    nights = stay_nights(check_in, check_out)
+    rooms = rooms_for(accommodation, guests)
+    if not nights or rooms > accommodation.rooms:
+        raise BookingUnavailable('This accommodation cannot host that many guests.')
+
+    with transaction.atomic():
+        NightInventory.objects.bulk_create(
+            [NightInventory(accommodation=accommodation, date=night) for night in nights],
+            ignore_conflicts=True,
+        )
+        reserved = NightInventory.objects.filter(
+            accommodation=accommodation,
+            date__gte=check_in,
+            date__lt=check_out,
+            booked_rooms__lte=accommodation.rooms - rooms,
+        ).update(booked_rooms=F('booked_rooms') + rooms)
+        if reserved != len(nights):
+            raise BookingUnavailable('Some of those nights are already fully booked.')
+
+        return Booking.objects.create(
+            accommodation=accommodation,
+            user=user,
+            check_in_date=check_in,
+            check_out_date=check_out,
+            number_of_guests=guests,
+            rooms=rooms,
+            total_amount=accommodation.price_per_night * rooms * len(nights),
+        )
+
+
+def cancel(booking):
+    """Cancel a confirmed booking and free its rooms."""
+    with transaction.atomic():
+        updated = Booking.objects.filter(pk=booking.pk, booking_status='confirmed').update(
+            booking_status='cancelled'
+        )
+        if not updated:
+            return False
+        NightInventory.objects.filter(
+            accommodation_id=booking.accommodation_id,
+            date__gte=booking.check_in_date,
+            date__lt=booking.check_out_date,
+        ).update(booked_rooms=F('booked_rooms') - booking.rooms)
+        # Bookings invalidate them when saved; update() sends no signal.
+        invalidate_facets(Accommodation)
+    booking.booking_status = 'cancelled'
+    return True
@@ -1,6 +1,7 @@
 from django import forms
+from django.utils import timezone
 from crispy_forms.helper import FormHelper
-from crispy_forms.layout import Layout, Field, Submit
+from crispy_forms.layout import Column, Layout, Field, Row, Submit
 from .models import Accommodation
 
 
@@ -8,8 +9,8 @@ class AccommodationForm(forms.ModelForm):
     class Meta:
         model = Accommodation
         fields = [
-            'name', 'accommodation_type', 'destination', 'address', 'description',
-            'amenities', 'price_per_night', 'max_guests', 'phone', 'email',
+            'name', 'accommodation_type', 'destination', 'address', 'latitude', 'longitude', 'description',
+            'amenities', 'price_per_night', 'max_guests', 'rooms', 'phone', 'email',
             'website', 'image', 'check_in_time', 'check_out_time'
         ]
         widgets = {
@@ -28,10 +29,17 @@ class AccommodationForm(forms.ModelForm):
             Field('accommodation_type', css_class='form-select'),
             Field('destination', css_class='form-select'),
             Field('address', css_class='form-control'),
+            Row(
+                Column(Field('latitude', css_class='form-control'), css_class='col-md-6'),
+                Column(Field('longitude', css_class='form-control'), css_class='col-md-6'),
+            ),
             Field('description', css_class='form-control'),
             Field('amenities', css_class='form-control'),
             Field('price_per_night', css_class='form-control'),
-            Field('max_guests', css_class='form-control'),
+            Row(
+                Column(Field('max_guests', css_class='form-control'), css_class='col-md-6'),
+                Column(Field('rooms', css_class='form-control'), css_class='col-md-6'),
+            ),
             Field('phone', css_class='form-control'),
             Field('email', css_class='form-control'),
             Field('website', css_class='form-control'),
@@ -42,3 +50,28 @@ class AccommodationForm(forms.ModelForm):
         )
 
 
+
+
+class AvailabilityForm(forms.Form):
+    MAX_NIGHTS = 30
+
+    check_in = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    check_out = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    guests = forms.IntegerField(min_value=1, max_value=50, initial=1)
+
+    def clean_check_in(self):
+        check_in = self.cleaned_data['check_in']
+        if check_in < timezone.localdate():
+            raise forms.ValidationError('Check-in cannot be in the past.')
+        return check_in
+
+    def clean(self):
+        cleaned_data = super().clean()
+        check_in = cleaned_data.get('check_in')
+        check_out = cleaned_data.get('check_out')
+        if check_in and check_out:
+            if check_out <= check_in:
+                self.add_error('check_out', 'Check-out must be after check-in.')
+            elif (check_out - check_in).days > self.MAX_NIGHTS:
+                self.add_error('check_out', f'Stays are limited to {self.MAX_NIGHTS} nights.')
+        return cleaned_data
@@ -0,0 +1,16 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:55
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='Booking',
+        ),
+    ]
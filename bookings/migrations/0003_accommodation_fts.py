@@ -0,0 +1,39 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:02
+
+from django.db import migrations
+
+CREATE_SQL = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS bookings_accommodation_fts USING fts5('
+    "name, address, destination, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+
+POPULATE_SQL = (
+    'INSERT INTO bookings_accommodation_fts (rowid, name, address, destination) '
+    'SELECT a.id, a.name, a.address, d.name FROM bookings_accommodation a '
+    'INNER JOIN destinations_destination d ON d.id = a.destination_id'
+)
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_SQL)
+    schema_editor.execute(POPULATE_SQL)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS bookings_accommodation_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_delete_booking'),
+        ('destinations', '0002_remove_destination_is_featured_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
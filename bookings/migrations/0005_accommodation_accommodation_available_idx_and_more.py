@@ -0,0 +1,24 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_accommodation_rating_count_accommodation_rating_sum'),
+        ('destinations', '0005_destination_destination_created_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='accommodation',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['-created_at'], name='accommodation_available_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accommodation',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['accommodation_type', '-created_at'], name='accommodation_type_idx'),
+        ),
+    ]
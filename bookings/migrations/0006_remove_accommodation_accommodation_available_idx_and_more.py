@@ -0,0 +1,32 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_accommodation_accommodation_available_idx_and_more'),
+        ('destinations', '0006_remove_destination_destination_created_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='accommodation',
+            name='accommodation_available_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='accommodation',
+            name='accommodation_type_idx',
+        ),
+        migrations.AddIndex(
+            model_name='accommodation',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['-created_at', '-id'], name='accommodation_available_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accommodation',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['accommodation_type', '-created_at', '-id'], name='accommodation_type_idx'),
+        ),
+    ]
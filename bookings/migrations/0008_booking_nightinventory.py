@@ -0,0 +1,81 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_accommodation_coordinates'),
+        ('destinations', '0007_destination_coordinates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Booking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('check_in_date', models.DateField()),
+                ('check_out_date', models.DateField()),
+                ('number_of_guests', models.PositiveIntegerField()),
+                ('rooms', models.PositiveIntegerField(default=1)),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('booking_status', models.CharField(choices=[('confirmed', 'Confirmed'), ('cancelled', 'Cancelled')], default='confirmed', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-check_in_date', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='NightInventory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('booked_rooms', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'night inventory',
+            },
+        ),
+        migrations.AddField(
+            model_name='accommodation',
+            name='rooms',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddIndex(
+            model_name='accommodation',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['destination', '-created_at', '-id'], name='accommodation_destination_idx'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='accommodation',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='bookings.accommodation'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='nightinventory',
+            name='accommodation',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='nights', to='bookings.accommodation'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', '-check_in_date', '-id'], name='booking_user_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.CheckConstraint(condition=models.Q(('check_out_date__gt', models.F('check_in_date'))), name='booking_dates_order'),
+        ),
+        migrations.AddConstraint(
+            model_name='nightinventory',
+            constraint=models.UniqueConstraint(fields=('accommodation', 'date'), name='night_inventory_unique'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.contrib.auth import get_user_model
 from destinations.models import Destination
@@ -24,19 +25,115 @@ class Accommodation(models.Model):
     amenities = models.TextField()
     price_per_night = models.DecimalField(max_digits=10, decimal_places=2)
     max_guests = models.IntegerField(default=2)
+    # Identical units, each sleeping up to max_guests, that can be booked
+    # for the same night.
+    rooms = models.PositiveIntegerField(default=1)
     phone = models.CharField(max_length=20)
     email = models.EmailField()
     website = models.URLField(blank=True)
+    latitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+    # Kept in step with the coordinates for nearby queries (safar_sathi.geo).
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
     image = models.ImageField(upload_to='accommodations/', blank=True)
     is_available = models.BooleanField(default=True)
     rating = models.DecimalField(max_digits=3, decimal_places=1, default=0.0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
     check_in_time = models.TimeField(default='14:00')
     check_out_time = models.TimeField(default='11:00')
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(is_available=True),
+                name='accommodation_available_idx',
+            ),
+            models.Index(
+                fields=['accommodation_type', '-created_at', '-id'],
+                condition=models.Q(is_available=True),
+                name='accommodation_type_idx',
+            ),
+            # Not partial: SQLite only ORs index ranges together (see
+            # safar_sathi.geo.nearby) on indexes without a WHERE clause.
+            models.Index(fields=['geohash'], name='accommodation_geohash_idx'),
+            models.Index(
+                fields=['destination', '-created_at', '-id'],
+                condition=models.Q(is_available=True),
+                name='accommodation_destination_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.name
 
 
+class Booking(models.Model):
+    STATUS_CHOICES = [
+        ('confirmed', 'Confirmed'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    accommodation = models.ForeignKey(Accommodation, on_delete=models.CASCADE, related_name='bookings')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookings')
+    check_in_date = models.DateField()
+    check_out_date = models.DateField()
+    number_of_guests = models.PositiveIntegerField()
+    rooms = models.PositiveIntegerField(default=1)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    booking_status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='confirmed')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-check_in_date', '-id']
+        indexes = [
+            models.Index(fields=['user', '-check_in_date', '-id'], name='booking_user_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(check_out_date__gt=models.F('check_in_date')),
+                name='booking_dates_order',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.accommodation.name}: {self.check_in_date} to {self.check_out_date}"
+
+    @property
+    def nights(self):
+        return (self.check_out_date - self.check_in_date).days
+
+
+class NightInventory(models.Model):
+    """
+    Rooms taken at an accommodation on one night.
+
+    Rows exist only for nights with bookings; a missing row means every
+    room is free. See ``bookings.availability``.
+    """
+
+    # Indexed by night_inventory_unique, which leads with this column.
+    accommodation = models.ForeignKey(
+        Accommodation, on_delete=models.CASCADE, related_name='nights', db_index=False
+    )
+    date = models.DateField()
+    booked_rooms = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'night inventory'
+        constraints = [
+            # Also the index availability searches seek into.
+            models.UniqueConstraint(fields=['accommodation', 'date'], name='night_inventory_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.accommodation_id} on {self.date}: {self.booked_rooms} booked"
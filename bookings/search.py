@@ -0,0 +1,25 @@
+from safar_sathi.autocomplete import SuggestionIndex
+from safar_sathi.search import SearchIndex
+from .models import Accommodation
+
+accommodation_index = SearchIndex(
+    'accommodations',
+    Accommodation,
+    fields={
+        'name': 'name',
+        'address': 'address',
+        'destination': 'destination__name',
+    },
+    weights=[10.0, 3.0, 5.0],
+)
+
+accommodation_suggestions = SuggestionIndex(
+    'accommodation',
+    Accommodation,
+    fields={'name': 'name', 'destination': 'destination__name'},
+    terms=['name'],
+    label=lambda row: row['name'],
+    detail=lambda row: row['destination'],
+    url_name='bookings:accommodation_detail',
+    queryset=Accommodation.objects.filter(is_available=True),
+)
@@ -0,0 +1,55 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from destinations.models import Destination
+from safar_sathi import facets, geo, images
+from safar_sathi.detail_cache import invalidate_detail
+from .models import Accommodation, Booking, NightInventory
+from .search import accommodation_index, accommodation_suggestions
+
+images.register(Accommodation, 'image')
+geo.register(Accommodation)
+# The country facet reads the destination; stay searches facet the rooms
+# still free.
+facets.register(Accommodation, Destination, Booking, NightInventory)
+accommodation_suggestions.connect()
+
+
+@receiver(post_save, sender=Accommodation)
+def index_accommodation(sender, instance, **kwargs):
+    accommodation_index.refresh([instance.pk])
+
+
+@receiver(post_delete, sender=Accommodation)
+def unindex_accommodation(sender, instance, **kwargs):
+    accommodation_index.remove([instance.pk])
+
+
+@receiver(post_save, sender=Destination)
+def reindex_destination_accommodations(sender, instance, created, **kwargs):
+    # The destination name is part of each accommodation's document, and
+    # is shown on each accommodation's page.
+    if not created:
+        accommodation_ids = list(instance.accommodations.values_list('pk', flat=True))
+        accommodation_index.refresh(accommodation_ids)
+        accommodation_suggestions.refresh(accommodation_ids)
+        invalidate_detail(Accommodation, accommodation_ids)
+
+
+@receiver(pre_save, sender=Accommodation)
+def remember_previous_destination(sender, instance, raw, **kwargs):
+    # A move takes the accommodation off its old destination's page too.
+    instance._previous_destination_id = None
+    if instance.pk and not raw:
+        instance._previous_destination_id = sender.objects.filter(
+            pk=instance.pk
+        ).values_list('destination_id', flat=True).first()
+
+
+@receiver(post_save, sender=Accommodation)
+@receiver(post_delete, sender=Accommodation)
+def invalidate_accommodation_pages(sender, instance, **kwargs):
+    invalidate_detail(Accommodation, [instance.pk])
+    invalidate_detail(Destination, [
+        instance.destination_id, getattr(instance, '_previous_destination_id', None),
+    ])
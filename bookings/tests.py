@@ -1,3 +1,258 @@
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.contrib.admin import helpers
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from safar_sathi import geo
+from safar_sathi.testing import QueryBudgetTestMixin, QueryPlanTestMixin, create_catalog, explain, grow_catalog
+from .availability import BookingUnavailable, book, cancel, with_availability
+from .models import Accommodation, Booking, NightInventory
+
+
+class AccommodationQueryPlanTests(QueryPlanTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+
+    def test_accommodation_list(self):
+        self.assertIndexedQueries(reverse('bookings:accommodation_list'), warm=True)
+
+    def test_accommodation_list_by_type(self):
+        self.assertIndexedQueries(reverse('bookings:accommodation_list') + '?type=resort', warm=True)
+
+    def test_accommodation_list_by_stay(self):
+        check_in = timezone.localdate() + timedelta(days=7)
+        self.assertIndexedQueries(reverse('bookings:accommodation_list') + '?' + urlencode({
+            'destination': self.catalog['destination'].pk,
+            'check_in': check_in,
+            'check_out': check_in + timedelta(days=3),
+            'guests': 2,
+        }), warm=True)
+
+    def test_accommodation_detail(self):
+        self.client.force_login(self.catalog['user'])
+        self.assertIndexedQueries(
+            reverse('bookings:accommodation_detail', args=[self.catalog['accommodation'].pk])
+        )
+
+
+class AccommodationQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = grow_catalog(create_catalog())
+        cls.catalog['user'].is_staff = True
+        cls.catalog['user'].save()
+
+    def setUp(self):
+        self.client.force_login(self.catalog['user'])
+
+    def test_accommodation_list(self):
+        self.assertWithinQueryBudget(reverse('bookings:accommodation_list'))
+
+    def test_accommodation_detail(self):
+        self.assertWithinQueryBudget(
+            reverse('bookings:accommodation_detail', args=[self.catalog['accommodation'].pk])
+        )
+
+    def test_accommodation_forms(self):
+        self.assertWithinQueryBudget(reverse('bookings:accommodation_create'))
+        self.assertWithinQueryBudget(
+            reverse('bookings:accommodation_update', args=[self.catalog['accommodation'].pk])
+        )
+
+
+class AccommodationNearbyTests(QueryBudgetTestMixin, TestCase):
+    # Dhaka; stays are placed due north of it, half a kilometre apart.
+    CENTER = (23.8103, 90.4125)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+
+        def stay(name, km, **kwargs):
+            return Accommodation.objects.create(
+                name=name, accommodation_type='hotel', destination=cls.catalog['destination'],
+                address='Dhaka', description='Central.', amenities='Wi-Fi', price_per_night=3000,
+                phone='01700000000', email='stay@example.com', created_by=cls.catalog['user'],
+                latitude=cls.CENTER[0] + km / geo.KM_PER_DEGREE, longitude=cls.CENTER[1], **kwargs
+            )
+
+        cls.nearby = [stay(f'Gulshan Inn {n}', n / 2 + 0.25) for n in reversed(range(14))]
+        cls.nearby.reverse()
+        stay('Closed Inn', 0.2, is_available=False)
+        stay('Savar Lodge', 25)
+
+    def near_url(self, **params):
+        return reverse('bookings:accommodation_list') + '?' + '&'.join(
+            [f'near={self.CENTER[0]},{self.CENTER[1]}'] + [f'{k}={v}' for k, v in params.items()]
+        )
+
+    def test_nearest_first_across_pages(self):
+        response = self.assertWithinQueryBudget(self.near_url())
+        page = list(response.context['accommodations'])
+        self.assertEqual(page, self.nearby[:12])
+        self.assertAlmostEqual(page[0].distance, 0.25, places=2)
+        self.assertContains(response, ' km</span>', count=12)
+
+        response = self.client.get(reverse('bookings:accommodation_list') + '?' + response.context['next_querystring'])
+        self.assertEqual(list(response.context['accommodations']), self.nearby[12:])
+
+    def test_radius(self):
+        response = self.client.get(self.near_url(radius=3))
+        self.assertEqual(list(response.context['accommodations']), self.nearby[:6])
+        self.assertEqual(self.client.get(self.near_url()).context['page_obj'].paginator.count, 14)
+        self.assertEqual(self.client.get(self.near_url(radius=30)).context['page_obj'].paginator.count, 15)
+
+    def test_invalid_point_is_ignored(self):
+        response = self.client.get(reverse('bookings:accommodation_list') + '?near=north')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['near'], '')
+
+    def test_uses_geohash_index(self):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.near_url())
+        [sql] = [q['sql'] for q in context.captured_queries if '"distance"' in q['sql']]
+        plan = explain(sql)
+        self.assertTrue(any('accommodation_geohash_idx' in step for step in plan), plan)
+        self.assertNotIn('SCAN bookings_accommodation', plan)
+
+
+class BookingTests(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+        cls.accommodation = cls.catalog['accommodation']
+        cls.accommodation.max_guests = 2
+        cls.accommodation.rooms = 2
+        cls.accommodation.save()
+        cls.check_in = timezone.localdate() + timedelta(days=10)
+
+    def setUp(self):
+        self.client.force_login(self.catalog['user'])
+
+    def stay(self, first, last):
+        return self.check_in + timedelta(days=first), self.check_in + timedelta(days=last)
+
+    def available(self, first, last, guests):
+        queryset = with_availability(Accommodation.objects.all(), *self.stay(first, last), guests)
+        return self.accommodation in queryset
+
+    def test_book_reserves_each_night(self):
+        booking = book(self.accommodation, self.catalog['user'], *self.stay(0, 3), 3)
+        self.assertEqual(booking.rooms, 2)
+        self.assertEqual(booking.total_amount, self.accommodation.price_per_night * 2 * 3)
+        self.assertEqual(
+            list(NightInventory.objects.order_by('date').values_list('date', 'booked_rooms')),
+            [(self.check_in + timedelta(days=n), 2) for n in range(3)],
+        )
+
+    def test_availability(self):
+        book(self.accommodation, self.catalog['user'], *self.stay(2, 4), 2)
+        self.assertTrue(self.available(0, 2, 4))   # ends as the booking starts
+        self.assertTrue(self.available(4, 6, 4))   # starts as it ends
+        self.assertTrue(self.available(1, 5, 2))   # one room is still free
+        self.assertFalse(self.available(1, 5, 3))
+        self.assertFalse(self.available(0, 1, 5))  # more guests than rooms hold
+
+    def test_full_nights_are_refused(self):
+        book(self.accommodation, self.catalog['user'], *self.stay(0, 2), 4)
+        with self.assertRaises(BookingUnavailable):
+            book(self.accommodation, self.catalog['user'], *self.stay(1, 3), 1)
+        # Nothing of the refused booking is left behind.
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(
+            dict(NightInventory.objects.values_list('date', 'booked_rooms')),
+            {self.check_in: 2, self.check_in + timedelta(days=1): 2},
+        )
+
+    def test_cancel_frees_the_nights(self):
+        booking = book(self.accommodation, self.catalog['user'], *self.stay(0, 2), 4)
+        self.assertTrue(cancel(booking))
+        self.assertFalse(cancel(booking))
+        self.assertEqual(set(NightInventory.objects.values_list('booked_rooms', flat=True)), {0})
+        self.assertTrue(self.available(0, 2, 4))
+
+    def test_list_filters_by_stay(self):
+        book(self.accommodation, self.catalog['user'], *self.stay(0, 2), 4)
+        url = reverse('bookings:accommodation_list')
+        check_in, check_out = self.stay(1, 3)
+        data = {'check_in': check_in, 'check_out': check_out, 'guests': 1}
+        self.assertNotContains(self.client.get(url, data), self.accommodation.name)
+        data['check_in'], data['check_out'] = self.stay(2, 3)
+        response = self.client.get(url, data)
+        self.assertContains(response, self.accommodation.name)
+        self.assertContains(response, reverse('bookings:booking_create', args=[self.accommodation.pk]))
+
+    def test_list_ignores_invalid_stay(self):
+        check_in, check_out = self.stay(2, 1)
+        response = self.client.get(reverse('bookings:accommodation_list'), {
+            'check_in': check_in, 'check_out': check_out, 'guests': 1,
+        })
+        self.assertContains(response, self.accommodation.name)
+        self.assertContains(response, 'Check-out must be after check-in.')
+
+    def test_booking_views(self):
+        check_in, check_out = self.stay(0, 2)
+        url = reverse('bookings:booking_create', args=[self.accommodation.pk])
+        data = {'check_in': check_in, 'check_out': check_out, 'guests': 2}
+        self.assertWithinQueryBudget(url, data)
+        response = self.assertWithinQueryBudget(url, data, method='post', status_code=302)
+        self.assertEqual(response['Location'], reverse('bookings:booking_list'))
+
+        data['guests'] = 4
+        response = self.client.post(url, data)
+        self.assertContains(response, 'already fully booked')
+
+        self.assertWithinQueryBudget(reverse('bookings:booking_list'))
+        booking = Booking.objects.get()
+        self.assertWithinQueryBudget(
+            reverse('bookings:booking_cancel', args=[booking.pk]), method='post', status_code=302
+        )
+        booking.refresh_from_db()
+        self.assertEqual(booking.booking_status, 'cancelled')
+
+    def test_cancel_requires_owner(self):
+        booking = book(self.accommodation, self.catalog['user'], *self.stay(0, 1), 1)
+        other = type(self.catalog['user']).objects.create_user('other', 'other@example.com', 'pass')
+        self.client.force_login(other)
+        response = self.client.post(reverse('bookings:booking_cancel', args=[booking.pk]))
+        self.assertEqual(response.status_code, 404)
+
+
+class BookingAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+        cls.admin = type(cls.catalog['user']).objects.create_superuser(
+            username='admin', email='admin@example.com', password='password'
+        )
+        check_in = timezone.localdate() + timedelta(days=10)
+        cls.booking = book(cls.catalog['accommodation'], cls.catalog['user'], check_in, check_in + timedelta(days=2), 1)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_bookings_cannot_be_added_edited_or_deleted(self):
+        self.assertEqual(self.client.get(reverse('admin:bookings_booking_add')).status_code, 403)
+        self.assertEqual(
+            self.client.get(reverse('admin:bookings_booking_delete', args=[self.booking.pk])).status_code, 403
+        )
+        self.client.post(reverse('admin:bookings_booking_change', args=[self.booking.pk]), {
+            'booking_status': 'cancelled', 'rooms': 0,
+        })
+        self.booking.refresh_from_db()
+        self.assertEqual((self.booking.booking_status, self.booking.rooms), ('confirmed', 1))
+        self.assertEqual(set(NightInventory.objects.values_list('booked_rooms', flat=True)), {1})
 
-# Create your tests here.
+    def test_cancel_action_frees_the_nights(self):
+        self.client.post(reverse('admin:bookings_booking_changelist'), {
+            'action': 'cancel_bookings', helpers.ACTION_CHECKBOX_NAME: [self.booking.pk],
+        })
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.booking_status, 'cancelled')
+        self.assertEqual(set(NightInventory.objects.values_list('booked_rooms', flat=True)), {0})
@@ -7,9 +7,15 @@ urlpatterns = [
     # Accommodation views
     path('accommodations/', views.AccommodationListView.as_view(), name='accommodation_list'),
     path('accommodations/<int:pk>/', views.accommodation_detail, name='accommodation_detail'),
+    path('accommodations/<int:pk>/async/', views.accommodation_detail_async, name='accommodation_detail_async'),
     path('accommodations/create/', views.accommodation_create, name='accommodation_create'),
     path('accommodations/<int:pk>/update/', views.accommodation_update, name='accommodation_update'),
     path('accommodations/<int:pk>/delete/', views.accommodation_delete, name='accommodation_delete'),
 
+    # Booking views
+    path('accommodations/<int:pk>/book/', views.booking_create, name='booking_create'),
+    path('', views.booking_list, name='booking_list'),
+    path('<int:pk>/cancel/', views.booking_cancel, name='booking_cancel'),
+
 
 ]
@@ -1,72 +1,180 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.utils import timezone
+from django.views.decorators.http import require_POST
 from django.views.generic import ListView
-from django.db.models import Q, Avg
+from functools import cached_property, partial
+from safar_sathi import facets, geo
+from safar_sathi.budgets import query_budget
+from safar_sathi.concurrency import gather
+from safar_sathi.detail_cache import acached_detail, cached_detail
+from safar_sathi.forms import save_edited_fields
+from safar_sathi.pagination import KeysetPaginationMixin
+from django.db.models import Avg, Exists, F, OuterRef
+from safar_sathi.conditional import count, detail_condition, detail_stamp, latest
 from datetime import datetime, timedelta
-from .models import Accommodation
-from .forms import AccommodationForm
-from reviews.models import AccommodationReview
+from urllib.parse import urlencode
+from .availability import BookingUnavailable, book, cancel, with_availability
+from .models import Accommodation, Booking
+from .forms import AccommodationForm, AvailabilityForm
+from .search import accommodation_index
+from reviews.models import AccommodationReview, SimilarAccommodation
 
 
 # Create your views here.
-class AccommodationListView(ListView):
+class AccommodationListView(facets.FacetedListMixin, geo.NearbyListMixin, KeysetPaginationMixin, ListView):
     model = Accommodation
     template_name = 'bookings/accommodation_list.html'
     context_object_name = 'accommodations'
     paginate_by = 12
+    # Four on a warm facet cache; five grouped counts when it is cold.
+    query_budget = 9
+    facets = [
+        facets.Facet('type', 'Type', 'accommodation_type', Accommodation.ACCOMMODATION_TYPES),
+        facets.RangeFacet('price', 'Price per night', 'price_per_night', [
+            ('0-2000', 'Under ৳2,000', None, 2000),
+            ('2000-5000', '৳2,000 – ৳5,000', 2000, 5000),
+            ('5000-10000', '৳5,000 – ৳10,000', 5000, 10000),
+            ('10000-', '৳10,000 and up', 10000, None),
+        ]),
+        facets.MinimumFacet('rating', 'Rating', 'rating', [
+            ('4', '4+ stars', 4),
+            ('3', '3+ stars', 3),
+            ('2', '2+ stars', 2),
+        ]),
+        facets.MinimumFacet('sleeps', 'Sleeps', 'max_guests', [
+            ('2', '2+ guests', 2),
+            ('4', '4+ guests', 4),
+            ('6', '6+ guests', 6),
+        ]),
+        facets.Facet('country', 'Country', 'destination__country'),
+    ]
 
     def get_queryset(self):
-        queryset = Accommodation.objects.filter(is_available=True).order_by('-created_at')
+        queryset = Accommodation.objects.filter(is_available=True).select_related('destination')
         search = self.request.GET.get('search')
-        accommodation_type = self.request.GET.get('type')
+        destination = self.request.GET.get('destination', '')
+
+        if destination.isdigit():
+            queryset = queryset.filter(destination_id=destination)
+
+        if self.stay:
+            queryset = with_availability(queryset, *self.stay)
 
         if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) |
-                Q(destination__name__icontains=search) |
-                Q(address__icontains=search)
-            )
+            queryset = accommodation_index.filter_queryset(queryset, search)
+
+        return self.filter_facets(self.filter_nearby(queryset))
 
-        if accommodation_type:
-            queryset = queryset.filter(accommodation_type=accommodation_type)
+    def get_keyset_ordering(self):
+        if self.near:
+            return ('distance', 'id')
+        if self.request.GET.get('search'):
+            return ('search_rank', '-id')
+        return ('-created_at', '-id')
 
-        return queryset
+    @cached_property
+    def availability_form(self):
+        if not (self.request.GET.get('check_in') or self.request.GET.get('check_out')):
+            return AvailabilityForm()
+        return AvailabilityForm(self.request.GET)
+
+    @cached_property
+    def stay(self):
+        """``(check_in, check_out, guests)`` to filter on, or ``None``."""
+        form = self.availability_form
+        if not form.is_bound or not form.is_valid():
+            return None
+        return form.cleaned_data['check_in'], form.cleaned_data['check_out'], form.cleaned_data['guests']
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['accommodation_types'] = Accommodation.ACCOMMODATION_TYPES
+        context['availability_form'] = self.availability_form
+        context['stay_querystring'] = ''
+        if self.stay:
+            context['stay_querystring'] = urlencode({
+                'check_in': self.stay[0], 'check_out': self.stay[1], 'guests': self.stay[2],
+            })
         return context
 
 
-def accommodation_detail(request, pk):
-    accommodation = get_object_or_404(Accommodation, pk=pk)
-    reviews = AccommodationReview.objects.filter(
-        accommodation=accommodation,
-        is_approved=True
-    ).order_by('-created_at')[:10]
-
-    # Allow any authenticated user to review if they haven't already
-    user_can_review = False
-    user_has_reviewed = False
+def accommodation_page_state(request):
+    state = {
+        'destination_changed': F('destination__updated_at'),
+        'reviews_changed': latest(AccommodationReview, 'accommodation', is_approved=True),
+        'review_count': F('rating_count'),
+        'neighbours_changed': latest(SimilarAccommodation, 'source', 'computed_at'),
+        'neighbour_count': count(SimilarAccommodation, 'source'),
+    }
     if request.user.is_authenticated:
-        user_has_reviewed = AccommodationReview.objects.filter(
-            accommodation=accommodation,
-            user=request.user
-        ).exists()
+        state['user_has_reviewed'] = Exists(
+            AccommodationReview.objects.filter(accommodation=OuterRef('pk'), user=request.user)
+        )
+    return state
+
+
+def accommodation_reads(pk):
+    """
+    The reads behind an accommodation's page. All of them are looked up by
+    pk, so they can run one after another or concurrently.
+    """
+    return [
+        partial(get_object_or_404, Accommodation.objects.select_related('destination', 'created_by'), pk=pk),
+        partial(list, AccommodationReview.objects.filter(
+            accommodation_id=pk,
+            is_approved=True
+        ).select_related('user').order_by('-created_at')[:10]),
+        partial(list, SimilarAccommodation.objects.filter(
+            source_id=pk, target__is_available=True
+        ).select_related('target__destination')[:4]),
+    ]
 
-        # Any authenticated user can review if they haven't already
-        user_can_review = not user_has_reviewed
 
-    context = {
+def accommodation_context(accommodation, reviews, neighbours):
+    return {
         'accommodation': accommodation,
         'reviews': reviews,
-        'user_can_review': user_can_review,
+        'similar': [neighbour.target for neighbour in neighbours],
+    }
+
+
+def review_flags(request):
+    # Allow any authenticated user to review if they haven't already; the
+    # check was read with the page state (see accommodation_page_state)
+    state = detail_stamp(request) or {}
+    user_has_reviewed = state.get('user_has_reviewed', False)
+    return {
+        'user_can_review': request.user.is_authenticated and not user_has_reviewed,
         'user_has_reviewed': user_has_reviewed,
     }
+
+
+@query_budget(6)
+@detail_condition(Accommodation, accommodation_page_state)
+def accommodation_detail(request, pk):
+    def build():
+        return accommodation_context(*[call() for call in accommodation_reads(pk)])
+
+    context = dict(cached_detail(Accommodation, pk, build))
+    context.update(review_flags(request))
     return render(request, 'bookings/accommodation_detail.html', context)
 
 
+@query_budget(6)
+@detail_condition(Accommodation, accommodation_page_state)
+async def accommodation_detail_async(request, pk):
+    """``accommodation_detail`` running its reads concurrently."""
+    async def build():
+        return accommodation_context(*await gather(*accommodation_reads(pk)))
+
+    context = dict(await acached_detail(Accommodation, pk, build))
+    context.update(review_flags(request))
+    return await sync_to_async(render)(request, 'bookings/accommodation_detail.html', context)
+
+
+@query_budget(7)
 @login_required
 def accommodation_create(request):
     if not request.user.is_staff:
@@ -87,6 +195,7 @@ def accommodation_create(request):
     return render(request, 'bookings/accommodation_form.html', {'form': form, 'title': 'Add New Accommodation'})
 
 
+@query_budget(9)
 @login_required
 def accommodation_update(request, pk):
     accommodation = get_object_or_404(Accommodation, pk=pk)
@@ -98,7 +207,8 @@ def accommodation_update(request, pk):
     if request.method == 'POST':
         form = AccommodationForm(request.POST, request.FILES, instance=accommodation)
         if form.is_valid():
-            form.save()
+            # The rating columns may have moved since the row was loaded.
+            save_edited_fields(form)
             messages.success(request, 'Accommodation updated successfully!')
             return redirect('bookings:accommodation_detail', pk=accommodation.pk)
     else:
@@ -110,6 +220,7 @@ def accommodation_update(request, pk):
     })
 
 
+@query_budget(13)
 @login_required
 def accommodation_delete(request, pk):
     accommodation = get_object_or_404(Accommodation, pk=pk)
@@ -123,3 +234,57 @@ def accommodation_delete(request, pk):
     accommodation.delete()
     messages.success(request, f'Accommodation "{name}" has been deleted successfully.')
     return redirect('bookings:accommodation_list')
+
+
+@query_budget(8)
+@login_required
+def booking_create(request, pk):
+    accommodation = get_object_or_404(Accommodation, pk=pk, is_available=True)
+
+    if request.method == 'POST':
+        form = AvailabilityForm(request.POST)
+        if form.is_valid():
+            try:
+                booking = book(
+                    accommodation,
+                    request.user,
+                    form.cleaned_data['check_in'],
+                    form.cleaned_data['check_out'],
+                    form.cleaned_data['guests'],
+                )
+            except BookingUnavailable as e:
+                form.add_error(None, str(e))
+            else:
+                messages.success(request, f'Your stay at {accommodation.name} is booked!')
+                return redirect('bookings:booking_list')
+    else:
+        form = AvailabilityForm(initial={
+            key: request.GET[key] for key in ('check_in', 'check_out', 'guests') if request.GET.get(key)
+        })
+
+    return render(request, 'bookings/booking_form.html', {'form': form, 'accommodation': accommodation})
+
+
+@query_budget(3)
+@login_required
+def booking_list(request):
+    # Reads straight off the (user, -check_in_date, -id) index.
+    bookings = Booking.objects.filter(user=request.user).select_related('accommodation__destination')
+
+    return render(request, 'bookings/booking_list.html', {
+        'bookings': bookings,
+        'today': timezone.localdate(),
+    })
+
+
+@query_budget(7)
+@login_required
+@require_POST
+def booking_cancel(request, pk):
+    booking = get_object_or_404(Booking, pk=pk, user=request.user)
+
+    if booking.check_in_date <= timezone.localdate():
+        messages.error(request, 'Bookings can only be cancelled before check-in.')
+    elif cancel(booking):
+        messages.success(request, 'Your booking has been cancelled.')
+    return redirect('bookings:booking_list')
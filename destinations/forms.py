@@ -1,6 +1,6 @@
 from django import forms
 from crispy_forms.helper import FormHelper
-from crispy_forms.layout import Layout, Field, Submit
+from crispy_forms.layout import Column, Layout, Field, Row, Submit
 from .models import Destination, Photo
 
 
@@ -8,7 +8,7 @@ class DestinationForm(forms.ModelForm):
     class Meta:
         model = Destination
         fields = ['name', 'description', 'category', 'location', 'country',
-                  'best_time_to_visit', 'entry_fee']
+                  'latitude', 'longitude', 'best_time_to_visit', 'entry_fee']
         widgets = {
             'description': forms.Textarea(attrs={'rows': 4}),
         }
@@ -22,6 +22,10 @@ class DestinationForm(forms.ModelForm):
             Field('category', css_class='form-control'),
             Field('location', css_class='form-control'),
             Field('country', css_class='form-control'),
+            Row(
+                Column(Field('latitude', css_class='form-control'), css_class='col-md-6'),
+                Column(Field('longitude', css_class='form-control'), css_class='col-md-6'),
+            ),
             Field('best_time_to_visit', css_class='form-control'),
             Field('entry_fee', css_class='form-control'),
             Submit('submit', 'Save Destination', css_class='btn btn-primary')
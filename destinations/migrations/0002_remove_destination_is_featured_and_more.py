@@ -0,0 +1,36 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:55
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destinations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='destination',
+            name='is_featured',
+        ),
+        migrations.RemoveField(
+            model_name='destination',
+            name='latitude',
+        ),
+        migrations.RemoveField(
+            model_name='destination',
+            name='longitude',
+        ),
+        migrations.RemoveField(
+            model_name='destination',
+            name='state',
+        ),
+        migrations.RemoveField(
+            model_name='photo',
+            name='is_primary',
+        ),
+        migrations.DeleteModel(
+            name='DestinationFeature',
+        ),
+    ]
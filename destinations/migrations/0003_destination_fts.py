@@ -0,0 +1,37 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:02
+
+from django.db import migrations
+
+CREATE_SQL = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS destinations_destination_fts USING fts5('
+    "name, location, country, description, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+
+POPULATE_SQL = (
+    'INSERT INTO destinations_destination_fts (rowid, name, location, country, description) '
+    'SELECT id, name, location, country, description FROM destinations_destination'
+)
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_SQL)
+    schema_editor.execute(POPULATE_SQL)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS destinations_destination_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destinations', '0002_remove_destination_is_featured_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destinations', '0003_destination_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='destination',
+            name='rating',
+            field=models.DecimalField(decimal_places=1, default=0.0, max_digits=3),
+        ),
+        migrations.AddField(
+            model_name='destination',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='destination',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destinations', '0005_destination_destination_created_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='destination',
+            name='destination_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='destination',
+            name='destination_category_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='destination',
+            name='destination_rating_idx',
+        ),
+        migrations.AddIndex(
+            model_name='destination',
+            index=models.Index(fields=['-created_at', '-id'], name='destination_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='destination',
+            index=models.Index(fields=['category', '-created_at', '-id'], name='destination_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='destination',
+            index=models.Index(fields=['-rating', '-created_at', '-id'], name='destination_rating_idx'),
+        ),
+    ]
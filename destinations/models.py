@@ -1,3 +1,4 @@
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from accounts.models import User
 
@@ -21,10 +22,29 @@ class Destination(models.Model):
     country = models.CharField(max_length=100, default='Bangladesh')
     best_time_to_visit = models.CharField(max_length=200)
     entry_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
+    latitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+    # Kept in step with the coordinates for nearby queries (safar_sathi.geo).
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
+    rating = models.DecimalField(max_digits=3, decimal_places=1, default=0.0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='destination_created_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], name='destination_category_idx'),
+            models.Index(fields=['-rating', '-created_at', '-id'], name='destination_rating_idx'),
+            models.Index(fields=['geohash'], name='destination_geohash_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -0,0 +1,25 @@
+from safar_sathi.autocomplete import SuggestionIndex
+from safar_sathi.search import SearchIndex
+from .models import Destination
+
+destination_index = SearchIndex(
+    'destinations',
+    Destination,
+    fields={
+        'name': 'name',
+        'location': 'location',
+        'country': 'country',
+        'description': 'description',
+    },
+    weights=[10.0, 5.0, 3.0, 1.0],
+)
+
+destination_suggestions = SuggestionIndex(
+    'destination',
+    Destination,
+    fields={'name': 'name', 'location': 'location', 'country': 'country'},
+    terms=['name', 'location'],
+    label=lambda row: row['name'],
+    detail=lambda row: f"{row['location']}, {row['country']}",
+    url_name='destinations:destination_detail',
+)
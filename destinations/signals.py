@@ -0,0 +1,34 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from safar_sathi import facets, geo, images
+from safar_sathi.detail_cache import invalidate_detail
+from .models import Destination, Photo
+from .search import destination_index, destination_suggestions
+
+images.register(Photo, 'image')
+geo.register(Destination)
+facets.register(Destination)
+destination_suggestions.connect()
+
+
+@receiver(post_save, sender=Destination)
+def index_destination(sender, instance, **kwargs):
+    destination_index.refresh([instance.pk])
+
+
+@receiver(post_delete, sender=Destination)
+def unindex_destination(sender, instance, **kwargs):
+    destination_index.remove([instance.pk])
+
+
+@receiver(post_save, sender=Destination)
+@receiver(post_delete, sender=Destination)
+def invalidate_destination_page(sender, instance, **kwargs):
+    invalidate_detail(Destination, [instance.pk])
+
+
+@receiver(post_save, sender=Photo)
+@receiver(post_delete, sender=Photo)
+def invalidate_photo_destination_page(sender, instance, **kwargs):
+    invalidate_detail(Destination, [instance.destination_id])
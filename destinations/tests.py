@@ -1,3 +1,280 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from safar_sathi.testing import QueryBudgetTestMixin, QueryPlanTestMixin, create_catalog, grow_catalog
+from accounts.models import User
+from bookings.models import Accommodation
+from reviews.models import DestinationReview
+from .models import Destination, Photo
+
+
+class DestinationQueryPlanTests(QueryPlanTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+
+    def test_destination_list(self):
+        self.assertIndexedQueries(reverse('destinations:destination_list'), warm=True)
+
+    def test_destination_list_by_category(self):
+        self.assertIndexedQueries(reverse('destinations:destination_list') + '?category=beach', warm=True)
+
+    def test_destination_list_by_rating(self):
+        self.assertIndexedQueries(reverse('destinations:destination_list') + '?sort=rating', warm=True)
+
+    def test_destination_list_next_page(self):
+        user = self.catalog['user']
+        for i in range(15):
+            Destination.objects.create(
+                name=f'Spot {i}', description='x', category='natural', location='x',
+                best_time_to_visit='x', created_by=user,
+            )
+        response = self.client.get(reverse('destinations:destination_list'))
+        self.assertIndexedQueries(
+            reverse('destinations:destination_list') + '?' + response.context['next_querystring']
+        )
+
+    def test_destination_detail(self):
+        self.client.force_login(self.catalog['user'])
+        self.assertIndexedQueries(
+            reverse('destinations:destination_detail', args=[self.catalog['destination'].pk])
+        )
+
+
+class DestinationQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = grow_catalog(create_catalog())
+
+    def setUp(self):
+        self.client.force_login(self.catalog['user'])
+
+    def test_destination_list(self):
+        self.assertWithinQueryBudget(reverse('destinations:destination_list'))
+        self.assertWithinQueryBudget(reverse('destinations:destination_list') + '?search=tea')
+
+    def test_destination_detail(self):
+        self.assertWithinQueryBudget(
+            reverse('destinations:destination_detail', args=[self.catalog['destination'].pk])
+        )
+
+    def test_destination_forms(self):
+        pk = self.catalog['destination'].pk
+        self.assertWithinQueryBudget(reverse('destinations:destination_create'))
+        self.assertWithinQueryBudget(reverse('destinations:destination_update', args=[pk]))
+        self.assertWithinQueryBudget(reverse('destinations:photo_upload', args=[pk]))
+
+
+class DestinationDetailCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+
+    def setUp(self):
+        self.url = reverse('destinations:destination_detail', args=[self.catalog['destination'].pk])
+        self.client.force_login(self.catalog['user'])
+        self.client.get(self.url)
+
+    def test_cached_page_only_checks_the_user(self):
+        # The session and user come from the cache; only the page state with
+        # the "has reviewed" check is read.
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertContains(response, "Cox&#x27;s Bazar")
+        self.assertTrue(response.context['user_has_reviewed'])
+
+    def test_invalidated_by_related_rows(self):
+        destination = Destination.objects.get(pk=self.catalog['destination'].pk)
+        destination.name = 'Inani Beach'
+        destination.save()
+        self.assertContains(self.client.get(self.url), 'Inani Beach')
+
+        Photo.objects.create(destination=destination, image='destinations/dune.jpg', uploaded_by=self.catalog['user'])
+        self.assertEqual(len(self.client.get(self.url).context['photos']), 2)
+
+        accommodation = self.catalog['accommodation']
+        accommodation.name = 'Mermaid Eco Resort'
+        accommodation.save()
+        self.assertContains(self.client.get(self.url), 'Mermaid Eco Resort')
+
+        reviewer = User.objects.create_user(username='second', password='password')
+        DestinationReview.objects.create(destination=destination, user=reviewer, content='Windy.', rating=3)
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Windy.')
+        self.assertEqual(response.context['destination'].rating_count, 2)
+
+    def test_accommodation_moved_away(self):
+        other = Destination.objects.create(
+            name='Kuakata', description='Sunrise and sunset.', category='natural', location='Barishal',
+            best_time_to_visit='Winter', created_by=self.catalog['user'],
+        )
+        accommodation = self.catalog['accommodation']
+        accommodation.destination = other
+        accommodation.save()
+        self.assertEqual(self.client.get(self.url).context['accommodations'], [])
+
+
+class DestinationConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+
+    def setUp(self):
+        self.url = reverse('destinations:destination_detail', args=[self.catalog['destination'].pk])
+
+    def assertNotModified(self, etag):
+        with self.assertTemplateNotUsed('destinations/destination_detail.html'):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def assertModified(self, etag):
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_anonymous_revalidation(self):
+        response = self.client.get(self.url)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            self.assertNotModified(response['ETag'])
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since_sees_deletes_and_deploys(self):
+        photo = Photo.objects.create(
+            destination=self.catalog['destination'], image='destinations/dune.jpg', uploaded_by=self.catalog['user'],
+        )
+        modified = self.client.get(self.url)['Last-Modified']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=modified).status_code, 304)
+
+        # Leaves every remaining updated_at as it was.
+        photo.delete()
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=modified)
+        self.assertEqual(response.status_code, 200)
+        modified = response['Last-Modified']
+
+        with patch('safar_sathi.conditional._templates_version', return_value='deployed'):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=modified).status_code, 200)
+
+    def test_related_changes(self):
+        etag = self.client.get(self.url)['ETag']
+        destination = self.catalog['destination']
+
+        photo = Photo.objects.create(destination=destination, image='destinations/dune.jpg', uploaded_by=self.catalog['user'])
+        etag = self.assertModified(etag)
+        photo.delete()
+        etag = self.assertModified(etag)
+
+        accommodation = self.catalog['accommodation']
+        accommodation.name = 'Mermaid Eco Resort'
+        accommodation.save()
+        etag = self.assertModified(etag)
+
+        review = DestinationReview.objects.create(
+            destination=destination, user=self.catalog['guide'].user, content='Windy.', rating=3,
+        )
+        etag = self.assertModified(etag)
+        review.delete()
+        etag = self.assertModified(etag)
+        self.assertNotModified(etag)
+
+    def test_per_viewer(self):
+        anonymous = self.client.get(self.url)['ETag']
+        self.client.force_login(self.catalog['guide'].user)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=anonymous)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+        self.assertNotModified(response['ETag'])
+
+        # The "write a review" button goes away once the viewer reviews,
+        # even while the review awaits approval.
+        DestinationReview.objects.create(
+            destination=self.catalog['destination'], user=self.catalog['guide'].user,
+            content='Windy.', rating=3, is_approved=False,
+        )
+        self.assertModified(response['ETag'])
+
+    def test_pending_messages_are_rendered(self):
+        user = self.catalog['user']
+        self.client.force_login(user)
+        etag = self.client.get(self.url)['ETag']
+        # Queue a flash message without showing it.
+        self.client.post(reverse('accounts:profile'), {
+            'first_name': user.first_name, 'last_name': user.last_name, 'email': user.email,
+        })
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Your profile has been updated!')
+
+
+class DestinationPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = create_catalog()['user']
+        for i in range(30):
+            Destination.objects.create(
+                name=f'Spot {i}', description='x', category='natural', location='x',
+                best_time_to_visit='x', created_by=user,
+            )
+        # Ties on created_at must still page deterministically by id.
+        Destination.objects.filter(name__startswith='Spot 1').update(created_at=timezone.now())
+
+    def test_walk_forward_and_back(self):
+        url = reverse('destinations:destination_list')
+        expected = list(Destination.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+        pages = []
+        response = self.client.get(url)
+        while True:
+            pages.append([d.pk for d in response.context['destinations']])
+            if not response.context['next_querystring']:
+                break
+            response = self.client.get(url + '?' + response.context['next_querystring'])
+
+        self.assertEqual([pk for page in pages for pk in page], expected)
+        self.assertEqual(response.context['page_obj'].paginator.count, len(expected))
+
+        response = self.client.get(url + '?' + response.context['previous_querystring'])
+        self.assertEqual([d.pk for d in response.context['destinations']], pages[-2])
+
+    def test_pages_run_no_count(self):
+        cache.clear()
+        url = reverse('destinations:destination_list')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+            self.client.get(url + '?' + response.context['next_querystring'])
+        self.assertFalse([query for query in context.captured_queries if '"__count"' in query['sql']])
+
+    def test_tampered_cursor(self):
+        response = self.client.get(reverse('destinations:destination_list') + '?cursor=bogus')
+        self.assertEqual(response.status_code, 404)
+
+
+class DestinationNearbyAccommodationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+        destination = cls.catalog['destination']
+        destination.latitude, destination.longitude = 21.4272, 92.0058
+        destination.save()
+        for name, latitude in [('Inani Resort', 21.2254), ('Kolatoli Hotel', 21.4201), ('Marine Drive Inn', 21.3300)]:
+            Accommodation.objects.create(
+                name=name, accommodation_type='hotel', destination=destination, address='Beach Road',
+                description='Sea view.', amenities='Wi-Fi', price_per_night=4000, phone='01700000000',
+                email='stay@example.com', created_by=cls.catalog['user'], latitude=latitude, longitude=92.0058,
+            )
 
-# Create your tests here.
+    def test_nearest_first(self):
+        response = self.client.get(
+            reverse('destinations:destination_detail', args=[self.catalog['destination'].pk])
+        )
+        names = [accommodation.name for accommodation in response.context['accommodations']]
+        # The catalog's resort has no coordinates, so it comes last.
+        self.assertEqual(names, ['Kolatoli Hotel', 'Marine Drive Inn', 'Inani Resort', 'Sea Pearl Resort'])
+        self.assertContains(response, '0.8 km')
+        self.assertContains(response, '?near=21.4272,92.0058')
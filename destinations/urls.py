@@ -9,6 +9,7 @@ urlpatterns = [
 
     # Detail view
     path('<int:pk>/', views.destination_detail, name='destination_detail'),
+    path('<int:pk>/async/', views.destination_detail_async, name='destination_detail_async'),
 
     # Create view
     path('create/', views.destination_create, name='destination_create'),
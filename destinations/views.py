@@ -1,72 +1,161 @@
-from django.shortcuts import render, get_object_or_404, redirect
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, get_object_or_404, redirect, aget_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.views.generic import ListView
-from django.db.models import Q
+from django.db.models import Exists, F, OuterRef
+from safar_sathi import facets, geo
+from safar_sathi.budgets import query_budget
+from safar_sathi.conditional import count, detail_condition, detail_stamp, latest
+from safar_sathi.concurrency import gather
+from safar_sathi.detail_cache import acached_detail, cached_detail
+from safar_sathi.forms import save_edited_fields
+from safar_sathi.pagination import KeysetPaginationMixin
 from .models import Destination, Photo
 from .forms import DestinationForm, PhotoForm
-from reviews.models import DestinationReview
+from .search import destination_index
+from reviews.models import DestinationReview, SimilarDestination
+from bookings.models import Accommodation
 
 
-class DestinationListView(ListView):
+class DestinationListView(facets.FacetedListMixin, geo.NearbyListMixin, KeysetPaginationMixin, ListView):
     model = Destination
     template_name = 'destinations/destination_list.html'
     context_object_name = 'destinations'
     paginate_by = 12
+    # Five on a warm facet cache; four grouped counts when it is cold.
+    query_budget = 9
+    SORT_CHOICES = [
+        ('newest', 'Newest'),
+        ('rating', 'Top Rated'),
+    ]
+    facets = [
+        facets.Facet('category', 'Category', 'category', Destination.CATEGORY_CHOICES),
+        facets.RangeFacet('fee', 'Entry fee', 'entry_fee', [
+            ('free', 'Free', None, 1),
+            ('1-100', 'Under ৳100', 1, 100),
+            ('100-500', '৳100 – ৳500', 100, 500),
+            ('500-', '৳500 and up', 500, None),
+        ]),
+        facets.MinimumFacet('rating', 'Rating', 'rating', [
+            ('4', '4+ stars', 4),
+            ('3', '3+ stars', 3),
+            ('2', '2+ stars', 2),
+        ]),
+        facets.Facet('country', 'Country', 'country'),
+    ]
 
     def get_queryset(self):
-        queryset = Destination.objects.all().order_by('-created_at')
+        queryset = Destination.objects.prefetch_related('photos')
         search = self.request.GET.get('search')
-        category = self.request.GET.get('category')
 
         if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) |
-                Q(location__icontains=search) |
-                Q(country__icontains=search) |
-                Q(description__icontains=search)
-            )
+            queryset = destination_index.filter_queryset(queryset, search)
 
-        if category:
-            queryset = queryset.filter(category=category)
+        return self.filter_facets(self.filter_nearby(queryset))
 
-        return queryset
+    def get_keyset_ordering(self):
+        if self.near:
+            return ('distance', 'id')
+        if self.request.GET.get('search'):
+            return ('search_rank', '-id')
+        if self.request.GET.get('sort') == 'rating':
+            return ('-rating', '-created_at', '-id')
+        return ('-created_at', '-id')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['categories'] = Destination.CATEGORY_CHOICES
         context['search'] = self.request.GET.get('search', '')
-        context['selected_category'] = self.request.GET.get('category', '')
+        context['sort_choices'] = self.SORT_CHOICES
+        context['selected_sort'] = self.request.GET.get('sort', 'newest')
         return context
 
 
-def destination_detail(request, pk):
-    destination = get_object_or_404(Destination, pk=pk)
-    photos = destination.photos.all()
-    accommodations = destination.accommodations.filter(is_available=True)[:6]
-    reviews = DestinationReview.objects.filter(
-        destination=destination,
-        is_approved=True
-    ).order_by('-created_at')[:5]
-
-    # Check if user has already reviewed this destination
-    user_has_reviewed = False
+def destination_page_state(request):
+    state = {
+        'photos_changed': latest(Photo, 'destination', 'uploaded_at'),
+        'photo_count': count(Photo, 'destination'),
+        'accommodations_changed': latest(Accommodation, 'destination', is_available=True),
+        'accommodation_count': count(Accommodation, 'destination', is_available=True),
+        'reviews_changed': latest(DestinationReview, 'destination', is_approved=True),
+        'review_count': F('rating_count'),
+        'neighbours_changed': latest(SimilarDestination, 'source', 'computed_at'),
+        'neighbour_count': count(SimilarDestination, 'source'),
+    }
     if request.user.is_authenticated:
-        user_has_reviewed = DestinationReview.objects.filter(
+        state['user_has_reviewed'] = Exists(
+            DestinationReview.objects.filter(destination=OuterRef('pk'), user=request.user)
+        )
+    return state
+
+
+def destination_related(destination):
+    """
+    The independent reads for the rest of a destination's page, as calls
+    that can run one after another or concurrently.
+    """
+    accommodations = destination.accommodations.filter(is_available=True)
+    if destination.latitude is not None and destination.longitude is not None:
+        # Closest first; stays without coordinates go last.
+        accommodations = accommodations.annotate(
+            distance=geo.distance_expression(destination.latitude, destination.longitude)
+        ).order_by(F('distance').asc(nulls_last=True), 'id')
+    return [
+        partial(list, destination.photos.all()),
+        partial(list, accommodations[:6]),
+        partial(list, DestinationReview.objects.filter(
             destination=destination,
-            user=request.user
-        ).exists()
+            is_approved=True
+        ).select_related('user').order_by('-created_at')[:5]),
+        partial(list, destination.neighbours.select_related('target')[:4]),
+    ]
+
 
-    context = {
+def destination_context(destination, photos, accommodations, reviews, neighbours):
+    return {
         'destination': destination,
         'photos': photos,
         'accommodations': accommodations,
         'reviews': reviews,
-        'user_has_reviewed': user_has_reviewed,
+        'similar': [neighbour.target for neighbour in neighbours],
     }
+
+
+@query_budget(8)
+@detail_condition(Destination, destination_page_state)
+def destination_detail(request, pk):
+    # Everything but the "has reviewed" check is the same for every visitor
+    # and is cached until one of these rows changes (see signals.py).
+    def build():
+        destination = get_object_or_404(Destination.objects.select_related('created_by'), pk=pk)
+        return destination_context(destination, *[call() for call in destination_related(destination)])
+
+    context = dict(cached_detail(Destination, pk, build))
+
+    # Whether the user has already reviewed this destination was read with
+    # the page state (see destination_page_state)
+    state = detail_stamp(request) or {}
+    context['user_has_reviewed'] = state.get('user_has_reviewed', False)
     return render(request, 'destinations/destination_detail.html', context)
 
 
+@query_budget(8)
+@detail_condition(Destination, destination_page_state)
+async def destination_detail_async(request, pk):
+    """``destination_detail`` reading the destination's related rows concurrently."""
+    async def build():
+        destination = await aget_object_or_404(Destination.objects.select_related('created_by'), pk=pk)
+        return destination_context(destination, *await gather(*destination_related(destination)))
+
+    context = dict(await acached_detail(Destination, pk, build))
+    state = detail_stamp(request) or {}
+    context['user_has_reviewed'] = state.get('user_has_reviewed', False)
+    return await sync_to_async(render)(request, 'destinations/destination_detail.html', context)
+
+
+@query_budget(5)
 @login_required
 def destination_create(request):
     if request.method == 'POST':
@@ -83,6 +172,7 @@ def destination_create(request):
     return render(request, 'destinations/destination_form.html', {'form': form, 'title': 'Add New Destination'})
 
 
+@query_budget(9)
 @login_required
 def destination_update(request, pk):
     destination = get_object_or_404(Destination, pk=pk)
@@ -94,7 +184,8 @@ def destination_update(request, pk):
     if request.method == 'POST':
         form = DestinationForm(request.POST, instance=destination)
         if form.is_valid():
-            form.save()
+            # The rating columns may have moved since the row was loaded.
+            save_edited_fields(form)
             messages.success(request, 'Destination updated successfully!')
             return redirect('destinations:destination_detail', pk=destination.pk)
     else:
@@ -103,6 +194,7 @@ def destination_update(request, pk):
     return render(request, 'destinations/destination_form.html', {'form': form, 'title': 'Update Destination'})
 
 
+@query_budget(15)
 @login_required
 def destination_delete(request, pk):
     destination = get_object_or_404(Destination, pk=pk)
@@ -118,6 +210,7 @@ def destination_delete(request, pk):
     return redirect('destinations:destination_list')
 
 
+@query_budget(5)
 @login_required
 def photo_upload(request, destination_pk):
     destination = get_object_or_404(Destination, pk=destination_pk)
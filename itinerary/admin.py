@@ -8,7 +8,7 @@ class ItineraryItemInline(admin.TabularInline):
 
 @admin.register(Itinerary)
 class ItineraryAdmin(admin.ModelAdmin):
-    list_display = ['title', 'user', 'start_date', 'end_date', 'status', 'created_at']
+    list_display = ['title', 'user', 'start_date', 'end_date', 'status', 'item_count', 'total_cost', 'created_at']
     list_filter = ['status', 'start_date', 'created_at']
     search_fields = ['title', 'user__username', 'description']
     inlines = [ItineraryItemInline]
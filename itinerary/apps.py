@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class ItineraryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'itinerary'
\ No newline at end of file
+    name = 'itinerary'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -95,6 +95,14 @@ class ItineraryItemForm(forms.ModelForm):
         if start_date and end_date and start_date > end_date:
             raise forms.ValidationError("End date must be after start date.")
 
+        # The date inputs' min/max are only a hint to the browser.
+        if self.itinerary:
+            trip_start, trip_end = self.itinerary.start_date, self.itinerary.end_date
+            for field in ('start_date', 'end_date'):
+                date = cleaned_data.get(field)
+                if date and not trip_start <= date <= trip_end:
+                    self.add_error(field, f"Pick a date between {trip_start:%b %d, %Y} and {trip_end:%b %d, %Y}.")
+
         return cleaned_data
 
 
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('itinerary', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='itineraryitem',
+            options={'ordering': ['start_date', 'order']},
+        ),
+        migrations.RemoveField(
+            model_name='itinerary',
+            name='is_public',
+        ),
+        migrations.RemoveField(
+            model_name='itineraryitem',
+            name='description',
+        ),
+        migrations.RemoveField(
+            model_name='itineraryitem',
+            name='end_time',
+        ),
+        migrations.RemoveField(
+            model_name='itineraryitem',
+            name='is_booked',
+        ),
+        migrations.RemoveField(
+            model_name='itineraryitem',
+            name='location',
+        ),
+        migrations.RemoveField(
+            model_name='itineraryitem',
+            name='start_time',
+        ),
+        migrations.AlterField(
+            model_name='itineraryitem',
+            name='item_type',
+            field=models.CharField(choices=[('destination', 'Destination Visit'), ('accommodation', 'Accommodation')], default='destination', max_length=20),
+        ),
+        migrations.DeleteModel(
+            name='ItineraryCollaborator',
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_accommodation_accommodation_available_idx_and_more'),
+        ('destinations', '0005_destination_destination_created_idx_and_more'),
+        ('itinerary', '0002_alter_itineraryitem_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='itinerary',
+            index=models.Index(fields=['user', '-created_at'], name='itinerary_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itineraryitem',
+            index=models.Index(fields=['itinerary', 'start_date', 'order'], name='itineraryitem_schedule_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itineraryitem',
+            index=models.Index(fields=['itinerary', 'destination'], name='itineraryitem_destination_idx'),
+        ),
+    ]
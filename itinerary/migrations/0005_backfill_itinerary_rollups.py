@@ -0,0 +1,32 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:24
+
+from django.db import migrations
+from django.db.models import Count, DecimalField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill(apps, schema_editor):
+    Itinerary = apps.get_model('itinerary', 'Itinerary')
+    ItineraryItem = apps.get_model('itinerary', 'ItineraryItem')
+    items = ItineraryItem.objects.filter(itinerary=OuterRef('pk')).order_by().values('itinerary')
+
+    def total(aggregate, default=Value(0)):
+        return Coalesce(Subquery(items.annotate(total=aggregate).values('total')), default)
+
+    Itinerary.objects.update(
+        item_count=total(Count('pk')),
+        total_cost=total(Sum('estimated_cost'), Value(0, output_field=DecimalField())),
+        destination_count=total(Count('destination', distinct=True, filter=Q(item_type='destination'))),
+        accommodation_count=total(Count('pk', filter=Q(item_type='accommodation'))),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('itinerary', '0004_itinerary_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
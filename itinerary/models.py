@@ -21,12 +21,20 @@ class Itinerary(models.Model):
     start_date = models.DateField()
     end_date = models.DateField()
     status = models.CharField(max_length=20, choices=TRIP_STATUS_CHOICES, default='planning')
+    # Rollups of the items, kept current by itinerary.signals.
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+    total_cost = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    destination_count = models.PositiveIntegerField(default=0, editable=False)
+    accommodation_count = models.PositiveIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = 'Itineraries'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='itinerary_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.user.username}"
@@ -37,7 +45,7 @@ class Itinerary(models.Model):
 
     @property
     def total_destinations(self):
-        return self.itinerary_items.values('destination').distinct().count()
+        return self.destination_count
 
 
 class ItineraryItem(models.Model):
@@ -62,6 +70,10 @@ class ItineraryItem(models.Model):
 
     class Meta:
         ordering = ['start_date', 'order']
+        indexes = [
+            models.Index(fields=['itinerary', 'start_date', 'order'], name='itineraryitem_schedule_idx'),
+            models.Index(fields=['itinerary', 'destination'], name='itineraryitem_destination_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.itinerary.title}"
@@ -0,0 +1,59 @@
+from django.db.models import Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Itinerary, ItineraryItem
+
+ROLLUP_FIELDS = ('item_count', 'total_cost', 'destination_count', 'accommodation_count')
+
+
+def _items():
+    return ItineraryItem.objects.filter(itinerary=OuterRef('pk')).order_by().values('itinerary')
+
+
+def _total(aggregate, default=Value(0)):
+    return Coalesce(Subquery(_items().annotate(total=aggregate).values('total')), default)
+
+
+def destination_count_expression():
+    # Distinct counts can't be shifted by a delta, so this one is always
+    # recounted; the (itinerary, destination) index keeps it cheap.
+    return _total(Count('destination', distinct=True, filter=Q(item_type='destination')))
+
+
+def adjust_rollups(itinerary_id, items=0, cost=0, accommodations=0, recount_destinations=False):
+    """
+    Atomically shift the stored rollups of one itinerary.
+
+    Everything is applied in a single UPDATE of F-expressions (plus the
+    destination recount when asked), so concurrent item writes can't
+    overwrite each other's changes.
+    """
+    changes = {}
+    if items:
+        changes['item_count'] = F('item_count') + items
+    if cost:
+        changes['total_cost'] = F('total_cost') + cost
+    if accommodations:
+        changes['accommodation_count'] = F('accommodation_count') + accommodations
+    if recount_destinations:
+        changes['destination_count'] = destination_count_expression()
+    if changes:
+        Itinerary.objects.filter(pk=itinerary_id).update(**changes)
+
+
+def recompute_rollups(itinerary_ids=None):
+    """
+    Recompute the rollups from the items in one UPDATE.
+
+    Only the itineraries in ``itinerary_ids`` (a list or queryset of primary
+    keys) are touched; pass ``None`` to refresh every itinerary.
+    """
+    queryset = Itinerary.objects.all()
+    if itinerary_ids is not None:
+        queryset = queryset.filter(pk__in=itinerary_ids)
+    return queryset.update(
+        item_count=_total(Count('pk')),
+        total_cost=_total(Sum('estimated_cost'), Value(0, output_field=DecimalField())),
+        destination_count=destination_count_expression(),
+        accommodation_count=_total(Count('pk', filter=Q(item_type='accommodation'))),
+    )
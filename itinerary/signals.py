@@ -0,0 +1,64 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete
+
+from .models import Itinerary, ItineraryItem
+from .rollups import adjust_rollups, recompute_rollups
+
+# Item fields the rollups are computed from, by name and attname.
+ROLLUP_SOURCES = {
+    'itinerary', 'itinerary_id', 'item_type', 'destination', 'destination_id', 'estimated_cost',
+}
+
+
+def remember_itinerary(sender, instance, **kwargs):
+    # Remember which itinerary the stored row belongs to, so a save that
+    # moves the item also recounts the one it leaves. Rows loaded with the
+    # key deferred get no snapshot.
+    if instance.pk and 'itinerary_id' not in instance.get_deferred_fields():
+        instance._stored_itinerary_id = instance.itinerary_id
+    else:
+        instance._stored_itinerary_id = None
+
+
+def load_stored_itinerary(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding or instance._stored_itinerary_id is not None:
+        return
+    instance._stored_itinerary_id = sender._base_manager.filter(pk=instance.pk).values_list(
+        'itinerary_id', flat=True
+    ).first()
+
+
+def update_rollups_on_save(sender, instance, created, raw, update_fields=None, **kwargs):
+    old_itinerary_id, instance._stored_itinerary_id = instance._stored_itinerary_id, instance.itinerary_id
+    if raw:
+        return
+
+    if created:
+        # Nothing was stored before, so the new item's share is exact.
+        adjust_rollups(
+            instance.itinerary_id, 1, instance.estimated_cost or 0, int(instance.item_type == 'accommodation'),
+            recount_destinations=instance.item_type == 'destination',
+        )
+        return
+    if update_fields is not None and not ROLLUP_SOURCES & update_fields:
+        return
+    # This copy may be older than the stored row, so a delta from it could
+    # be wrong; recount the affected trips from their items instead.
+    recompute_rollups(sorted({instance.itinerary_id, old_itinerary_id} - {None}))
+
+
+def update_rollups_on_delete(sender, instance, origin=None, **kwargs):
+    # Deleting the itinerary itself cascades here; nothing is left to update.
+    if isinstance(origin, Itinerary) or (isinstance(origin, QuerySet) and origin.model is Itinerary):
+        return
+    # Filled in by pre_delete, so a deferred key isn't loaded for a row
+    # that is gone.
+    if instance._stored_itinerary_id is not None:
+        recompute_rollups([instance._stored_itinerary_id])
+
+
+post_init.connect(remember_itinerary, sender=ItineraryItem)
+pre_save.connect(load_stored_itinerary, sender=ItineraryItem)
+post_save.connect(update_rollups_on_save, sender=ItineraryItem)
+pre_delete.connect(load_stored_itinerary, sender=ItineraryItem)
+post_delete.connect(update_rollups_on_delete, sender=ItineraryItem)
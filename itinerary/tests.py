@@ -1,3 +1,226 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.shortcuts import get_object_or_404
 from django.test import TestCase
+from django.urls import reverse
+
+from safar_sathi.testing import QueryBudgetTestMixin, QueryPlanTestMixin, create_catalog, grow_catalog
+from .models import Itinerary, ItineraryItem
+
+
+class ItineraryQueryPlanTests(QueryPlanTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+
+    def setUp(self):
+        self.client.force_login(self.catalog['user'])
+
+    def test_itinerary_list(self):
+        self.assertIndexedQueries(reverse('itinerary:itinerary_list'))
+
+    def test_itinerary_detail(self):
+        self.assertIndexedQueries(
+            reverse('itinerary:itinerary_detail', args=[self.catalog['itinerary'].pk])
+        )
+
+
+class ItineraryQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = grow_catalog(create_catalog())
+
+    def setUp(self):
+        self.client.force_login(self.catalog['user'])
+
+    def test_itinerary_pages(self):
+        pk = self.catalog['itinerary'].pk
+        self.assertWithinQueryBudget(reverse('itinerary:itinerary_list'))
+        self.assertWithinQueryBudget(reverse('itinerary:itinerary_detail', args=[pk]))
+        self.assertWithinQueryBudget(reverse('itinerary:itinerary_create'))
+        self.assertWithinQueryBudget(reverse('itinerary:itinerary_update', args=[pk]))
+
+    def test_item_forms(self):
+        itinerary = self.catalog['itinerary']
+        item = itinerary.itinerary_items.first()
+        self.assertWithinQueryBudget(reverse('itinerary:item_create', args=[itinerary.pk]))
+        self.assertWithinQueryBudget(reverse('itinerary:item_update', args=[itinerary.pk, item.pk]))
+
+
+class ItineraryTimelineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+        cls.itinerary = cls.catalog['itinerary']
+        start = cls.itinerary.start_date
+        ItineraryItem.objects.create(
+            itinerary=cls.itinerary, item_type='destination', destination=cls.catalog['destination'],
+            title='Second beach day', start_date=start + timedelta(days=3), end_date=start + timedelta(days=3),
+            estimated_cost=500,
+        )
+        ItineraryItem.objects.create(
+            itinerary=cls.itinerary, item_type='destination', title='Free walk',
+            start_date=start + timedelta(days=3), end_date=start + timedelta(days=3),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.catalog['user'])
+
+    def test_timeline_and_totals(self):
+        response = self.client.get(reverse('itinerary:itinerary_detail', args=[self.itinerary.pk]))
+        timeline = response.context['timeline']
+        start = self.itinerary.start_date
+
+        self.assertEqual([day['date'] for day in timeline], [start + timedelta(days=n) for n in range(7)])
+        self.assertEqual([len(day['items']) for day in timeline], [2, 0, 0, 2, 0, 0, 0])
+        self.assertEqual(timeline[0]['subtotal'], Decimal('18000'))
+        self.assertEqual(timeline[3]['subtotal'], Decimal('500'))
+        self.assertEqual(response.context['item_count'], 4)
+        # "Free walk" has no destination, so only Cox's Bazar counts, as in
+        # the stored rollup.
+        self.assertEqual(response.context['destinations_count'], 1)
+        self.assertEqual(Itinerary.objects.get(pk=self.itinerary.pk).destination_count, 1)
+        self.assertEqual(response.context['accommodations_count'], 1)
+        self.assertEqual(response.context['total_cost'], Decimal('18500'))
+        self.assertContains(response, 'nothing planned yet', count=5)
+
+    def test_items_outside_trip_dates_are_listed_apart(self):
+        # Years away, e.g. left behind when the trip's dates were changed.
+        late = self.itinerary.end_date + timedelta(days=3 * 365)
+        item = ItineraryItem.objects.create(
+            itinerary=self.itinerary, item_type='destination', title='Extra day', start_date=late, end_date=late,
+            estimated_cost=100,
+        )
+        response = self.client.get(reverse('itinerary:itinerary_detail', args=[self.itinerary.pk]))
+        timeline = response.context['timeline']
+        self.assertEqual(timeline[-1]['date'], self.itinerary.end_date)
+        self.assertEqual(len(timeline), 7)
+        self.assertEqual(response.context['off_dates'], [item])
+        self.assertEqual(response.context['item_count'], 5)
+        self.assertEqual(response.context['total_cost'], Decimal('18600'))
+        self.assertContains(response, 'Outside the trip dates')
+
+    def test_item_form_keeps_dates_within_the_trip(self):
+        late = self.itinerary.end_date + timedelta(days=3 * 365)
+        response = self.client.post(reverse('itinerary:item_create', args=[self.itinerary.pk]), {
+            'item_type': 'destination', 'title': 'Extra day', 'start_date': self.itinerary.start_date, 'end_date': late,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['form'].errors), ['end_date'])
+        self.assertFalse(ItineraryItem.objects.filter(title='Extra day').exists())
+
+
+class ItineraryRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+        cls.itinerary = cls.catalog['itinerary']
+
+    def assertRollups(self, item_count, total_cost, destination_count, accommodation_count):
+        itinerary = Itinerary.objects.get(pk=self.itinerary.pk)
+        self.assertEqual(
+            (itinerary.item_count, itinerary.total_cost, itinerary.destination_count, itinerary.accommodation_count),
+            (item_count, Decimal(total_cost), destination_count, accommodation_count),
+        )
+
+    def add_item(self, **kwargs):
+        start = self.itinerary.start_date
+        fields = {
+            'itinerary': self.itinerary, 'item_type': 'destination', 'destination': self.catalog['destination'],
+            'title': 'Extra', 'start_date': start, 'end_date': start, **kwargs,
+        }
+        return ItineraryItem.objects.create(**fields)
+
+    def test_created_with_catalog(self):
+        self.assertRollups(2, 18000, 1, 1)
+
+    def test_create_edit_delete(self):
+        item = self.add_item(estimated_cost=250)
+        # Same destination again: still one distinct place.
+        self.assertRollups(3, 18250, 1, 1)
+
+        item = ItineraryItem.objects.get(pk=item.pk)
+        item.estimated_cost = None
+        item.save()
+        self.assertRollups(3, 18000, 1, 1)
+
+        item.item_type = 'accommodation'
+        item.destination = None
+        item.accommodation = self.catalog['accommodation']
+        item.save()
+        self.assertRollups(3, 18000, 1, 2)
+
+        item.delete()
+        self.assertRollups(2, 18000, 1, 1)
+
+    def test_move_between_itineraries(self):
+        other = Itinerary.objects.create(
+            user=self.catalog['user'], title='Other', start_date=self.itinerary.start_date,
+            end_date=self.itinerary.end_date,
+        )
+        item = self.itinerary.itinerary_items.get(item_type='destination')
+        item.itinerary = other
+        item.save()
+        self.assertRollups(1, 17000, 0, 1)
+        other.refresh_from_db()
+        self.assertEqual((other.item_count, other.total_cost, other.destination_count), (1, 1000, 1))
+
+    def test_deferred_rows_and_deletes_stay_correct(self):
+        item = ItineraryItem.objects.only('pk', 'title').get(item_type='accommodation')
+        item.estimated_cost = 1000
+        item.save()
+        self.assertRollups(2, 2000, 1, 1)
+        ItineraryItem.objects.only('pk').get(pk=item.pk).delete()
+        self.assertRollups(1, 1000, 1, 0)
+
+    def test_concurrent_edits_of_stale_copies(self):
+        item = self.add_item(estimated_cost=250)
+        first = ItineraryItem.objects.get(pk=item.pk)
+        second = ItineraryItem.objects.get(pk=item.pk)
+
+        first.estimated_cost = 400
+        first.save()
+        # Loaded before the first edit: its idea of the stored cost is stale.
+        second.item_type = 'accommodation'
+        second.destination = None
+        second.accommodation = self.catalog['accommodation']
+        second.save()
+        self.assertRollups(3, 18250, 1, 2)
+
+        # Deleting through the other stale copy counts only what is stored.
+        first.delete()
+        self.assertRollups(2, 18000, 1, 1)
+
+    def test_item_added_while_editing_the_trip(self):
+        self.client.force_login(self.catalog['user'])
+        url = reverse('itinerary:itinerary_update', args=[self.itinerary.pk])
+
+        def load_then_add_item(*args, **kwargs):
+            itinerary = get_object_or_404(*args, **kwargs)
+            # Added after the form's row is loaded, before it is saved.
+            self.add_item(estimated_cost=250)
+            return itinerary
+
+        with patch('itinerary.views.get_object_or_404', side_effect=load_then_add_item):
+            response = self.client.post(url, {
+                'title': 'Renamed', 'description': '', 'status': 'confirmed',
+                'start_date': self.itinerary.start_date, 'end_date': self.itinerary.end_date,
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Itinerary.objects.get(pk=self.itinerary.pk).title, 'Renamed')
+        self.assertRollups(3, 18250, 1, 1)
+
+    def test_repair_command(self):
+        Itinerary.objects.update(item_count=0, total_cost=0, destination_count=0, accommodation_count=0)
+        call_command('recompute_itinerary_rollups', stdout=StringIO())
+        self.assertRollups(2, 18000, 1, 1)
 
-# Create your tests here.
+    def test_deleting_itinerary_skips_item_updates(self):
+        itinerary = Itinerary.objects.get(pk=self.itinerary.pk)
+        # Collect the items, delete them, delete the itinerary; no UPDATE per item.
+        with self.assertNumQueries(3):
+            itinerary.delete()
@@ -8,6 +8,7 @@ urlpatterns = [
     path('', views.itinerary_list, name='itinerary_list'),
     path('create/', views.itinerary_create, name='itinerary_create'),
     path('<int:pk>/', views.itinerary_detail, name='itinerary_detail'),
+    path('<int:pk>/async/', views.itinerary_detail_async, name='itinerary_detail_async'),
     path('<int:pk>/update/', views.itinerary_update, name='itinerary_update'),
     path('<int:pk>/delete/', views.itinerary_delete, name='itinerary_delete'),
 
@@ -1,53 +1,110 @@
+from functools import partial
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Count, Sum
+from datetime import timedelta
+from decimal import Decimal
+from safar_sathi.budgets import query_budget
+from safar_sathi.concurrency import gather
+from safar_sathi.forms import save_edited_fields
 from .models import Itinerary, ItineraryItem
 from .forms import ItineraryForm, ItineraryItemForm
 
 
 
+@query_budget(3)
 @login_required
 def itinerary_list(request):
-    itineraries = Itinerary.objects.filter(user=request.user).annotate(
-        total_items=Count('itinerary_items'),
-        total_cost=Sum('itinerary_items__estimated_cost')
-    ).order_by('-created_at')
+    # The counts and cost are stored on the row (see itinerary.rollups), so
+    # this reads straight off the (user, -created_at) index.
+    itineraries = Itinerary.objects.filter(user=request.user).order_by('-created_at')
 
     return render(request, 'itinerary/itinerary_list.html', {
         'itineraries': itineraries
     })
 
 
-@login_required
-def itinerary_detail(request, pk):
-    itinerary = get_object_or_404(Itinerary, pk=pk, user=request.user)
-    items = itinerary.itinerary_items.all().select_related('destination', 'accommodation')
+def plan_days(itinerary, items):
+    """
+    Group ``items`` by day in one pass over the rows.
 
-    # Group items by date
-    items_by_date = {}
+    Returns the day-by-day timeline (every date of the trip, empty days
+    included, each with its items and cost subtotal) and the trip totals.
+    Items dated outside the trip, e.g. after its dates were shortened, are
+    listed apart as ``off_dates`` rather than stretching the timeline.
+    """
+    days = {}
+    destination_ids = set()
+    accommodations_count = 0
+    total_cost = Decimal(0)
     for item in items:
-        date_key = item.start_date
-        if date_key not in items_by_date:
-            items_by_date[date_key] = []
-        items_by_date[date_key].append(item)
+        day = days.setdefault(item.start_date, {'date': item.start_date, 'items': [], 'subtotal': Decimal(0)})
+        day['items'].append(item)
+        if item.estimated_cost:
+            day['subtotal'] += item.estimated_cost
+            total_cost += item.estimated_cost
+        if item.item_type == 'destination':
+            # Like COUNT(DISTINCT destination): an item without one isn't a place.
+            if item.destination_id is not None:
+                destination_ids.add(item.destination_id)
+        elif item.item_type == 'accommodation':
+            accommodations_count += 1
+
+    first, last = itinerary.start_date, itinerary.end_date
+    timeline = [
+        days.pop(date, {'date': date, 'items': [], 'subtotal': Decimal(0)})
+        for date in (first + timedelta(days=n) for n in range((last - first).days + 1))
+    ]
+    off_dates = [item for date in sorted(days) for item in days[date]['items']]
+    return timeline, {
+        'off_dates': off_dates,
+        'item_count': sum(len(day['items']) for day in timeline) + len(off_dates),
+        'destinations_count': len(destination_ids),
+        'accommodations_count': accommodations_count,
+        'total_cost': total_cost,
+    }
+
 
-    # Calculate stats
-    destinations_count = items.filter(item_type='destination').values('destination').distinct().count()
-    accommodations_count = items.filter(item_type='accommodation').count()
-    total_cost = items.aggregate(total=Sum('estimated_cost'))['total'] or 0
+def itinerary_reads(pk, user):
+    """The reads behind a trip's page, to run one after another or concurrently."""
+    return [
+        partial(get_object_or_404, Itinerary, pk=pk, user=user),
+        partial(list, ItineraryItem.objects.filter(
+            itinerary_id=pk, itinerary__user=user
+        ).select_related('destination', 'accommodation')),
+    ]
 
-    context = {
+
+def itinerary_context(itinerary, items):
+    timeline, stats = plan_days(itinerary, items)
+    return {
         'itinerary': itinerary,
-        'items': items,
-        'items_by_date': dict(sorted(items_by_date.items())),
-        'destinations_count': destinations_count,
-        'accommodations_count': accommodations_count,
-        'total_cost': total_cost,
+        'timeline': timeline,
+        **stats,
     }
+
+
+@query_budget(4)
+@login_required
+def itinerary_detail(request, pk):
+    context = itinerary_context(*[call() for call in itinerary_reads(pk, request.user)])
     return render(request, 'itinerary/itinerary_detail.html', context)
 
 
+@query_budget(4)
+@login_required
+async def itinerary_detail_async(request, pk):
+    """``itinerary_detail`` running its reads concurrently."""
+    # login_required loaded the user through request.auser(), which caches
+    # apart from request.user; share it so rendering doesn't load it again.
+    request.user = user = await request.auser()
+    context = itinerary_context(*await gather(*itinerary_reads(pk, user)))
+    return await sync_to_async(render)(request, 'itinerary/itinerary_detail.html', context)
+
+
+@query_budget(3)
 @login_required
 def itinerary_create(request):
     if request.method == 'POST':
@@ -67,6 +124,7 @@ def itinerary_create(request):
     })
 
 
+@query_budget(4)
 @login_required
 def itinerary_update(request, pk):
     itinerary = get_object_or_404(Itinerary, pk=pk, user=request.user)
@@ -74,7 +132,8 @@ def itinerary_update(request, pk):
     if request.method == 'POST':
         form = ItineraryForm(request.POST, instance=itinerary)
         if form.is_valid():
-            form.save()
+            # The rollups may have moved since the row was loaded.
+            save_edited_fields(form)
             messages.success(request, 'Itinerary updated successfully!')
             return redirect('itinerary:itinerary_detail', pk=itinerary.pk)
     else:
@@ -87,6 +146,7 @@ def itinerary_update(request, pk):
     })
 
 
+@query_budget(5)
 @login_required
 def itinerary_delete(request, pk):
     itinerary = get_object_or_404(Itinerary, pk=pk, user=request.user)
@@ -96,6 +156,7 @@ def itinerary_delete(request, pk):
     messages.success(request, f'Itinerary "{itinerary_title}" deleted successfully!')
     return redirect('itinerary:itinerary_list')
 
+@query_budget(6)
 @login_required
 def item_create(request, itinerary_pk):
     itinerary = get_object_or_404(Itinerary, pk=itinerary_pk, user=request.user)
@@ -118,6 +179,7 @@ def item_create(request, itinerary_pk):
     })
 
 
+@query_budget(7)
 @login_required
 def item_update(request, itinerary_pk, item_pk):
     itinerary = get_object_or_404(Itinerary, pk=itinerary_pk, user=request.user)
@@ -140,6 +202,7 @@ def item_update(request, itinerary_pk, item_pk):
     })
 
 
+@query_budget(5)
 @login_required
 def item_delete(request, itinerary_pk, item_pk):
     itinerary = get_object_or_404(Itinerary, pk=itinerary_pk, user=request.user)
@@ -1,72 +1,93 @@
 from django.contrib import admin
+from .export import export_response
+from .ratings import set_approval
 from .models import DestinationReview, AccommodationReview, GuideReview
 
 # Register your models here.
 
+
+class ReviewExportMixin:
+    def export_csv(self, request, queryset):
+        return export_response(queryset, 'csv')
+
+    export_csv.short_description = "Export selected reviews as CSV"
+
+    def export_jsonl(self, request, queryset):
+        return export_response(queryset, 'jsonl')
+
+    export_jsonl.short_description = "Export selected reviews as JSON Lines"
+
+
 @admin.register(DestinationReview)
-class DestinationReviewAdmin(admin.ModelAdmin):
+class DestinationReviewAdmin(ReviewExportMixin, admin.ModelAdmin):
     list_display = ['title', 'destination', 'user', 'rating', 'is_approved', 'created_at']
     list_filter = ['rating', 'is_approved', 'created_at']
     search_fields = ['destination__name', 'user__username', 'content']
 
-    actions = ['approve_reviews', 'disapprove_reviews']
+    actions = ['approve_reviews', 'disapprove_reviews', 'export_csv', 'export_jsonl']
 
     def title(self, obj):
         return obj.title
     title.short_description = 'Title'
 
     def approve_reviews(self, request, queryset):
-        queryset.update(is_approved=True)
+        count = set_approval(queryset, True)
+        self.message_user(request, f"{count} review(s) approved.")
 
     approve_reviews.short_description = "Approve selected reviews"
 
     def disapprove_reviews(self, request, queryset):
-        queryset.update(is_approved=False)
+        count = set_approval(queryset, False)
+        self.message_user(request, f"{count} review(s) disapproved.")
 
     disapprove_reviews.short_description = "Disapprove selected reviews"
 
 
 @admin.register(AccommodationReview)
-class AccommodationReviewAdmin(admin.ModelAdmin):
+class AccommodationReviewAdmin(ReviewExportMixin, admin.ModelAdmin):
     list_display = ['title', 'accommodation', 'user', 'rating', 'is_approved', 'created_at']
     list_filter = ['rating', 'is_approved', 'created_at']
     search_fields = ['accommodation__name', 'user__username', 'content']
-    actions = ['approve_reviews', 'disapprove_reviews']
+    actions = ['approve_reviews', 'disapprove_reviews', 'export_csv', 'export_jsonl']
 
     def title(self, obj):
         return obj.title
     title.short_description = 'Title'
 
     def approve_reviews(self, request, queryset):
-        queryset.update(is_approved=True)
+        count = set_approval(queryset, True)
+        self.message_user(request, f"{count} review(s) approved.")
 
     approve_reviews.short_description = "Approve selected reviews"
 
     def disapprove_reviews(self, request, queryset):
-        queryset.update(is_approved=False)
+        count = set_approval(queryset, False)
+        self.message_user(request, f"{count} review(s) disapproved.")
 
     disapprove_reviews.short_description = "Disapprove selected reviews"
 
 
 @admin.register(GuideReview)
-class GuideReviewAdmin(admin.ModelAdmin):
+class GuideReviewAdmin(ReviewExportMixin, admin.ModelAdmin):
     list_display = ['title', 'guide', 'user', 'rating', 'is_approved', 'created_at']
     list_filter = ['rating', 'is_approved', 'created_at']
     search_fields = ['guide__user__username', 'guide__user__first_name', 'guide__user__last_name', 'user__username', 'content']
 
-    actions = ['approve_reviews', 'disapprove_reviews']
+    actions = ['approve_reviews', 'disapprove_reviews', 'export_csv', 'export_jsonl']
 
     def title(self, obj):
         return obj.title
     title.short_description = 'Title'
 
     def approve_reviews(self, request, queryset):
-        queryset.update(is_approved=True)
+        count = set_approval(queryset, True)
+        self.message_user(request, f"{count} review(s) approved.")
 
     approve_reviews.short_description = "Approve selected reviews"
 
     def disapprove_reviews(self, request, queryset):
-        queryset.update(is_approved=False)
+        count = set_approval(queryset, False)
+        self.message_user(request, f"{count} review(s) disapproved.")
 
     disapprove_reviews.short_description = "Disapprove selected reviews"
 
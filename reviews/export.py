@@ -0,0 +1,105 @@
+"""
+Streaming export of reviews as CSV or JSON Lines.
+
+Rows are read with ``values_list()`` joined to the reviewed object and the
+author, and fetched in chunks with ``iterator()``, so an export holds one
+chunk in memory however many reviews it covers.
+"""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import DestinationReview, AccommodationReview, GuideReview
+
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+COMMON_COLUMNS = [
+    ('user', 'user__username'),
+    ('rating', 'rating'),
+    ('content', 'content'),
+    ('is_approved', 'is_approved'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+]
+
+# Review model -> (column name, ORM lookup) in output order.
+COLUMNS = {
+    DestinationReview: [
+        ('id', 'id'),
+        ('destination_id', 'destination_id'),
+        ('destination', 'destination__name'),
+        *COMMON_COLUMNS,
+    ],
+    AccommodationReview: [
+        ('id', 'id'),
+        ('accommodation_id', 'accommodation_id'),
+        ('accommodation', 'accommodation__name'),
+        ('destination', 'accommodation__destination__name'),
+        *COMMON_COLUMNS,
+    ],
+    GuideReview: [
+        ('id', 'id'),
+        ('guide_id', 'guide_id'),
+        ('guide', 'guide__user__username'),
+        ('guide_first_name', 'guide__user__first_name'),
+        ('guide_last_name', 'guide__user__last_name'),
+        *COMMON_COLUMNS,
+    ],
+}
+
+CHUNK_SIZE = 2000
+
+# Spreadsheets run a cell starting with one of these as a formula.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class _Echo:
+    # csv.writer wants a file; this one hands each formatted line back.
+    def write(self, value):
+        return value
+
+
+def _csv_cell(value):
+    # Review text and names are user-written; quote a would-be formula so
+    # it opens as text.
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def export_rows(queryset, chunk_size=CHUNK_SIZE):
+    """Yield one tuple per review in ``queryset``, in id order."""
+    lookups = [lookup for _, lookup in COLUMNS[queryset.model]]
+    return queryset.order_by('pk').values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+def export_lines(queryset, fmt, chunk_size=CHUNK_SIZE):
+    """Yield the export of ``queryset`` as text lines in ``fmt``."""
+    names = [name for name, _ in COLUMNS[queryset.model]]
+    rows = export_rows(queryset, chunk_size)
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(names)
+        for row in rows:
+            yield writer.writerow([_csv_cell(value) for value in row])
+    else:
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+        for row in rows:
+            yield encoder.encode(dict(zip(names, row))) + '\n'
+
+
+def export_filename(model, fmt):
+    return f'{model._meta.model_name}s-{timezone.now():%Y%m%d-%H%M%S}.{fmt}'
+
+
+def export_response(queryset, fmt):
+    response = StreamingHttpResponse(
+        export_lines(queryset, fmt), content_type=f'{FORMATS[fmt]}; charset=utf-8'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(queryset.model, fmt)}"'
+    return response
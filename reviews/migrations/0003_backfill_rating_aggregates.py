@@ -0,0 +1,42 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:40
+
+from django.db import migrations
+from django.db.models import Count, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+
+RATED = [
+    ('DestinationReview', 'destinations', 'Destination', 'destination'),
+    ('AccommodationReview', 'bookings', 'Accommodation', 'accommodation'),
+    ('GuideReview', 'accounts', 'LocalGuide', 'guide'),
+]
+
+
+def backfill(apps, schema_editor):
+    for review_name, app_label, model_name, field in RATED:
+        Review = apps.get_model('reviews', review_name)
+        Rated = apps.get_model(app_label, model_name)
+        approved = Review.objects.filter(
+            **{field: OuterRef('pk')}, is_approved=True
+        ).order_by().values(field)
+        rating_sum = Coalesce(Subquery(approved.annotate(total=Sum('rating')).values('total')), Value(0))
+        rating_count = Coalesce(Subquery(approved.annotate(total=Count('pk')).values('total')), Value(0))
+        average = Cast(rating_sum, FloatField()) / NullIf(rating_count, Value(0))
+        Rated.objects.update(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            rating=Coalesce(Round(average, 1), Value(0.0)),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_remove_accommodationreview_title_and_more'),
+        ('accounts', '0002_localguide_rating_count_localguide_rating_sum'),
+        ('bookings', '0004_accommodation_rating_count_accommodation_rating_sum'),
+        ('destinations', '0004_destination_rating_destination_rating_count_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_localguide_guide_verified_rating_idx'),
+        ('bookings', '0005_accommodation_accommodation_available_idx_and_more'),
+        ('destinations', '0005_destination_destination_created_idx_and_more'),
+        ('reviews', '0003_backfill_rating_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='accommodationreview',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['accommodation', '-created_at'], name='accreview_approved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='destinationreview',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['destination', '-created_at'], name='destreview_approved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='guidereview',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['guide', '-created_at'], name='guidereview_approved_idx'),
+        ),
+    ]
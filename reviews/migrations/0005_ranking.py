@@ -0,0 +1,36 @@
+# Generated by Django 5.1.2 on 2026-10-18 16:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_remove_localguide_guide_verified_rating_idx_and_more'),
+        ('bookings', '0008_booking_nightinventory'),
+        ('destinations', '0007_destination_coordinates'),
+        ('reviews', '0004_accommodationreview_accreview_approved_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ranking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('board', models.CharField(choices=[('trending', 'Trending now'), ('top_rated', 'Top rated')], max_length=20)),
+                ('kind', models.CharField(choices=[('destination', 'Destination'), ('accommodation', 'Accommodation'), ('guide', 'Guide')], max_length=20)),
+                ('position', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('review_count', models.PositiveIntegerField()),
+                ('computed_at', models.DateTimeField()),
+                ('accommodation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='bookings.accommodation')),
+                ('destination', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='destinations.destination')),
+                ('guide', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.localguide')),
+            ],
+            options={
+                'ordering': ['board', 'kind', 'position'],
+                'constraints': [models.UniqueConstraint(fields=('board', 'kind', 'position'), name='ranking_position_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.2 on 2026-10-18 16:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_booking_nightinventory'),
+        ('destinations', '0007_destination_coordinates'),
+        ('reviews', '0005_ranking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarAccommodation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+                ('source', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='neighbours', to='bookings.accommodation')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbour_of', to='bookings.accommodation')),
+            ],
+            options={
+                'ordering': ['source', '-score'],
+                'indexes': [models.Index(fields=['source', '-score'], name='similaracc_source_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SimilarDestination',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+                ('source', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='neighbours', to='destinations.destination')),
+                ('target', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbour_of', to='destinations.destination')),
+            ],
+            options={
+                'ordering': ['source', '-score'],
+                'indexes': [models.Index(fields=['source', '-score'], name='similardest_source_idx')],
+            },
+        ),
+    ]
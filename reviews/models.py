@@ -31,6 +31,13 @@ class DestinationReview(models.Model):
     class Meta:
         unique_together = ('destination', 'user')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['destination', '-created_at'],
+                condition=models.Q(is_approved=True),
+                name='destreview_approved_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Review by {self.user.username} for {self.destination.name}"
@@ -68,6 +75,13 @@ class AccommodationReview(models.Model):
     class Meta:
         unique_together = ('accommodation', 'user')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['accommodation', '-created_at'],
+                condition=models.Q(is_approved=True),
+                name='accreview_approved_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Review by {self.user.username} for {self.accommodation.name}"
@@ -105,6 +119,13 @@ class GuideReview(models.Model):
     class Meta:
         unique_together = ('guide', 'user')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['guide', '-created_at'],
+                condition=models.Q(is_approved=True),
+                name='guidereview_approved_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Review by {self.user.username} for {self.guide.user.get_full_name()}"
@@ -121,3 +142,86 @@ class GuideReview(models.Model):
         return rating_titles.get(self.rating, "Review")
 
 
+
+
+class Ranking(models.Model):
+    """
+    One place on a precomputed list, such as the third trending destination.
+
+    The rows are replaced wholesale by ``reviews.rankings.refresh_rankings``;
+    exactly one of the foreign keys is set, named by ``kind``.
+    """
+    TRENDING = 'trending'
+    TOP_RATED = 'top_rated'
+    BOARD_CHOICES = [
+        (TRENDING, 'Trending now'),
+        (TOP_RATED, 'Top rated'),
+    ]
+    KIND_CHOICES = [
+        ('destination', 'Destination'),
+        ('accommodation', 'Accommodation'),
+        ('guide', 'Guide'),
+    ]
+
+    board = models.CharField(max_length=20, choices=BOARD_CHOICES)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    position = models.PositiveSmallIntegerField()
+    destination = models.ForeignKey(Destination, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    accommodation = models.ForeignKey(Accommodation, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    guide = models.ForeignKey(LocalGuide, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    score = models.FloatField()
+    review_count = models.PositiveIntegerField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['board', 'kind', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['board', 'kind', 'position'], name='ranking_position_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_board_display()} {self.kind} #{self.position}: {self.item}"
+
+    @property
+    def item(self):
+        return getattr(self, self.kind)
+
+
+class SimilarDestination(models.Model):
+    """
+    ``target`` is among the destinations liked most by the travellers who
+    liked ``source``; filled by ``reviews.recommendations``.
+    """
+    source = models.ForeignKey(Destination, on_delete=models.CASCADE, related_name='neighbours', db_index=False)
+    target = models.ForeignKey(Destination, on_delete=models.CASCADE, related_name='neighbour_of')
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['source', '-score']
+        indexes = [
+            models.Index(fields=['source', '-score'], name='similardest_source_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.source} -> {self.target} ({self.score:.2f})"
+
+
+class SimilarAccommodation(models.Model):
+    """
+    ``target`` is among the accommodations liked most by the guests who
+    liked ``source``; filled by ``reviews.recommendations``.
+    """
+    source = models.ForeignKey(Accommodation, on_delete=models.CASCADE, related_name='neighbours', db_index=False)
+    target = models.ForeignKey(Accommodation, on_delete=models.CASCADE, related_name='neighbour_of')
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['source', '-score']
+        indexes = [
+            models.Index(fields=['source', '-score'], name='similaracc_source_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.source} -> {self.target} ({self.score:.2f})"
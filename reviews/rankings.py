@@ -0,0 +1,134 @@
+"""
+Precomputed "trending" and "top rated" lists for the home page.
+
+``refresh_rankings()`` scores destinations, accommodations and guides from
+their reviews and replaces the ``Ranking`` rows in one transaction, so the
+home page reads a few ranked rows instead of aggregating review history on
+every request. The refresh_rankings command runs it; schedule that every
+few minutes to an hour.
+
+Trending counts the approved reviews of the last ``window_days``, each
+weighted by its stars and halved every ``half_life_days`` of age, so a
+recent run of good reviews outranks a long steady trickle. Top rated orders
+by the average rating pulled towards the site-wide average by
+``PRIOR_REVIEWS`` imagined reviews, so a single five-star review can't top
+the list.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Sum, Value
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from accounts.models import LocalGuide
+from bookings.models import Accommodation
+from destinations.models import Destination
+from .models import AccommodationReview, DestinationReview, GuideReview, Ranking
+from .ratings import RATED_FIELDS
+
+LIST_SIZE = 6
+TRENDING_WINDOW_DAYS = 30
+HALF_LIFE_DAYS = 7
+PRIOR_REVIEWS = 10
+
+LIST_HEADINGS = {
+    'destination': 'Destinations',
+    'accommodation': 'Places to stay',
+    'guide': 'Local guides',
+}
+
+
+def ranked_querysets():
+    """``{review model: queryset of the objects that may be listed}``."""
+    return {
+        DestinationReview: Destination.objects.all(),
+        AccommodationReview: Accommodation.objects.filter(is_available=True),
+        GuideReview: LocalGuide.objects.filter(is_verified=True),
+    }
+
+
+def trending_scores(review_model, now, window_days=TRENDING_WINDOW_DAYS, half_life_days=HALF_LIFE_DAYS):
+    """``{rated pk: (score, recent reviews)}`` from the last ``window_days`` of reviews."""
+    field = RATED_FIELDS[review_model]
+    today = now.date()
+    # One row per object and day, so the decay is applied per day in Python
+    # rather than per review.
+    days = review_model.objects.filter(
+        is_approved=True, created_at__gte=now - timedelta(days=window_days)
+    ).values_list(field, TruncDate('created_at')).annotate(
+        stars=Sum('rating'), reviews=Count('pk')
+    ).order_by()
+
+    scores, counts = defaultdict(float), defaultdict(int)
+    for pk, day, stars, reviews in days.iterator():
+        scores[pk] += 0.5 ** (max((today - day).days, 0) / half_life_days) * stars / 5
+        counts[pk] += reviews
+    return {pk: (score, counts[pk]) for pk, score in scores.items()}
+
+
+def top_listed(queryset, scores, size):
+    """The ``size`` best-scoring pks of ``scores`` that are in ``queryset``."""
+    ranked = sorted(scores, key=lambda pk: (-scores[pk][0], pk))
+    top = []
+    for start in range(0, len(ranked), 500):
+        chunk = ranked[start:start + 500]
+        listed = set(queryset.filter(pk__in=chunk).values_list('pk', flat=True))
+        top.extend(pk for pk in chunk if pk in listed)
+        if len(top) >= size:
+            break
+    return [(pk, *scores[pk]) for pk in top[:size]]
+
+
+def top_rated(queryset, size, prior=PRIOR_REVIEWS):
+    """``(pk, score, reviews)`` of the ``size`` best-rated objects in ``queryset``."""
+    totals = queryset.aggregate(stars=Sum('rating_sum'), reviews=Sum('rating_count'))
+    mean = totals['stars'] / totals['reviews'] if totals['reviews'] else 0
+    score = ExpressionWrapper(
+        (F('rating_sum') + Value(prior * mean)) / (F('rating_count') + Value(float(prior))),
+        output_field=FloatField(),
+    )
+    return list(queryset.filter(rating_count__gt=0).annotate(score=score).order_by(
+        '-score', '-rating_count', 'pk'
+    ).values_list('pk', 'score', 'rating_count')[:size])
+
+
+def refresh_rankings(size=LIST_SIZE, window_days=TRENDING_WINDOW_DAYS, half_life_days=HALF_LIFE_DAYS):
+    """Recompute every list and replace the stored rankings. Returns the rows written."""
+    now = timezone.now()
+    rows = []
+    for review_model, queryset in ranked_querysets().items():
+        kind = RATED_FIELDS[review_model]
+        boards = {
+            Ranking.TRENDING: top_listed(
+                queryset, trending_scores(review_model, now, window_days, half_life_days), size
+            ),
+            Ranking.TOP_RATED: top_rated(queryset, size),
+        }
+        for board, entries in boards.items():
+            rows.extend(
+                Ranking(
+                    board=board, kind=kind, position=position, score=score,
+                    review_count=reviews, computed_at=now, **{f'{kind}_id': pk},
+                )
+                for position, (pk, score, reviews) in enumerate(entries, 1)
+            )
+    with transaction.atomic():
+        Ranking.objects.all().delete()
+        Ranking.objects.bulk_create(rows)
+    return len(rows)
+
+
+def ranked_lists():
+    """
+    ``{board: [(kind, heading, [Ranking, ...]), ...]}`` of the stored
+    rankings, skipping empty lists, in one query.
+    """
+    rows = {(board, kind): [] for board, _ in Ranking.BOARD_CHOICES for kind in LIST_HEADINGS}
+    for ranking in Ranking.objects.select_related('destination', 'accommodation__destination', 'guide__user'):
+        rows[ranking.board, ranking.kind].append(ranking)
+    return {
+        board: [(kind, heading, rows[board, kind]) for kind, heading in LIST_HEADINGS.items() if rows[board, kind]]
+        for board, _ in Ranking.BOARD_CHOICES
+    }
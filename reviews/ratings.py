@@ -0,0 +1,109 @@
+from django.db import transaction
+from django.db.models import Count, F, FloatField, OuterRef, QuerySet, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
+from django.utils import timezone
+
+from safar_sathi.detail_cache import invalidate_all_details, invalidate_detail
+from safar_sathi.facets import invalidate_facets
+from .models import DestinationReview, AccommodationReview, GuideReview
+
+# Review model -> name of the foreign key to the rated object.
+RATED_FIELDS = {
+    DestinationReview: 'destination',
+    AccommodationReview: 'accommodation',
+    GuideReview: 'guide',
+}
+
+
+def rated_model_for(review_model):
+    return review_model._meta.get_field(RATED_FIELDS[review_model]).related_model
+
+
+def rating_expressions(rating_sum, rating_count):
+    """
+    Return update kwargs that set ``rating_sum``, ``rating_count`` and the
+    rounded ``rating`` average from the given SQL expressions.
+    """
+    average = Cast(rating_sum, FloatField()) / NullIf(rating_count, Value(0))
+    return {
+        'rating_sum': rating_sum,
+        'rating_count': rating_count,
+        'rating': Coalesce(Round(average, 1), Value(0.0)),
+    }
+
+
+def adjust_rating(review_model, rated_id, sum_delta, count_delta):
+    """
+    Atomically shift the stored rating aggregates of one rated object.
+
+    The whole change is a single UPDATE built from F-expressions, so
+    concurrent review writes can't overwrite each other's contribution.
+    """
+    if not (sum_delta or count_delta):
+        return
+    rated_model = rated_model_for(review_model)
+    rated_model.objects.filter(pk=rated_id).update(**rating_expressions(
+        F('rating_sum') + sum_delta,
+        F('rating_count') + count_delta,
+    ))
+    # The rating facets count the new average.
+    invalidate_facets(rated_model)
+
+
+def recompute_ratings(review_model, rated_ids=None):
+    """
+    Recompute rating aggregates from the approved reviews in one UPDATE.
+
+    Only the objects in ``rated_ids`` (a list or queryset of primary keys)
+    are touched; pass ``None`` to refresh every object.
+    """
+    field = RATED_FIELDS[review_model]
+    approved = review_model.objects.filter(
+        **{field: OuterRef('pk')}, is_approved=True
+    ).order_by().values(field)
+    rating_sum = Subquery(approved.annotate(total=Sum('rating')).values('total'))
+    rating_count = Subquery(approved.annotate(total=Count('pk')).values('total'))
+
+    rated_model = rated_model_for(review_model)
+    queryset = rated_model.objects.all()
+    if rated_ids is not None:
+        queryset = queryset.filter(pk__in=rated_ids)
+    updated = queryset.update(**rating_expressions(
+        Coalesce(rating_sum, Value(0)),
+        Coalesce(rating_count, Value(0)),
+    ))
+
+    if rated_ids is None or isinstance(rated_ids, QuerySet):
+        # Dropping every page is cheaper than reading a subquery's ids back.
+        invalidate_all_details(rated_model)
+    else:
+        invalidate_detail(rated_model, rated_ids)
+    invalidate_facets(rated_model)
+    return updated
+
+
+def set_approval(queryset, approved):
+    """
+    Approve or disapprove the reviews in ``queryset`` and refresh the
+    ratings of the objects they rate.
+
+    Bulk moderation skips the per-review signals, so the ratings are
+    recomputed with one grouped UPDATE over just the affected objects.
+    Returns the number of reviews whose approval changed.
+    """
+    review_model = queryset.model
+    changed = queryset.exclude(is_approved=approved).order_by()
+    changed_at = timezone.now()
+    with transaction.atomic():
+        if not changed.exists():
+            return 0
+        # update() skips auto_now; the bump keeps review change stamps current.
+        count = changed.update(is_approved=approved, updated_at=changed_at)
+        # The selection may itself filter on is_approved and match nothing
+        # now, so the changed rows are found again by their new stamp. A
+        # subquery keeps it one UPDATE whatever the number of objects.
+        rated_ids = review_model.objects.filter(
+            updated_at=changed_at, is_approved=approved
+        ).order_by().values(RATED_FIELDS[review_model])
+        recompute_ratings(review_model, rated_ids)
+    return count
@@ -0,0 +1,131 @@
+"""
+"Travellers who liked this also liked": item-item neighbours from reviews.
+
+The approved reviews of a kind form a sparse user x item rating matrix R;
+two items are as similar as the cosine of their rating columns, which is
+Rᵀ·R normalized by the columns' norms. SciPy multiplies the sparse
+matrices, so only the pairs of items some user rated together are
+visited. Ratings are centred on three stars, so a pair one traveller liked
+and another disliked cancels out instead of looking related.
+
+``refresh_neighbours()`` stores the ``TOP_K`` best neighbours per item,
+and pages read them back with one indexed lookup. The
+compute_recommendations command runs it; schedule it nightly or so.
+"""
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from scipy import sparse
+
+from destinations.models import Destination
+from safar_sathi.detail_cache import invalidate_all_details
+from .models import AccommodationReview, DestinationReview, SimilarAccommodation, SimilarDestination
+from .ratings import RATED_FIELDS, rated_model_for
+
+NEUTRAL_RATING = 3
+TOP_K = 10
+# Pairs rated by fewer users than this are too thin to call similar.
+MIN_COMMON_USERS = 2
+
+NEIGHBOUR_MODELS = {
+    DestinationReview: SimilarDestination,
+    AccommodationReview: SimilarAccommodation,
+}
+
+
+def load_ratings(review_model):
+    """``{user pk: [(item pk, centred rating), ...]}`` of the approved reviews."""
+    field = RATED_FIELDS[review_model]
+    users = defaultdict(list)
+    reviews = review_model.objects.filter(is_approved=True).values_list('user', field, 'rating').order_by()
+    for user, item, rating in reviews.iterator(chunk_size=10000):
+        if rating != NEUTRAL_RATING:
+            users[user].append((item, rating - NEUTRAL_RATING))
+    return users
+
+
+def rating_matrix(user_ratings):
+    """The user x item CSR matrix of ``load_ratings()``, and the item pk of each column."""
+    items = sorted({item for ratings in user_ratings.values() for item, _ in ratings})
+    column = {item: i for i, item in enumerate(items)}
+    rows, columns, data = [], [], []
+    for row, ratings in enumerate(user_ratings.values()):
+        for item, rating in ratings:
+            rows.append(row)
+            columns.append(column[item])
+            data.append(rating)
+    matrix = sparse.csr_matrix(
+        (np.array(data, dtype=np.float64), (rows, columns)), shape=(len(user_ratings), len(items))
+    )
+    return matrix, np.array(items)
+
+
+def compute_neighbours(user_ratings, k=TOP_K, min_common=MIN_COMMON_USERS):
+    """
+    ``{item: [(neighbour, similarity), ...]}`` with the ``k`` most similar
+    items first, from ``load_ratings()``. Only positive similarities count.
+    """
+    ratings, items = rating_matrix(user_ratings)
+    rated = (ratings != 0).astype(np.int32)
+    # Users rating both items of each pair; the pairs the products cover.
+    common = (rated.T @ rated).tocoo()
+    if not common.nnz:
+        return {}
+    dots = ratings.T @ ratings
+    squared_norms = np.asarray(ratings.multiply(ratings).sum(axis=0)).ravel()
+
+    item, other, count = common.row, common.col, common.data
+    dot = np.asarray(dots[item, other]).ravel()
+    keep = (item != other) & (count >= min_common) & (dot > 0)
+    item, other, dot = item[keep], other[keep], dot[keep]
+    similarity = dot / np.sqrt(squared_norms[item] * squared_norms[other])
+
+    # Best first within each item, ties to the higher pk; keep the first k.
+    order = np.lexsort((-items[other], -similarity, item))
+    item, other, similarity = item[order], other[order], similarity[order]
+    _, starts, sizes = np.unique(item, return_index=True, return_counts=True)
+    rank = np.arange(len(item)) - np.repeat(starts, sizes)
+    best = rank < k
+
+    neighbours = defaultdict(list)
+    for source, target, score in zip(
+        items[item[best]].tolist(), items[other[best]].tolist(), similarity[best].tolist()
+    ):
+        neighbours[source].append((target, score))
+    return dict(neighbours)
+
+
+def refresh_neighbours(review_model, k=TOP_K, min_common=MIN_COMMON_USERS):
+    """Recompute and replace the stored neighbours of one kind. Returns the rows written."""
+    neighbours = compute_neighbours(load_ratings(review_model), k, min_common)
+    model = NEIGHBOUR_MODELS[review_model]
+    now = timezone.now()
+    rows = [
+        model(source_id=item, target_id=other, score=similarity, computed_at=now)
+        for item, others in neighbours.items()
+        for other, similarity in others
+    ]
+    with transaction.atomic():
+        model.objects.all().delete()
+        model.objects.bulk_create(rows, batch_size=2000)
+        # Detail pages list the neighbours.
+        invalidate_all_details(rated_model_for(review_model))
+    return len(rows)
+
+
+def picks_for(user, limit=6):
+    """
+    Destinations most like the ones ``user`` rated above three stars that
+    they haven't reviewed yet, best first, in one query.
+    """
+    reviewed = DestinationReview.objects.filter(user=user)
+    liked = reviewed.filter(rating__gt=NEUTRAL_RATING).values('destination')
+    return list(
+        Destination.objects.filter(neighbour_of__source__in=liked)
+        .exclude(pk__in=reviewed.values('destination'))
+        .annotate(affinity=Sum('neighbour_of__score'))
+        .order_by('-affinity', 'pk')[:limit]
+    )
@@ -0,0 +1,70 @@
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete
+
+from safar_sathi.detail_cache import invalidate_detail
+from .ratings import RATED_FIELDS, adjust_rating, rated_model_for, recompute_ratings
+
+
+def _rated_field(review_model):
+    return f'{RATED_FIELDS[review_model]}_id'
+
+
+def remember_rated_id(sender, instance, **kwargs):
+    # Remember which object the stored row rates, so a save that moves the
+    # review also recounts the object it rated before. Rows loaded with the
+    # foreign key deferred get no snapshot rather than a lazy query each.
+    field = _rated_field(sender)
+    if instance.pk and field not in instance.get_deferred_fields():
+        instance._stored_rated_id = getattr(instance, field)
+    else:
+        instance._stored_rated_id = None
+
+
+def load_stored_rated_id(sender, instance, raw=False, **kwargs):
+    # Without a snapshot, read the stored row's rated object.
+    if raw or instance._state.adding or instance._stored_rated_id is not None:
+        return
+    instance._stored_rated_id = sender._base_manager.filter(pk=instance.pk).values_list(
+        _rated_field(sender), flat=True
+    ).first()
+
+
+def update_rating_on_save(sender, instance, created, raw, update_fields=None, **kwargs):
+    rated_id = getattr(instance, _rated_field(sender))
+    old_rated_id, instance._stored_rated_id = instance._stored_rated_id, rated_id
+    if raw:
+        # Fixtures carry their own aggregates.
+        return
+
+    # The review is listed on the rated object's detail page.
+    invalidate_detail(rated_model_for(sender), [rated_id, old_rated_id])
+
+    if created:
+        # Nothing was stored before, so the new review's share is exact.
+        if instance.is_approved:
+            adjust_rating(sender, rated_id, int(instance.rating), 1)
+        return
+    # update_fields may hold names or, for rows loaded with deferred
+    # fields, attnames.
+    rating_fields = {'rating', 'is_approved', RATED_FIELDS[sender], _rated_field(sender)}
+    if update_fields is not None and not rating_fields & update_fields:
+        return
+    # A delta would be taken from this copy's idea of the stored row, which
+    # a concurrent edit may have changed since it was loaded; and the save
+    # writes back every field, so even an untouched rating may change.
+    # Recount the affected objects from the stored reviews instead.
+    recompute_ratings(sender, sorted({rated_id, old_rated_id} - {None}))
+
+
+def update_rating_on_delete(sender, instance, **kwargs):
+    # Filled in by pre_delete, so a deferred key isn't loaded for a row
+    # that is gone.
+    if instance._stored_rated_id is not None:
+        recompute_ratings(sender, [instance._stored_rated_id])
+
+
+for review_model in RATED_FIELDS:
+    post_init.connect(remember_rated_id, sender=review_model)
+    pre_save.connect(load_stored_rated_id, sender=review_model)
+    post_save.connect(update_rating_on_save, sender=review_model)
+    pre_delete.connect(load_stored_rated_id, sender=review_model)
+    post_delete.connect(update_rating_on_delete, sender=review_model)
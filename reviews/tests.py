@@ -1,3 +1,566 @@
+import csv
+import json
+import math
+import os
+import random
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.admin import helpers
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Avg, Count
+from django.db.models.fields.files import FieldFile
+from django.shortcuts import get_object_or_404
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+
+from accounts.forms import LocalGuideForm
+from accounts.models import User
+from bookings.forms import AccommodationForm
+from bookings.models import Accommodation
+from destinations.forms import DestinationForm
+from destinations.models import Destination
+from .export import export_lines
+from .models import AccommodationReview, DestinationReview, GuideReview, Ranking, SimilarDestination
+from .rankings import ranked_lists, refresh_rankings
+from .recommendations import compute_neighbours, picks_for, refresh_neighbours
+from .ratings import RATED_FIELDS, recompute_ratings, set_approval
+from safar_sathi.testing import QueryBudgetTestMixin, QueryPlanTestMixin, create_catalog, grow_catalog
+
+
+class ReviewQueryPlanTests(QueryPlanTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+
+    def test_destination_review_list(self):
+        self.assertIndexedQueries(
+            reverse('reviews:destination_review_list', args=[self.catalog['destination'].pk])
+        )
+
+    def test_accommodation_review_list(self):
+        self.assertIndexedQueries(
+            reverse('reviews:accommodation_review_list', args=[self.catalog['accommodation'].pk])
+        )
+
+
+class ReviewQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = grow_catalog(create_catalog())
+
+    def test_review_lists(self):
+        self.assertWithinQueryBudget(
+            reverse('reviews:destination_review_list', args=[self.catalog['destination'].pk])
+        )
+        self.assertWithinQueryBudget(
+            reverse('reviews:accommodation_review_list', args=[self.catalog['accommodation'].pk])
+        )
+
+    def test_review_forms(self):
+        self.client.force_login(User.objects.create_user(username='newcomer', password='password'))
+        self.assertWithinQueryBudget(reverse('reviews:destination_review', args=[self.catalog['destination'].pk]))
+        self.assertWithinQueryBudget(
+            reverse('reviews:accommodation_review', args=[self.catalog['accommodation'].pk])
+        )
+        self.assertWithinQueryBudget(reverse('reviews:guide_review', args=[self.catalog['guide'].pk]))
+
+    def test_submit_review(self):
+        destination = Destination.objects.create(
+            name='Ratargul', description='Swamp forest.', category='natural', location='Sylhet',
+            best_time_to_visit='Monsoon', created_by=self.catalog['user'],
+        )
+        self.client.force_login(self.catalog['user'])
+        self.assertWithinQueryBudget(
+            reverse('reviews:destination_review', args=[destination.pk]),
+            {'rating': 5, 'content': 'Boat ride through the trees.'},
+            method='post', status_code=302,
+        )
+
+
+class ReviewExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = grow_catalog(create_catalog())
+        cls.admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='password')
+
+    def export(self, model, action, selected):
+        self.client.force_login(self.admin)
+        return self.client.post(reverse(f'admin:reviews_{model._meta.model_name}_changelist'), {
+            'action': action, helpers.ACTION_CHECKBOX_NAME: [review.pk for review in selected],
+        })
+
+    def test_admin_csv_export(self):
+        selected = list(AccommodationReview.objects.order_by('pk')[:3])
+        response = self.export(AccommodationReview, 'export_csv', selected)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="accommodationreviews-', response['Content-Disposition'])
+
+        rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([int(row['id']) for row in rows], [review.pk for review in selected])
+        self.assertEqual(rows[0]['accommodation'], selected[0].accommodation.name)
+        self.assertEqual(rows[0]['destination'], selected[0].accommodation.destination.name)
+        self.assertEqual(rows[0]['user'], selected[0].user.username)
+
+    def test_csv_cells_never_start_a_formula(self):
+        review = AccommodationReview.objects.order_by('pk')[0]
+        AccommodationReview.objects.filter(pk=review.pk).update(content='=HYPERLINK("http://example.com")')
+        User.objects.filter(pk=review.user_id).update(username='@sum')
+        response = self.export(AccommodationReview, 'export_csv', [review])
+        [row] = csv.DictReader(StringIO(b''.join(response.streaming_content).decode()))
+        self.assertEqual(row['content'], '\'=HYPERLINK("http://example.com")')
+        self.assertEqual(row['user'], "'@sum")
+        self.assertEqual(row['rating'], str(review.rating))
+
+        # JSON Lines isn't opened by spreadsheets and keeps the text as is.
+        [line] = export_lines(AccommodationReview.objects.filter(pk=review.pk), 'jsonl')
+        self.assertEqual(json.loads(line)['content'], '=HYPERLINK("http://example.com")')
+
+    def test_admin_jsonl_export(self):
+        selected = list(GuideReview.objects.order_by('pk')[:2])
+        response = self.export(GuideReview, 'export_jsonl', selected)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['id'] for row in rows], [review.pk for review in selected])
+        self.assertEqual(rows[0]['guide'], selected[0].guide.user.username)
+        self.assertEqual(rows[0]['rating'], selected[0].rating)
+
+    def test_export_reads_in_chunks(self):
+        reviews = AccommodationReview.objects.all()
+        with self.assertNumQueries(1):
+            lines = list(export_lines(reviews, 'jsonl', chunk_size=2))
+        self.assertEqual(len(lines), reviews.count())
+
+    def test_command_writes_file(self):
+        pending = AccommodationReview.objects.order_by('pk')[0]
+        AccommodationReview.objects.filter(pk=pending.pk).update(is_approved=False)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'reviews.jsonl')
+        stdout = StringIO()
+        call_command('export_reviews', 'accommodation', output=path, pending=True, stdout=stdout)
+        self.assertIn('Wrote 1 reviews', stdout.getvalue())
+        with open(path) as f:
+            [row] = [json.loads(line) for line in f]
+        self.assertEqual(row['id'], pending.pk)
+        self.assertFalse(row['is_approved'])
+
+
+class IncrementalRatingTests(TestCase):
+    """The per-review signal updates must match a full recompute."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+        cls.other = Destination.objects.create(
+            name='Sajek', description='Hills.', category='mountain', location='Rangamati',
+            country='Bangladesh', created_by=cls.catalog['user'],
+        )
+        cls.users = [
+            User.objects.create(username=f'reviewer{n}', email=f'reviewer{n}@example.com') for n in range(3)
+        ]
+
+    def assertMatchesRecompute(self):
+        fields = ('pk', 'rating_sum', 'rating_count', 'rating')
+        stored = list(Destination.objects.order_by('pk').values_list(*fields))
+        recompute_ratings(DestinationReview)
+        self.assertEqual(stored, list(Destination.objects.order_by('pk').values_list(*fields)))
+
+    def review(self, user, rating, destination=None, **kwargs):
+        return DestinationReview.objects.create(
+            destination=destination or self.catalog['destination'], user=user,
+            content='Been there.', rating=rating, **kwargs
+        )
+
+    def test_create(self):
+        self.review(self.users[0], 2)
+        self.review(self.users[1], 4, is_approved=False)
+        self.assertMatchesRecompute()
+        destination = Destination.objects.get(pk=self.catalog['destination'].pk)
+        self.assertEqual((destination.rating_sum, destination.rating_count), (7, 2))
+
+    def test_edit(self):
+        review = self.review(self.users[0], 2)
+        review.rating = 3
+        review.save()
+        self.assertMatchesRecompute()
+
+    def test_approve_and_unapprove(self):
+        review = self.review(self.users[0], 2, is_approved=False)
+        review.is_approved = True
+        review.save()
+        self.assertMatchesRecompute()
+        review.is_approved = False
+        review.save()
+        self.assertMatchesRecompute()
+
+    def test_delete(self):
+        self.review(self.users[0], 1).delete()
+        DestinationReview.objects.only('pk').get(user=self.catalog['user']).delete()
+        self.assertMatchesRecompute()
+
+    def test_move_to_another_destination(self):
+        review = self.review(self.users[0], 1)
+        review.destination = self.other
+        review.save()
+        self.assertMatchesRecompute()
+
+    def test_move_with_deferred_fields(self):
+        review = self.review(self.users[0], 1)
+        review = DestinationReview.objects.only('pk', 'content').get(pk=review.pk)
+        review.destination = self.other
+        review.save()
+        self.assertMatchesRecompute()
+        self.assertEqual(Destination.objects.get(pk=self.other.pk).rating_count, 1)
+
+    def test_concurrent_edits_of_stale_copies(self):
+        review = self.review(self.users[0], 1)
+        first, second = DestinationReview.objects.get(pk=review.pk), DestinationReview.objects.get(pk=review.pk)
+        first.rating = 5
+        first.save()
+        # Both copies were loaded with a rating of 1; the second save wins.
+        second.rating = 4
+        second.save()
+        self.assertMatchesRecompute()
+        destination = Destination.objects.get(pk=self.catalog['destination'].pk)
+        self.assertEqual((destination.rating_sum, destination.rating_count), (9, 2))
+
+        # A content edit writes the stale rating back, and a stale copy is
+        # deleted after another edit.
+        first.content = 'Windy.'
+        first.save()
+        self.assertMatchesRecompute()
+        second.rating = 2
+        second.save()
+        first.delete()
+        self.assertMatchesRecompute()
+
+
+class EditWhileReviewedTests(TestCase):
+    """An edit form open while a review comes in keeps the new rating."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='password'
+        )
+        cls.reviewer = User.objects.create(username='reviewer', email='reviewer@example.com')
+
+    def edit_while_reviewed(self, url_name, module, form_class, rated, review_model):
+        rows = type(rated).objects.values('rating_sum', 'rating_count')
+        before = rows.get(pk=rated.pk)
+        # The unchanged form as a browser would post it, files left out.
+        form = form_class(instance=rated)
+        data = {}
+        for name, field in form.fields.items():
+            value = form.initial.get(name, field.initial)
+            if value is not None and not isinstance(value, FieldFile):
+                data[name] = value
+
+        def load_then_review(*args, **kwargs):
+            obj = get_object_or_404(*args, **kwargs)
+            # Posted after the form's row is loaded, before it is saved.
+            review_model.objects.create(
+                **{RATED_FIELDS[review_model]: rated}, user=self.reviewer, content='Lovely.', rating=1,
+            )
+            return obj
+
+        self.client.force_login(self.admin)
+        with patch(f'{module}.get_object_or_404', side_effect=load_then_review):
+            response = self.client.post(reverse(url_name, args=[rated.pk]), data)
+        self.assertEqual(response.status_code, 302)
+        stored = rows.get(pk=rated.pk)
+        self.assertEqual(stored['rating_count'], before['rating_count'] + 1)
+        recompute_ratings(review_model, [rated.pk])
+        self.assertEqual(stored, rows.get(pk=rated.pk))
+
+    def test_destination_update(self):
+        self.edit_while_reviewed(
+            'destinations:destination_update', 'destinations.views', DestinationForm,
+            self.catalog['destination'], DestinationReview,
+        )
+
+    def test_accommodation_update(self):
+        self.edit_while_reviewed(
+            'bookings:accommodation_update', 'bookings.views', AccommodationForm,
+            self.catalog['accommodation'], AccommodationReview,
+        )
+
+    def test_guide_update(self):
+        self.edit_while_reviewed(
+            'accounts:guide_update', 'accounts.views', LocalGuideForm, self.catalog['guide'], GuideReview,
+        )
+
+
+class BulkModerationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        catalog = create_catalog()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='password'
+        )
+        users = User.objects.bulk_create(User(username=f'reviewer{n}', email=f'reviewer{n}@example.com') for n in range(525))
+        cls.accommodations = Accommodation.objects.bulk_create(
+            Accommodation(
+                name=f'Hill Cottage {n}', accommodation_type='homestay', destination=catalog['destination'],
+                address='Hill Road', description='Quiet.', amenities='Wi-Fi', price_per_night=1500,
+                phone='01700000000', email='stay@example.com', created_by=catalog['user'],
+            )
+            for n in range(20)
+        )
+        # The first cottage only gets five-star reviews, so moderating the
+        # one-star ones leaves it alone.
+        AccommodationReview.objects.bulk_create(
+            AccommodationReview(
+                accommodation=accommodation, user=user, content='Stayed here.',
+                rating=5 if i == 0 else (i + j) % 5 + 1,
+            )
+            for i, accommodation in enumerate(cls.accommodations)
+            for j, user in enumerate(users)
+        )
+        recompute_ratings(AccommodationReview)
+
+    def moderate(self, action, **filters):
+        self.client.force_login(self.admin)
+        url = reverse('admin:reviews_accommodationreview_changelist')
+        with CaptureQueriesContext(connection) as context:
+            self.client.post(f'{url}?{urlencode(filters)}', {
+                'action': action, 'select_across': 1, 'index': 0,
+                helpers.ACTION_CHECKBOX_NAME: [AccommodationReview.objects.order_by('pk')[0].pk],
+            })
+        return context
+
+    def assertRatingsMatchReviews(self):
+        expected = {
+            row['accommodation']: row
+            for row in AccommodationReview.objects.filter(is_approved=True).values('accommodation')
+            .annotate(average=Avg('rating'), total=Count('pk')).order_by()
+        }
+        for accommodation in Accommodation.objects.all():
+            row = expected.get(accommodation.pk, {'average': 0, 'total': 0})
+            self.assertEqual(accommodation.rating_count, row['total'])
+            self.assertAlmostEqual(float(accommodation.rating), row['average'], places=1)
+
+    def test_disapprove_and_approve_recompute_ratings(self):
+        self.assertGreater(AccommodationReview.objects.count(), 10000)
+        untouched = self.accommodations[0]
+        # A rating drifted by hand stays as it is unless the action rates it.
+        Accommodation.objects.filter(pk=untouched.pk).update(rating=1)
+
+        context = self.moderate('disapprove_reviews', rating__exact=1)
+        self.assertEqual(AccommodationReview.objects.filter(is_approved=False).count(), 19 * 105)
+        self.assertLess(len(context), 15)
+        [update] = [q['sql'] for q in context.captured_queries if q['sql'].startswith('UPDATE "bookings_')]
+        self.assertIn('IN (', update)
+        self.assertEqual(Accommodation.objects.get(pk=untouched.pk).rating, 1)
+        Accommodation.objects.filter(pk=untouched.pk).update(rating=5)
+        self.assertRatingsMatchReviews()
+
+        self.moderate('approve_reviews', rating__exact=1)
+        self.assertFalse(AccommodationReview.objects.filter(is_approved=False).exists())
+        self.assertRatingsMatchReviews()
+
+    def test_unchanged_selection_updates_nothing(self):
+        context = self.moderate('approve_reviews', rating__exact=2)
+        self.assertFalse([q for q in context.captured_queries if q['sql'].startswith('UPDATE')])
+
+    def test_selection_filtered_on_approval(self):
+        destinations = Destination.objects.bulk_create(
+            Destination(
+                name=f'Char {n}', description='River island.', category='natural', location='Bhola',
+                best_time_to_visit='Winter', created_by=self.admin,
+            )
+            for n in range(1001)
+        )
+        DestinationReview.objects.bulk_create(
+            DestinationReview(destination=destination, user=self.admin, content='Visited.', rating=4)
+            for destination in destinations
+        )
+        recompute_ratings(DestinationReview)
+        chars = Destination.objects.filter(name__startswith='Char ')
+        reviews = DestinationReview.objects.filter(destination__in=chars)
+
+        # As the admin's "approved" filter gives it: nothing in the selection
+        # matches once the update has run.
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(set_approval(reviews.filter(is_approved=True), False), 1001)
+        updates = [q['sql'] for q in context.captured_queries if q['sql'].startswith('UPDATE "destinations_')]
+        self.assertEqual(len(updates), 1)
+        self.assertFalse(chars.filter(rating_count__gt=0).exists())
+
+        self.assertEqual(set_approval(reviews.filter(is_approved=False), True), 1001)
+        self.assertEqual(chars.filter(rating_count=1, rating=4).count(), 1001)
+
+
+class RankingTests(QueryBudgetTestMixin, QueryPlanTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+        user = cls.catalog['user']
+        reviewers = User.objects.bulk_create(User(username=f'fan{n}', email=f'fan{n}@example.com') for n in range(20))
+        cls.favourite, cls.rising, cls.one_hit = Destination.objects.bulk_create(
+            Destination(
+                name=name, description='Worth a visit.', category='hill', location='Sylhet',
+                best_time_to_visit='Winter', created_by=user,
+            )
+            for name in ('Old Favourite', 'Rising Star', 'One Hit')
+        )
+        now = timezone.now()
+        # Loved for years but quiet lately; four stars from five people this
+        # week; one five-star review yesterday.
+        cls.add_reviews(cls.favourite, reviewers, 5, now - timedelta(days=60))
+        cls.add_reviews(cls.rising, reviewers[:5], 4, now)
+        cls.add_reviews(cls.one_hit, reviewers[:1], 5, now - timedelta(days=1))
+        recompute_ratings(DestinationReview)
+
+    @staticmethod
+    def add_reviews(destination, users, rating, created_at):
+        reviews = DestinationReview.objects.bulk_create(
+            DestinationReview(destination=destination, user=user, content='Went there.', rating=rating)
+            for user in users
+        )
+        # created_at is auto_now_add, so it's set after the fact.
+        DestinationReview.objects.filter(pk__in=[review.pk for review in reviews]).update(created_at=created_at)
+
+    def ranked(self, board, kind):
+        return [ranking.item for k, _, rankings in ranked_lists()[board] if k == kind for ranking in rankings]
+
+    def test_trending_favours_recent_reviews(self):
+        refresh_rankings()
+        self.assertEqual(
+            self.ranked(Ranking.TRENDING, 'destination'),
+            [self.rising, self.catalog['destination'], self.one_hit],
+        )
+
+    def test_top_rated_discounts_few_reviews(self):
+        refresh_rankings()
+        top = self.ranked(Ranking.TOP_RATED, 'destination')
+        self.assertEqual(top[0], self.favourite)
+        self.assertEqual(top[-1], self.rising)
+        self.assertLess(top.index(self.catalog['destination']), top.index(self.rising))
+
+    def test_unlisted_objects_are_left_out(self):
+        Accommodation.objects.update(is_available=False)
+        refresh_rankings()
+        self.assertEqual(self.ranked(Ranking.TRENDING, 'accommodation'), [])
+        self.assertEqual(self.ranked(Ranking.TOP_RATED, 'accommodation'), [])
+        self.assertEqual(self.ranked(Ranking.TRENDING, 'guide'), [self.catalog['guide']])
+
+    def test_refresh_replaces_the_lists(self):
+        self.assertEqual(refresh_rankings(size=2), Ranking.objects.count())
+        call_command('refresh_rankings', '--size', '1', stdout=StringIO())
+        self.assertEqual(
+            sorted(Ranking.objects.values_list('board', 'kind', 'position')),
+            sorted((board, kind, 1) for board in ('trending', 'top_rated') for kind in ('accommodation', 'destination', 'guide')),
+        )
+
+    def test_home_page(self):
+        url = reverse('home')
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Trending now')
+
+        call_command('refresh_rankings', stdout=StringIO())
+        response = self.assertWithinQueryBudget(url)
+        self.assertContains(response, 'Trending now')
+        self.assertContains(response, 'Rising Star')
+        self.assertContains(response, 'Sea Pearl Resort')
+        self.assertContains(response, reverse('accounts:guide_detail', args=[self.catalog['guide'].pk]))
+        self.assertIndexedQueries(url)
+
+
+class RecommendationTests(QueryBudgetTestMixin, QueryPlanTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+        user = cls.catalog['user']
+        fans = User.objects.bulk_create(User(username=f'fan{n}', email=f'fan{n}@example.com') for n in range(5))
+        cls.beach, cls.island, cls.city, cls.hill = Destination.objects.bulk_create(
+            Destination(
+                name=name, description='Worth a visit.', category='beach', location='Chattogram',
+                best_time_to_visit='Winter', created_by=user,
+            )
+            for name in ('Inani Beach', 'Saint Martin', 'Dhaka City', 'Bandarban Hills')
+        )
+        ratings = [(fan, cls.beach, 5) for fan in fans[:4]] + [(fan, cls.island, 5) for fan in fans[:4]]
+        # The same fans dislike the city; the hill has a single fan in common.
+        ratings += [(fan, cls.city, 1) for fan in fans[:4]]
+        ratings += [(fans[4], cls.island, 4), (fans[4], cls.hill, 5)]
+        # Two fans also loved the destination the traveller reviewed.
+        ratings += [(fan, cls.catalog['destination'], 5) for fan in fans[:2]]
+        DestinationReview.objects.bulk_create(
+            DestinationReview(destination=destination, user=fan, content='Went there.', rating=rating)
+            for fan, destination, rating in ratings
+        )
+
+    def test_matches_dense_cosine(self):
+        rng = random.Random(7)
+        users = {
+            user: [(item, rng.choice([-2, -1, 1, 2])) for item in rng.sample(range(30), rng.randint(1, 12))]
+            for user in range(80)
+        }
+        neighbours = compute_neighbours(users, k=5, min_common=2)
+
+        columns = {item: {} for item in range(30)}
+        for user, ratings in users.items():
+            for item, rating in ratings:
+                columns[item][user] = rating
+        for item in range(30):
+            expected = []
+            for other in range(30):
+                common = columns[item].keys() & columns[other].keys()
+                if other == item or len(common) < 2:
+                    continue
+                dot = sum(columns[item][u] * columns[other][u] for u in common)
+                norm = math.sqrt(sum(r * r for r in columns[item].values()) * sum(r * r for r in columns[other].values()))
+                if dot > 0:
+                    expected.append((dot / norm, other))
+            expected = sorted(expected, reverse=True)[:5]
+            got = neighbours.get(item, [])
+            self.assertEqual([other for other, _ in got], [other for _, other in expected])
+            for (_, similarity), (expected_similarity, _) in zip(got, expected):
+                self.assertAlmostEqual(similarity, expected_similarity)
+
+    def test_neighbours(self):
+        refresh_neighbours(DestinationReview)
+        neighbours = {
+            (row.source_id, row.target_id): row.score for row in SimilarDestination.objects.all()
+        }
+        self.assertAlmostEqual(neighbours[self.beach.pk, self.island.pk], neighbours[self.island.pk, self.beach.pk])
+        # Disliked together isn't liked together; one shared fan isn't enough.
+        self.assertNotIn((self.beach.pk, self.city.pk), neighbours)
+        self.assertNotIn((self.island.pk, self.hill.pk), neighbours)
+        self.assertIn((self.catalog['destination'].pk, self.beach.pk), neighbours)
+
+    def test_detail_page_lists_neighbours(self):
+        url = reverse('destinations:destination_detail', args=[self.beach.pk])
+        response = self.client.get(url)
+        self.assertNotContains(response, 'Also Liked')
+        etag = response['ETag']
+
+        call_command('compute_recommendations', stdout=StringIO())
+        response = self.assertWithinQueryBudget(url)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Also Liked')
+        self.assertContains(response, 'Saint Martin')
+        self.assertNotContains(response, 'Dhaka City')
+        self.assertIndexedQueries(url)
+
+    def test_home_page_picks(self):
+        refresh_neighbours(DestinationReview)
+        traveller = self.catalog['user']
+        self.assertEqual(set(picks_for(traveller)), {self.beach, self.island})
 
-# Create your tests here.
+        self.client.force_login(traveller)
+        response = self.assertWithinQueryBudget(reverse('home'))
+        self.assertContains(response, 'Picked for you')
+        self.assertContains(response, 'Inani Beach')
+        self.assertNotContains(response, 'Dhaka City')
@@ -4,10 +4,12 @@ from django.contrib import messages
 from destinations.models import Destination
 from bookings.models import Accommodation
 from accounts.models import LocalGuide
+from safar_sathi.budgets import query_budget
 from .models import DestinationReview, AccommodationReview, GuideReview
 from .forms import DestinationReviewForm, AccommodationReviewForm, GuideReviewForm
 
 
+@query_budget(6)
 @login_required
 def destination_review(request, destination_id):
     destination = get_object_or_404(Destination, pk=destination_id)
@@ -37,12 +39,13 @@ def destination_review(request, destination_id):
     })
 
 
+@query_budget(4)
 def destination_review_list(request, destination_id):
     destination = get_object_or_404(Destination, pk=destination_id)
     reviews = DestinationReview.objects.filter(
         destination=destination,
         is_approved=True
-    ).order_by('-created_at')
+    ).select_related('user').order_by('-created_at')
 
     return render(request, 'reviews/destination_review_list.html', {
         'destination': destination,
@@ -50,6 +53,7 @@ def destination_review_list(request, destination_id):
     })
 
 
+@query_budget(7)
 @login_required
 def accommodation_review(request, accommodation_id):
     accommodation = get_object_or_404(Accommodation, pk=accommodation_id)
@@ -66,14 +70,6 @@ def accommodation_review(request, accommodation_id):
             review.user = request.user
             review.accommodation = accommodation
             review.save()
-
-            # Update accommodation's average rating
-            reviews = AccommodationReview.objects.filter(accommodation=accommodation, is_approved=True)
-            if reviews.exists():
-                avg_rating = sum(review.rating for review in reviews) / reviews.count()
-                accommodation.rating = round(avg_rating, 1)
-                accommodation.save()
-
             messages.success(request, 'Your review has been submitted successfully!')
             return redirect('bookings:accommodation_detail', pk=accommodation_id)
         else:
@@ -87,12 +83,13 @@ def accommodation_review(request, accommodation_id):
     })
 
 
+@query_budget(4)
 def accommodation_review_list(request, accommodation_id):
     accommodation = get_object_or_404(Accommodation, pk=accommodation_id)
     reviews = AccommodationReview.objects.filter(
         accommodation=accommodation,
         is_approved=True
-    ).order_by('-created_at')
+    ).select_related('user').order_by('-created_at')
 
     return render(request, 'reviews/accommodation_review_list.html', {
         'accommodation': accommodation,
@@ -100,6 +97,7 @@ def accommodation_review_list(request, accommodation_id):
     })
 
 
+@query_budget(7)
 @login_required
 def guide_review(request, guide_id):
     guide = get_object_or_404(LocalGuide, pk=guide_id)
@@ -116,14 +114,6 @@ def guide_review(request, guide_id):
             review.user = request.user
             review.guide = guide
             review.save()
-
-            # Update guide's average rating
-            reviews = GuideReview.objects.filter(guide=guide, is_approved=True)
-            if reviews.exists():
-                avg_rating = sum(review.rating for review in reviews) / reviews.count()
-                guide.rating = round(avg_rating, 1)
-                guide.save()
-
             messages.success(request, 'Your review has been submitted successfully!')
             return redirect('accounts:guide_detail', pk=guide_id)
         else:
@@ -137,12 +127,13 @@ def guide_review(request, guide_id):
     })
 
 
+@query_budget(4)
 def guide_review_list(request, guide_id):
     guide = get_object_or_404(LocalGuide, pk=guide_id)
     reviews = GuideReview.objects.filter(
         guide=guide,
         is_approved=True
-    ).order_by('-created_at')
+    ).select_related('user').order_by('-created_at')
 
     return render(request, 'reviews/guide_review_list.html', {
         'guide': guide,
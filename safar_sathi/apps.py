@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class SafarSathiConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'safar_sathi'
+
+    def ready(self):
+        # Related managers are built on first use, so the detector has to be
+        # in place before any request touches a relation.
+        if getattr(settings, 'NPLUSONE_DETECTION', False):
+            from .nplusone import install
+            install()
+        if getattr(settings, 'REQUEST_TIMING_ENABLED', False):
+            from .middleware import install_template_timing
+            install_template_timing()
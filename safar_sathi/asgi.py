@@ -3,6 +3,23 @@ ASGI config for safar_sathi project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Each detail view (destination, accommodation, guide, itinerary) has an
+async twin at ``<detail url>async/`` that runs the same independent
+queries concurrently (see safar_sathi/concurrency.py). Serve the site from
+an ASGI server to use them, e.g. with uvicorn::
+
+    uvicorn safar_sathi.asgi:application --host 0.0.0.0 --port 8000 --workers 4
+
+or gunicorn managing uvicorn workers::
+
+    gunicorn safar_sathi.asgi:application -k uvicorn.workers.UvicornWorker -w 4
+
+Sync views still work; Django runs them in a thread per request. The
+project's own middleware runs natively in either mode. Compare the sync
+and async detail views, and the two deployment paths, under load with
+``manage.py benchmark_views --only detail --concurrency 8`` and the same
+with ``--asgi``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -14,3 +31,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'safar_sathi.settings')
 
 application = get_asgi_application()
+
+# Fill the in-process autocomplete indexes from each process's first request.
+from safar_sathi import autocomplete  # noqa: E402
+
+autocomplete.warm_on_first_request()
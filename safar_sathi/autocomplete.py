@@ -0,0 +1,409 @@
+"""
+In-process typeahead over names, without a query per keystroke.
+
+Each ``SuggestionIndex`` keeps a prefix trie of the words in a model's
+names and places. Every trie node holds the best-weighted rows under it,
+so a prefix is answered by walking one node per character. An index is
+loaded from the database the first time it is used in a process, kept up
+to date by the model signals of that process, and reloaded in the
+background every ``AUTOCOMPLETE_REBUILD_SECONDS`` to pick up changes made
+by other processes and rating updates made with ``update()``. Servers
+start loading them in the background on the first request each process
+handles (see ``warm_on_first_request()``), so forked workers load their own.
+"""
+import bisect
+import heapq
+import logging
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import DatabaseError, connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.urls import reverse
+
+# Rows kept per trie node. Multi-word queries filter these, so keep a
+# few more than a dropdown shows.
+TOP_K = 32
+# Words are indexed up to this many characters.
+MAX_TERM_LENGTH = 20
+# Most rows a multi-word query checks when the best lists fall short.
+MAX_SCAN = 2000
+
+WORD_RE = re.compile(r'\w+')
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+# The process that started warming the indexes, and its guard.
+_warmed_pid = None
+_warm_lock = threading.Lock()
+
+
+def tokenize(text):
+    text = unicodedata.normalize('NFKC', text or '').casefold()
+    return [word[:MAX_TERM_LENGTH] for word in WORD_RE.findall(text.replace("'", '').replace('’', ''))]
+
+
+def popularity(rating, review_count):
+    """Ranking weight: the rating, plus a bonus that grows slowly with reviews."""
+    return float(rating or 0) + math.log1p(review_count or 0)
+
+
+class _Node:
+    __slots__ = ('children', 'keys', 'top', 'count')
+
+    def __init__(self):
+        self.children = {}
+        self.keys = None  # rows with a word ending here
+        self.top = []     # best (-weight, key) pairs under this node, sorted
+        self.count = 0    # words ending under this node
+
+
+class PrefixTrie:
+    """Keys with words and a weight, searchable by word prefix."""
+
+    def __init__(self, size=TOP_K):
+        self.size = size
+        self.root = _Node()
+        self.entries = {}  # key -> (weight, words)
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def build(cls, rows, size=TOP_K):
+        """A trie of ``(key, words, weight)`` rows, filled in one pass."""
+        trie = cls(size)
+        for key, words, weight in rows:
+            words = tuple(dict.fromkeys(words))
+            trie.entries[key] = (weight, words)
+            for word in words:
+                trie._walk(word, create=True)[-1].keys.add(key)
+        # Fill every node's best list from its children, deepest first.
+        stack, ordered = [trie.root], []
+        while stack:
+            node = stack.pop()
+            ordered.append(node)
+            stack.extend(node.children.values())
+        for node in reversed(ordered):
+            node.top = trie._best(node)
+            node.count = len(node.keys or ()) + sum(child.count for child in node.children.values())
+        return trie
+
+    def _walk(self, word, create=False):
+        """The nodes from the root down to ``word``, or ``None`` if it isn't there."""
+        path = [self.root]
+        for char in word:
+            child = path[-1].children.get(char)
+            if child is None:
+                if not create:
+                    return None
+                child = path[-1].children[char] = _Node()
+            path.append(child)
+        if create and path[-1].keys is None:
+            path[-1].keys = set()
+        return path
+
+    def add(self, key, words, weight):
+        if key in self.entries:
+            self.remove(key)
+        words = tuple(dict.fromkeys(words))
+        self.entries[key] = (weight, words)
+        item = (-weight, key)
+        nodes = {}
+        for word in words:
+            path = self._walk(word, create=True)
+            path[-1].keys.add(key)
+            for node in path[1:]:
+                node.count += 1
+                nodes[id(node)] = node
+        for node in nodes.values():
+            top = node.top
+            if len(top) < self.size or item < top[-1]:
+                bisect.insort(top, item)
+                del top[self.size:]
+
+    def remove(self, key):
+        if key not in self.entries:
+            return
+        weight, words = self.entries.pop(key)
+        item = (-weight, key)
+        # (depth, parent, char, node) for every node on the words' paths.
+        steps = {}
+        for word in words:
+            path = self._walk(word)
+            path[-1].keys.discard(key)
+            for depth, node in enumerate(path[1:], 1):
+                node.count -= 1
+                steps[id(node)] = (depth, path[depth - 1], word[depth - 1], node)
+        # Deepest first, so each node refills from already updated children.
+        for depth, parent, char, node in sorted(steps.values(), key=lambda step: -step[0]):
+            if not node.keys and not node.children:
+                del parent.children[char]
+            elif item in node.top:
+                node.top = self._best(node)
+
+    def _best(self, node):
+        # A key under several children appears as the same pair in each.
+        candidates = {(-self.entries[key][0], key) for key in node.keys or ()}
+        for child in node.children.values():
+            candidates.update(child.top)
+        return heapq.nsmallest(self.size, candidates)
+
+    def search(self, words, limit, scan=MAX_SCAN):
+        """
+        ``(weight, key)`` of the best keys with a word starting with each
+        of ``words``, best first.
+
+        A single word is answered from its node. With several, candidates
+        come from the word with the fewest rows under it, filtered by the
+        others; if its best list isn't enough, up to ``scan`` of the rows
+        under it are checked.
+        """
+        if not words:
+            return []
+        nodes = []
+        for word in words:
+            path = self._walk(word)
+            if path is None:
+                return []
+            nodes.append(path[-1])
+        node = min(nodes, key=lambda node: node.count)
+        if len(words) == 1:
+            return [(-negative_weight, key) for negative_weight, key in node.top[:limit]]
+
+        def matches(key):
+            entry_words = self.entries[key][1]
+            return all(any(w.startswith(word) for w in entry_words) for word in words)
+
+        results = [(-negative_weight, key) for negative_weight, key in node.top if matches(key)]
+        if len(results) >= limit or node.count <= len(node.top):
+            return results[:limit]
+        keys, stack = set(), [node]
+        while stack and len(keys) < scan:
+            current = stack.pop()
+            keys.update(current.keys or ())
+            stack.extend(current.children.values())
+        results = sorted((-self.entries[key][0], key) for key in keys if matches(key))
+        return [(-negative_weight, key) for negative_weight, key in results[:limit]]
+
+
+class SuggestionIndex:
+    """
+    Typeahead over ``model``.
+
+    ``fields`` maps names to ORM lookups read for each row; the words of
+    the ``terms`` fields are indexed, and ``label``/``detail`` turn a row
+    dict into display text. Rows are weighted by their rating and review
+    count (see ``popularity``).
+    """
+
+    def __init__(self, kind, model, fields, terms, label, detail, url_name, queryset=None):
+        self.kind = kind
+        self.model = model
+        self.fields = dict(fields)
+        self.terms = terms
+        self.label = label
+        self.detail = detail
+        self.url_name = url_name
+        self._queryset = queryset
+        self._url_format = None
+        self._trie = None
+        self._display = {}
+        self._loaded_at = None
+        self._reloading = None
+        self._lock = threading.RLock()
+        registry[kind] = self
+
+    def queryset(self):
+        if self._queryset is not None:
+            return self._queryset.all()
+        return self.model._default_manager.all()
+
+    def _rows(self, queryset):
+        names = list(self.fields)
+        lookups = [self.fields[name] for name in names]
+        for pk, rating, review_count, *values in queryset.values_list(
+            'pk', 'rating', 'rating_count', *lookups
+        ).order_by().iterator(chunk_size=5000):
+            row = dict(zip(names, values))
+            words = [word for name in self.terms for word in tokenize(row[name])]
+            yield pk, words, popularity(rating, review_count), (self.label(row), self.detail(row))
+
+    def _load(self):
+        display = {}
+
+        def rows():
+            for pk, words, weight, shown in self._rows(self.queryset()):
+                display[pk] = shown
+                yield pk, words, weight
+
+        return PrefixTrie.build(rows()), display
+
+    @property
+    def loaded(self):
+        return self._trie is not None
+
+    def unload(self):
+        with self._lock:
+            self._trie, self._display, self._loaded_at = None, {}, None
+
+    def ensure_loaded(self):
+        if self._trie is None:
+            with self._lock:
+                if self._trie is None:
+                    self._trie, self._display = self._load()
+                    self._loaded_at = time.monotonic()
+            return
+        max_age = getattr(settings, 'AUTOCOMPLETE_REBUILD_SECONDS', None)
+        if max_age and self._reloading is None and time.monotonic() - self._loaded_at > max_age:
+            self._start_reload()
+
+    def warm(self):
+        try:
+            self.ensure_loaded()
+        except DatabaseError:
+            # Not migrated yet, say; the first search loads it instead.
+            logger.warning('Could not load the %s autocomplete index.', self.kind, exc_info=True)
+        finally:
+            connection.close()
+
+    def _start_reload(self):
+        with self._lock:
+            if self._reloading is not None:
+                return
+            self._reloading = set()
+        threading.Thread(target=self._reload, name=f'autocomplete-{self.kind}', daemon=True).start()
+
+    def _reload(self):
+        try:
+            trie, display = self._load()
+            with self._lock:
+                changed, self._reloading = self._reloading, None
+                self._trie, self._display = trie, display
+                self._loaded_at = time.monotonic()
+            # Rows saved while loading may be missing from the new trie.
+            self._refresh(changed)
+        except DatabaseError:
+            # Keep serving the old trie; the next search past the age retries.
+            logger.warning('Could not reload the %s autocomplete index.', self.kind, exc_info=True)
+            self._loaded_at = time.monotonic()
+        finally:
+            self._reloading = None
+            connection.close()
+
+    def refresh(self, pks):
+        """
+        Re-read rows ``pks`` into a loaded index, dropping any that are
+        gone, once the current transaction commits; a rolled-back write
+        never reaches the index.
+        """
+        pks = set(pks)
+        if pks:
+            transaction.on_commit(lambda: self._refresh(pks))
+
+    def remove(self, pks):
+        pks = set(pks)
+        if pks:
+            transaction.on_commit(lambda: self._remove(pks))
+
+    def _refresh(self, pks):
+        if not pks or self._trie is None:
+            return
+        rows = list(self._rows(self.queryset().filter(pk__in=pks)))
+        with self._lock:
+            if self._reloading is not None:
+                self._reloading |= pks
+            for pk, words, weight, shown in rows:
+                self._trie.add(pk, words, weight)
+                self._display[pk] = shown
+                pks.discard(pk)
+            for pk in pks:
+                self._trie.remove(pk)
+                self._display.pop(pk, None)
+
+    def _remove(self, pks):
+        if self._trie is None:
+            return
+        with self._lock:
+            for pk in pks:
+                self._trie.remove(pk)
+                self._display.pop(pk, None)
+
+    def search(self, words, limit):
+        """``(weight, suggestion)`` of the best matches for ``words``."""
+        self.ensure_loaded()
+        with self._lock:
+            # Formatted under the same lock as the match: a delete or reload
+            # landing in between would leave a pk with nothing to show.
+            return [(weight, self.suggestion(pk)) for weight, pk in self._trie.search(words, limit)]
+
+    def suggestion(self, pk):
+        """The result for ``pk``; call with the lock held."""
+        label, detail = self._display[pk]
+        return {'type': self.kind, 'id': pk, 'label': label, 'detail': detail, 'url': self.url(pk)}
+
+    def url(self, pk):
+        if self._url_format is None:
+            # reverse() takes tens of microseconds; reverse once with a
+            # marker and format each pk into that.
+            marker = 8642097531
+            self._url_format = reverse(self.url_name, args=[marker]).replace(str(marker), '{}')
+        return self._url_format.format(pk)
+
+    def connect(self):
+        """Keep a loaded index in step with saves and deletes of the model."""
+        uid = f'autocomplete:{self.kind}'
+        post_save.connect(self._saved, sender=self.model, dispatch_uid=uid)
+        post_delete.connect(self._deleted, sender=self.model, dispatch_uid=uid)
+
+    def _saved(self, sender, instance, raw=False, **kwargs):
+        if not raw:
+            self.refresh([instance.pk])
+
+    def _deleted(self, sender, instance, **kwargs):
+        self.remove([instance.pk])
+
+
+def suggest(query, kinds=None, limit=8):
+    """The best ``limit`` suggestions for ``query`` across ``kinds`` (all by default)."""
+    words = tokenize(query)
+    indexes = [registry[kind] for kind in kinds] if kinds else list(registry.values())
+    matches = []
+    for index in indexes:
+        matches.extend(index.search(words, limit))
+    matches.sort(key=lambda match: -match[0])
+    return [suggestion for _, suggestion in matches[:limit]]
+
+
+def warm():
+    """Load every index in background threads, so a new server's first keystrokes don't wait."""
+    for index in registry.values():
+        threading.Thread(target=index.warm, name=f'autocomplete-{index.kind}', daemon=True).start()
+
+
+def _warm_once(sender, **kwargs):
+    global _warmed_pid
+    if _warmed_pid == os.getpid():
+        return
+    with _warm_lock:
+        if _warmed_pid == os.getpid():
+            return
+        _warmed_pid = os.getpid()
+    warm()
+
+
+def warm_on_first_request():
+    """
+    Start ``warm()`` when a process handles its first request. Threads don't
+    survive a fork, so servers that fork workers after importing the
+    application (gunicorn --preload, say) warm each worker on its own.
+    """
+    request_started.connect(_warm_once, dispatch_uid='autocomplete-warm')
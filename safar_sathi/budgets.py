@@ -0,0 +1,20 @@
+def query_budget(limit):
+    """
+    Declare the most queries a view may run for one request.
+
+    Use it as a decorator on function views, or set ``query_budget`` on a
+    class-based view. ``RequestTimingMiddleware`` logs requests that go over
+    budget and the test suite fails on them.
+    """
+    def decorator(view_func):
+        view_func.query_budget = limit
+        return view_func
+    return decorator
+
+
+def get_query_budget(view_func):
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is None:
+        view_class = getattr(view_func, 'view_class', None)
+        budget = getattr(view_class, 'query_budget', None)
+    return budget
@@ -0,0 +1,87 @@
+"""
+Run independent ORM calls concurrently.
+
+``gather()`` (from async views) and ``run_concurrently()`` (from sync
+code) run each call in a thread of a shared pool, on that thread's own
+database connection, so queries that don't depend on each other overlap
+instead of running one after another. SQLite and the other database
+drivers release the GIL while a query runs, so on a multi-core machine the
+queries do run in parallel.
+
+Inside a transaction the calls run one after another on the caller's
+connection instead: other connections can't see its uncommitted writes.
+The pool threads close their connections around each call the way request
+threads do at the start and end of a request, keeping them only for
+``CONN_MAX_AGE``, so a process holds up to ``QUERY_FANOUT_WORKERS``
+database connections besides its request threads'.
+"""
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from .middleware import timed_queries
+
+_executor = None
+_executor_lock = threading.Lock()
+_worker = threading.local()
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'QUERY_FANOUT_WORKERS', 8),
+                    thread_name_prefix='query-fanout',
+                )
+    return _executor
+
+
+def _sequential():
+    # A pool thread waiting on the pool could deadlock it.
+    if getattr(_worker, 'active', False):
+        return True
+    return any(connection.in_atomic_block for connection in connections.all(initialized_only=True))
+
+
+def _run(call):
+    _worker.active = True
+    # Like a request: drop connections that are broken or past CONN_MAX_AGE.
+    close_old_connections()
+    try:
+        # Count the queries towards the request that asked for them.
+        with timed_queries():
+            return call()
+    finally:
+        close_old_connections()
+        _worker.active = False
+
+
+def _submit(call):
+    # Each call gets its own copy of the caller's context (the request's
+    # metrics, N+1 detection and so on).
+    return executor().submit(contextvars.copy_context().run, _run, call)
+
+
+def run_concurrently(*calls):
+    """Return the results of ``calls``, in order, running them concurrently."""
+    if len(calls) < 2 or _sequential():
+        return [call() for call in calls]
+    # The first call runs on this thread while the pool runs the others.
+    futures = [_submit(call) for call in calls[1:]]
+    first = calls[0]()
+    return [first, *(future.result() for future in futures)]
+
+
+async def gather(*calls):
+    """
+    ``run_concurrently()`` for async views. It runs from the request's sync
+    thread, which knows whether a transaction is open, and the event loop
+    is free while the calls run.
+    """
+    return await sync_to_async(run_concurrently)(*calls)
@@ -0,0 +1,139 @@
+"""
+Conditional GET (304 Not Modified) for detail pages.
+
+``detail_condition()`` wraps a ``view(request, pk)`` in Django's
+``condition`` decorator. A single query reads the row's ``updated_at``
+together with the newest change among the rows shown with it (photos,
+reviews, ...) and any per-viewer flags, and the ETag hashes those values
+with the viewer's identity. A client already holding the current page gets
+a 304 without the view or its template running; otherwise the view can
+reuse the flags through ``detail_stamp()``. Async views can be wrapped too.
+
+Deleting a related row or deploying new templates changes the ETag but not
+the newest ``updated_at``, so Last-Modified is taken from the time the
+current state was first served, remembered in the cache.
+"""
+import hashlib
+import os
+from asyncio import iscoroutinefunction
+from datetime import datetime, timedelta
+from functools import cache, wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache as shared_cache
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+
+def latest(model, field, column='updated_at', **filters):
+    """Newest ``column`` among the ``model`` rows whose ``field`` points at the outer row."""
+    rows = model.objects.filter(**{field: OuterRef('pk')}, **filters).order_by().values(field)
+    return Subquery(rows.annotate(latest=Max(column)).values('latest'))
+
+
+def count(model, field, **filters):
+    # Paired with latest() so deleting an older row still changes the stamp.
+    rows = model.objects.filter(**{field: OuterRef('pk')}, **filters).order_by().values(field)
+    return Subquery(rows.annotate(total=Count('pk')).values('total'))
+
+
+@cache
+def _templates_version():
+    # Template edits change the page without touching any row; fold the
+    # newest template mtime in so a deploy doesn't serve stale 304s.
+    newest = 0
+    for directory in settings.TEMPLATES[0]['DIRS']:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                newest = max(newest, os.path.getmtime(os.path.join(root, name)))
+    return str(newest)
+
+
+def _modified_since(model, pk, state, newest):
+    # Last-Modified for a page in ``state``. A new state gets at least the
+    # next whole second after the previous one, since If-Modified-Since
+    # can't tell apart two changes within the same second.
+    key = f'detail-modified:{model._meta.label_lower}:{pk}'
+    seen = shared_cache.get(key)
+    if seen is not None and seen[0] == state:
+        return seen[1]
+    modified = max(newest, timezone.now())
+    if seen is not None:
+        modified = max(modified, seen[1].replace(microsecond=0) + timedelta(seconds=1))
+    shared_cache.set(key, (state, modified), None)
+    return modified
+
+
+def detail_stamp(request):
+    """The row read by ``detail_condition()`` for this request, or ``None``."""
+    return getattr(request, '_detail_stamp', None)
+
+
+def detail_condition(model, annotations):
+    """
+    Answer conditional GETs for a detail view of ``model``.
+
+    ``annotations(request)`` returns the extra annotations that make up the
+    page's state: related change stamps from ``latest()``/``count()``,
+    related columns shown on the page, and per-viewer flags.
+    """
+    def stamp(request, pk):
+        if not hasattr(request, '_detail_stamp'):
+            extra = annotations(request)
+            request._detail_stamp = model.objects.filter(pk=pk).annotate(**extra).values(
+                'updated_at', *extra
+            ).first()
+        return request._detail_stamp
+
+    def usable(request):
+        # Flash messages are rendered once; a 304 would hide them.
+        return not len(messages.get_messages(request))
+
+    def state(request, row):
+        user = request.user
+        viewer = (user.pk, user.get_username(), user.is_staff) if user.is_authenticated else None
+        return hashlib.sha1(repr((_templates_version(), viewer, sorted(row.items()))).encode()).hexdigest()
+
+    def etag(request, pk):
+        row = stamp(request, pk)
+        if row is None or not usable(request):
+            return None
+        return state(request, row)
+
+    def last_modified(request, pk):
+        # Last-Modified can't say who the page was rendered for, so it is
+        # only sent to anonymous visitors (crawlers); signed-in users get the
+        # per-viewer ETag alone.
+        if request.user.is_authenticated:
+            return None
+        row = stamp(request, pk)
+        if row is None or not usable(request):
+            return None
+        newest = max(value for value in row.values() if isinstance(value, datetime))
+        return _modified_since(model, pk, state(request, row), newest)
+
+    def prepare(request, pk):
+        stamp(request, pk)
+        usable(request)
+
+    conditional = condition(etag_func=etag, last_modified_func=last_modified)
+
+    def decorator(view):
+        conditional_view = conditional(view)
+        if not iscoroutinefunction(view):
+            return conditional_view
+
+        @wraps(view)
+        async def async_view(request, pk):
+            # condition() calls etag() and last_modified() synchronously;
+            # read the stamp, the session and the user in a thread first so
+            # they find everything loaded.
+            await sync_to_async(prepare)(request, pk)
+            return await conditional_view(request, pk)
+
+        return async_view
+
+    return decorator
@@ -0,0 +1,77 @@
+"""
+Cache for the shared part of detail pages.
+
+A detail view caches everything it renders that is the same for every
+visitor (the object, its photos, reviews and so on) under one key per row,
+and only per-user checks run on each request. Signal handlers call
+``invalidate_detail()`` whenever a row that appears on a page changes.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .routers import read_primary
+
+
+def _generation_key(model):
+    return f'detail-generation:{model._meta.label_lower}'
+
+
+def _generation(model):
+    # A random token rather than a counter: if the cache evicts it, a new
+    # token is picked and no stale entry can match it again.
+    return cache.get_or_set(_generation_key(model), lambda: uuid.uuid4().hex, None)
+
+
+def _key(model, generation, pk):
+    return f'detail:{model._meta.label_lower}:{generation}:{pk}'
+
+
+def _keys(model, pks):
+    generation = _generation(model)
+    return [_key(model, generation, pk) for pk in pks]
+
+
+def cached_detail(model, pk, build):
+    """Return ``build()`` for ``model`` row ``pk``, cached until invalidated."""
+    [key] = _keys(model, [pk])
+    data = cache.get(key)
+    if data is None:
+        # A lagging replica's copy would stay cached past the lag.
+        with read_primary():
+            data = build()
+        cache.set(key, data, getattr(settings, 'DETAIL_CACHE_TIMEOUT', 600))
+    return data
+
+
+async def acached_detail(model, pk, build):
+    """``cached_detail()`` for async views, where ``build`` is a coroutine function."""
+    generation = await cache.aget_or_set(_generation_key(model), lambda: uuid.uuid4().hex, None)
+    key = _key(model, generation, pk)
+    data = await cache.aget(key)
+    if data is None:
+        with read_primary():
+            data = await build()
+        await cache.aset(key, data, getattr(settings, 'DETAIL_CACHE_TIMEOUT', 600))
+    return data
+
+
+def invalidate_detail(model, pks):
+    keys = _keys(model, {pk for pk in pks if pk is not None})
+    if not keys:
+        return
+    cache.delete_many(keys)
+    # Once more after commit: a request may have cached the old rows while
+    # the writing transaction was still open.
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_all_details(model):
+    """Drop every cached page of ``model``, e.g. after a bulk update."""
+    def bump():
+        cache.set(_generation_key(model), uuid.uuid4().hex, None)
+
+    bump()
+    transaction.on_commit(bump)
@@ -0,0 +1,276 @@
+"""
+Faceted filters for list pages, with cached option counts.
+
+A facet is one GET parameter that narrows a list: a type, a price band, a
+minimum rating and so on. Each option is shown with the number of results
+it would give alongside the other selected facets, counted with one grouped
+query per facet. Counts are cached per facet and combination of the other
+filters, and dropped when a row of a registered model is saved or deleted.
+``update()`` sends no signals, so code changing facet fields that way calls
+``invalidate_facets()`` itself (rating recomputes, booking cancellations).
+"""
+import hashlib
+import uuid
+from functools import cached_property, partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, CharField, Count, Q, Value, When
+from django.db.models.signals import post_delete, post_save
+
+from .concurrency import run_concurrently
+from .routers import read_primary
+
+
+class Facet:
+    """
+    Options are the values of ``field``. ``choices`` fixes which values are
+    offered and their labels; without it the ``limit`` most common values
+    are listed.
+    """
+
+    def __init__(self, name, label, field, choices=None, limit=10):
+        self.name = name
+        self.label = label
+        self.field = field
+        self.choices = choices
+        self.limit = limit
+
+    def parse(self, value):
+        """The selected option for a GET value, or ``None``."""
+        if not value:
+            return None
+        if self.choices is not None and value not in dict(self.choices):
+            return None
+        return value
+
+    def filter(self, queryset, value):
+        return queryset.filter(**{self.field: value})
+
+    def count(self, queryset):
+        """``{option: rows}`` for ``queryset``, in one grouped query."""
+        return dict(queryset.values_list(self.field).annotate(rows=Count('pk')).order_by())
+
+    def options(self, counts):
+        """``(value, label, count)`` for each option to show."""
+        if self.choices is not None:
+            return [(value, label, counts.get(value, 0)) for value, label in self.choices]
+        common = sorted(
+            ((value, rows) for value, rows in counts.items() if value),
+            key=lambda item: (-item[1], item[0]),
+        )
+        return [(value, value, rows) for value, rows in common[:self.limit]]
+
+
+class RangeFacet(Facet):
+    """Disjoint bands of ``field``: ``(value, label, low, high)``, either end open."""
+
+    def __init__(self, name, label, field, bands):
+        super().__init__(name, label, field, [(value, label) for value, label, _, _ in bands])
+        self.bands = {value: (low, high) for value, _, low, high in bands}
+
+    def condition(self, value):
+        low, high = self.bands[value]
+        condition = Q()
+        if low is not None:
+            condition &= Q(**{f'{self.field}__gte': low})
+        if high is not None:
+            condition &= Q(**{f'{self.field}__lt': high})
+        return condition
+
+    def filter(self, queryset, value):
+        return queryset.filter(self.condition(value))
+
+    def count(self, queryset):
+        band = Case(
+            *[When(self.condition(value), then=Value(value)) for value in self.bands],
+            default=Value(''),
+            output_field=CharField(),
+        )
+        return dict(queryset.annotate(facet_band=band).values_list('facet_band').annotate(
+            rows=Count('pk')
+        ).order_by())
+
+
+class MinimumFacet(RangeFacet):
+    """"At least" options: ``(value, label, minimum)``."""
+
+    def __init__(self, name, label, field, minimums):
+        # Counted as disjoint bands between consecutive minimums, then
+        # summed from the top down.
+        top_down = sorted(minimums, key=lambda option: option[2], reverse=True)
+        highs = [None] + [minimum for _, _, minimum in top_down[:-1]]
+        super().__init__(name, label, field, [
+            (value, label, minimum, high) for (value, label, minimum), high in zip(top_down, highs)
+        ])
+        self.choices = [(value, label) for value, label, _ in minimums]
+        self.minimums = {value: minimum for value, _, minimum in top_down}
+
+    def filter(self, queryset, value):
+        return queryset.filter(**{f'{self.field}__gte': self.minimums[value]})
+
+    def count(self, queryset):
+        bands = super().count(queryset)
+        counts, total = {}, 0
+        for value in self.minimums:
+            total += bands.get(value, 0)
+            counts[value] = total
+        return counts
+
+
+def apply_facets(facets, queryset, selection, skip=None):
+    for facet in facets:
+        if facet.name in selection and facet.name != skip:
+            queryset = facet.filter(queryset, selection[facet.name])
+    return queryset
+
+
+def _generation_key(model):
+    return f'facet-generation:{model._meta.label_lower}'
+
+
+def _generation(model):
+    return cache.get_or_set(_generation_key(model), lambda: uuid.uuid4().hex, None)
+
+
+def invalidate_facets(model):
+    """Drop every cached count of ``model``'s facets."""
+    def bump():
+        cache.set(_generation_key(model), uuid.uuid4().hex, None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def _invalidate_on_change(sender, **kwargs):
+    for model in _dependents[sender]:
+        invalidate_facets(model)
+
+
+_dependents = {}
+
+
+def register(model, *related):
+    """Drop ``model``'s cached counts when it or any ``related`` model changes."""
+    for sender in (model, *related):
+        _dependents.setdefault(sender, set()).add(model)
+        uid = f'facets:{sender._meta.label_lower}'
+        post_save.connect(_invalidate_on_change, sender=sender, dispatch_uid=uid)
+        post_delete.connect(_invalidate_on_change, sender=sender, dispatch_uid=uid)
+
+
+def facet_counts(facets, queryset, selection, params, timeout=None):
+    """
+    ``{facet name: counts}`` for ``queryset`` before the facets are applied.
+
+    Each facet is counted with every other selection applied, so its
+    options say what choosing them instead would give. ``params`` are the
+    ``(name, value)`` pairs of the other filters in effect; they make up
+    the cache key together with the facet.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'FACET_CACHE_TIMEOUT', 300)
+    model = queryset.model
+    generation = _generation(model)
+    keys = {}
+    for facet in facets:
+        other = sorted((name, value) for name, value in params if name != facet.name)
+        digest = hashlib.md5(repr(other).encode()).hexdigest()
+        keys[facet.name] = f'facets:{model._meta.label_lower}:{generation}:{facet.name}:{digest}'
+
+    cached = cache.get_many(keys.values())
+    if queryset.query.annotations:
+        # Group the plain rows: annotations such as a distance or a search
+        # rank would otherwise be grouped on too.
+        queryset = model._base_manager.filter(pk__in=queryset.values('pk'))
+    else:
+        queryset = queryset.prefetch_related(None).select_related(None)
+
+    # The counts missing from the cache don't depend on each other.
+    uncached = [facet for facet in facets if keys[facet.name] not in cached]
+    with read_primary():
+        missing = dict(zip(
+            (keys[facet.name] for facet in uncached),
+            run_concurrently(*(
+                partial(facet.count, apply_facets(facets, queryset, selection, skip=facet.name))
+                for facet in uncached
+            )),
+        ))
+    cached.update(missing)
+    counts = {facet.name: cached[keys[facet.name]] for facet in facets}
+    if missing:
+        cache.set_many(missing, timeout)
+    return counts
+
+
+class FacetedListMixin:
+    """
+    ListView mixin for facet filters listed in ``facets``.
+
+    ``get_queryset()`` passes its queryset, with every other filter
+    applied, through ``filter_facets()``. Templates get ``facets``: for
+    each, its ``options`` with counts and the querystrings that select or
+    clear them (see includes/facets.html).
+    """
+
+    facets = ()
+    # GET parameters that don't change which rows are listed.
+    facet_ignored_params = ('cursor', 'page', 'sort')
+
+    @cached_property
+    def facet_selection(self):
+        selection = {}
+        for facet in self.facets:
+            value = facet.parse(self.request.GET.get(facet.name))
+            if value is not None:
+                selection[facet.name] = value
+        return selection
+
+    def filter_facets(self, queryset):
+        self.facet_queryset = queryset
+        return apply_facets(self.facets, queryset, self.facet_selection)
+
+    def facet_params(self):
+        return [
+            (name, value)
+            for name, values in self.request.GET.lists()
+            if name not in self.facet_ignored_params
+            for value in values if value
+        ]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        counts = facet_counts(self.facets, self.facet_queryset, self.facet_selection, self.facet_params())
+        context['facets'] = [self._facet_context(facet, counts[facet.name]) for facet in self.facets]
+        return context
+
+    def _facet_context(self, facet, counts):
+        selected = self.facet_selection.get(facet.name)
+        options = []
+        for value, label, rows in facet.options(counts):
+            if rows or value == selected:
+                options.append({
+                    'value': value,
+                    'label': label,
+                    'count': rows,
+                    'selected': value == selected,
+                    'querystring': self._facet_querystring(facet.name, value),
+                })
+        return {
+            'name': facet.name,
+            'label': facet.label,
+            'options': options,
+            'selected': selected,
+            'clear_querystring': self._facet_querystring(facet.name, None),
+        }
+
+    def _facet_querystring(self, name, value):
+        params = self.request.GET.copy()
+        params.pop('cursor', None)
+        params.pop('page', None)
+        if value is None:
+            params.pop(name, None)
+        else:
+            params[name] = value
+        return params.urlencode()
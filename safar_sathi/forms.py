@@ -0,0 +1,26 @@
+"""
+Helpers for model forms.
+
+Some columns are kept by the database rather than by forms: rating
+aggregates, itinerary rollups and the like, shifted by F-expressions and
+recomputes as related rows change. A plain ``form.save()`` writes back the
+whole row as it was loaded when the request began, undoing any such change
+made in the meantime; ``save_edited_fields()`` writes only the form's own
+columns.
+"""
+
+
+def save_edited_fields(form):
+    """
+    Save ``form``'s instance, writing only the columns the form edits.
+
+    ``auto_now`` stamps are written too, as a full save would. Returns the
+    instance.
+    """
+    instance = form.save(commit=False)
+    instance.save(update_fields=[
+        field.name for field in instance._meta.concrete_fields
+        if field.name in form.fields or getattr(field, 'auto_now', False)
+    ])
+    form.save_m2m()
+    return instance
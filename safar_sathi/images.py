@@ -0,0 +1,152 @@
+"""
+Resized WebP and JPEG copies of uploaded images for responsive ``srcset``s.
+
+Each registered image field gets derivatives at the widths in
+``IMAGE_DERIVATIVE_WIDTHS`` (never wider than the original), saved next to
+the original as ``<name>-<width>w.webp`` / ``.jpg``. They are generated
+after a new upload is saved, and ``generate_image_derivatives`` backfills
+existing files. The ``responsive_image`` template tag reads the widths
+available for a file from the cache, so rendering does no image I/O.
+"""
+import logging
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpg': ('JPEG', 'image/jpeg'),
+}
+
+# Model -> names of its image fields that get derivatives.
+registry = {}
+
+# EXIF orientations that rotate the image by 90 degrees.
+ROTATED = {5, 6, 7, 8}
+
+
+def derivative_widths():
+    return sorted(getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', (320, 640, 1280)))
+
+
+def planned_widths(original_width):
+    widths = [width for width in derivative_widths() if width < original_width]
+    if original_width <= derivative_widths()[-1]:
+        widths.append(original_width)
+    return widths
+
+
+def derivative_name(name, width, ext):
+    root, _ = posixpath.splitext(name)
+    return f'{root}-{width}w.{ext}'
+
+
+def display_width(image):
+    """Width of ``image`` once EXIF rotation is applied, without decoding it."""
+    if image.getexif().get(ExifTags.Base.Orientation) in ROTATED:
+        return image.height
+    return image.width
+
+
+def _cache_key(name):
+    return f'image-derivatives:{name}'
+
+
+def _encode(image, fmt):
+    if fmt == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    if fmt == 'JPEG':
+        image.save(buffer, fmt, quality=82, optimize=True, progressive=True)
+    else:
+        image.save(buffer, fmt, quality=80, method=4)
+    return buffer.getvalue()
+
+
+def generate_derivatives(storage, name, force=False):
+    """
+    Write the derivatives of image ``name`` to ``storage`` and return the
+    widths made. Existing derivatives are kept unless ``force`` is set.
+    """
+    with storage.open(name, 'rb') as f:
+        with Image.open(f) as original:
+            original = ImageOps.exif_transpose(original)
+            if original.mode not in ('RGB', 'RGBA'):
+                original = original.convert('RGBA' if 'A' in original.getbands() else 'RGB')
+
+            widths = planned_widths(original.width)
+            for width in widths:
+                resized = None
+                for ext, (fmt, _) in FORMATS.items():
+                    target = derivative_name(name, width, ext)
+                    if storage.exists(target):
+                        if not force:
+                            continue
+                        storage.delete(target)
+                    if resized is None:
+                        height = max(1, round(original.height * width / original.width))
+                        resized = original.resize((width, height), Image.LANCZOS)
+                    storage.save(target, ContentFile(_encode(resized, fmt)))
+
+    cache.set(_cache_key(name), widths, None)
+    return widths
+
+
+def available_widths(field_file):
+    """Widths with derivatives for ``field_file``; empty until generated."""
+    name = field_file.name
+    widths = cache.get(_cache_key(name))
+    if widths is None:
+        widths = []
+        storage = field_file.storage
+        try:
+            with storage.open(name, 'rb') as f, Image.open(f) as image:
+                planned = planned_widths(display_width(image))
+        except (OSError, UnidentifiedImageError):
+            planned = []
+        if planned and storage.exists(derivative_name(name, planned[0], 'webp')):
+            widths = planned
+        cache.set(_cache_key(name), widths, 3600)
+    return widths
+
+
+def _remember_new_upload(sender, instance, raw, **kwargs):
+    # FileField commits uploads while saving, so a file still uncommitted
+    # here is a new upload.
+    instance._new_image_fields = [] if raw else [
+        field_name for field_name in registry[sender]
+        if getattr(instance, field_name) and not getattr(instance, field_name)._committed
+    ]
+
+
+def _generate_after_save(sender, instance, **kwargs):
+    for field_name in getattr(instance, '_new_image_fields', []):
+        field_file = getattr(instance, field_name)
+        transaction.on_commit(
+            lambda storage=field_file.storage, name=field_file.name: _generate_quietly(storage, name)
+        )
+    instance._new_image_fields = []
+
+
+def _generate_quietly(storage, name):
+    # A bad upload shouldn't fail the request; the page falls back to the
+    # original file.
+    try:
+        generate_derivatives(storage, name)
+    except (OSError, UnidentifiedImageError):
+        logger.exception('Could not create derivatives for %s', name)
+
+
+def register(model, field_name):
+    """Generate derivatives whenever a new file is saved to ``model.field_name``."""
+    registry.setdefault(model, []).append(field_name)
+    pre_save.connect(_remember_new_upload, sender=model, dispatch_uid=f'derivatives-pre-{model._meta.label}')
+    post_save.connect(_generate_after_save, sender=model, dispatch_uid=f'derivatives-post-{model._meta.label}')
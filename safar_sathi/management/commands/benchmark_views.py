@@ -0,0 +1,254 @@
+import asyncio
+import json
+import math
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext, async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+from accounts.models import User, LocalGuide
+from bookings.models import Accommodation
+from destinations.models import Destination
+from itinerary.models import Itinerary, ItineraryItem
+
+# URL names that change data on GET or end the session.
+SKIPPED_NAMES = {'logout'}
+SKIPPED_SUFFIXES = ('_delete', '_cancel')
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    rank = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def iter_url_names(patterns=None, namespace=None):
+    """Yield ``(name, kwarg names)`` for every named URL outside the admin."""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.app_name == 'admin':
+                continue
+            child = pattern.namespace or namespace
+            if namespace and pattern.namespace:
+                child = f'{namespace}:{pattern.namespace}'
+            yield from iter_url_names(pattern.url_patterns, child)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            name = f'{namespace}:{pattern.name}' if namespace else pattern.name
+            yield name, list(pattern.pattern.converters)
+
+
+class Command(BaseCommand):
+    help = (
+        'Request every page in safar_sathi/urls.py through the test client and report '
+        'p50/p95/p99 latency and query counts per view. Each sync detail view is listed '
+        'next to its async twin (the *_detail_async routes), which runs the same reads '
+        'concurrently. With --concurrency, that many clients request each page at once, '
+        'through the WSGI handler or, with --asgi, the ASGI one, to compare tail latency '
+        'under load.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--username', default='benchmark',
+                            help='User to log in as (default: the seeded "benchmark" user).')
+        parser.add_argument('--host', default='localhost', help='Host header sent with each request.')
+        parser.add_argument('--only', help='Only benchmark URL names containing this text.')
+        parser.add_argument('--json', dest='json_path', help='Write the results to this file.')
+        parser.add_argument('--baseline', help='Compare against results saved earlier with --json.')
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Clients requesting each page at once, each sending --iterations requests.')
+        parser.add_argument('--asgi', action='store_true',
+                            help='Send the requests through the ASGI handler instead of the WSGI one.')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1.')
+        self.host = options['host']
+        client = Client(raise_request_exception=False, HTTP_HOST=options['host'])
+        self.user = User.objects.filter(username=options['username']).first()
+        if self.user:
+            client.force_login(self.user)
+        else:
+            self.stderr.write(f"User {options['username']!r} not found; benchmarking anonymously.")
+
+        results = {}
+        for name, kwarg_names in iter_url_names():
+            if options['only'] and options['only'] not in name:
+                continue
+            if name.split(':')[-1] in SKIPPED_NAMES or name.endswith(SKIPPED_SUFFIXES):
+                continue
+            try:
+                url = reverse(name, kwargs=self.sample_kwargs(name, kwarg_names))
+            except LookupError as e:
+                self.stderr.write(f'Skipping {name}: {e}')
+                continue
+            if options['concurrency'] > 1 or options['asgi']:
+                results[name] = self.measure_load(
+                    url, options['iterations'], options['concurrency'], options['asgi']
+                )
+            else:
+                results[name] = self.measure(client, url, options['iterations'])
+
+        baseline = self.load_baseline(options['baseline'])
+        self.report(results, baseline)
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Wrote {options['json_path']}")
+
+    def sample_kwargs(self, name, kwarg_names):
+        # Pick a representative object for each URL argument.
+        namespace, _, view = name.partition(':')
+        if namespace == 'api':
+            # API routes are named after the model: destination_detail etc.
+            namespace = {'destination': 'destinations', 'accommodation': 'bookings', 'guide': 'accounts'}.get(
+                view.split('_')[0], namespace
+            )
+        itinerary = None
+        kwargs = {}
+        for kwarg in kwarg_names:
+            if kwarg in ('destination_pk', 'destination_id') or (namespace == 'destinations' and kwarg == 'pk'):
+                kwargs[kwarg] = self.middle_pk(Destination.objects.all())
+            elif kwarg == 'accommodation_id' or (namespace == 'bookings' and kwarg == 'pk'):
+                kwargs[kwarg] = self.middle_pk(Accommodation.objects.all())
+            elif kwarg == 'guide_id' or (namespace == 'accounts' and kwarg == 'pk'):
+                kwargs[kwarg] = self.middle_pk(LocalGuide.objects.all())
+            elif kwarg in ('pk', 'itinerary_pk') and namespace == 'itinerary':
+                itinerary = self.middle_pk(Itinerary.objects.filter(user=self.user))
+                kwargs[kwarg] = itinerary
+            elif kwarg == 'item_pk':
+                kwargs[kwarg] = self.middle_pk(ItineraryItem.objects.filter(itinerary_id=itinerary))
+            else:
+                raise LookupError(f'no sample value for "{kwarg}"')
+        return kwargs
+
+    @staticmethod
+    def middle_pk(queryset):
+        count = queryset.count()
+        if not count:
+            raise LookupError(f'no {queryset.model._meta.verbose_name} rows')
+        return queryset.order_by('pk').values_list('pk', flat=True)[count // 2]
+
+    def measure(self, client, url, iterations):
+        client.get(url)  # warm caches and connections
+        timings = []
+        query_counts = []
+        status = None
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+            query_counts.append(len(queries))
+            status = response.status_code
+        return {
+            'url': url,
+            'status': status,
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'queries': statistics.median(query_counts),
+        }
+
+    def measure_load(self, url, iterations, concurrency, asgi):
+        # Queries run on many connections at once here, so they aren't
+        # counted; run without --concurrency/--asgi for the query counts.
+        if asgi:
+            # AsyncClient sends "Host: testserver" ahead of any host header
+            # given to it, so let that host through for the ASGI run.
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                timings, status = async_to_sync(self.asgi_load)(url, iterations, concurrency)
+        else:
+            with ThreadPoolExecutor(concurrency) as pool:
+                runs = list(pool.map(self.wsgi_run, [url] * concurrency, [iterations] * concurrency))
+            timings = [timing for run, _ in runs for timing in run]
+            status = runs[-1][1]
+        return {
+            'url': url,
+            'status': status,
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'queries': None,
+        }
+
+    def wsgi_run(self, url, iterations):
+        client = Client(raise_request_exception=False, headers={'host': self.host})
+        if self.user:
+            client.force_login(self.user)
+        try:
+            client.get(url)
+            timings = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+            return timings, response.status_code
+        finally:
+            connections.close_all()
+
+    async def asgi_load(self, url, iterations, concurrency):
+        clients = []
+        for _ in range(concurrency):
+            client = AsyncClient(raise_request_exception=False, headers={'host': self.host})
+            if self.user:
+                await client.aforce_login(self.user)
+            clients.append(client)
+
+        async def get(client):
+            # The ASGI handler gives each request its own thread for sync
+            # code; the test client doesn't, so do it here.
+            async with ThreadSensitiveContext():
+                return await client.get(url)
+
+        async def run(client):
+            await get(client)
+            timings = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                response = await get(client)
+                timings.append((time.perf_counter() - start) * 1000)
+            return timings, response.status_code
+
+        runs = await asyncio.gather(*(run(client) for client in clients))
+        return [timing for run_timings, _ in runs for timing in run_timings], runs[-1][1]
+
+    def load_baseline(self, path):
+        if not path:
+            return {}
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Could not read baseline {path}: {e}')
+
+    def report(self, results, baseline):
+        header = f"{'view':<42} {'status':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8}"
+        if baseline:
+            header += f" {'p95 vs base':>12} {'queries vs base':>16}"
+        self.stdout.write(header)
+        for name, result in sorted(results.items()):
+            queries = '-' if result['queries'] is None else f"{result['queries']:g}"
+            line = (
+                f"{name:<42} {result['status']:>6} {result['p50_ms']:>8.1f}ms {result['p95_ms']:>8.1f}ms "
+                f"{result['p99_ms']:>8.1f}ms {queries:>8}"
+            )
+            base = baseline.get(name)
+            if base:
+                change = (result['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100 if base['p95_ms'] else 0
+                if result['queries'] is None or base['queries'] is None:
+                    query_change = '-'
+                else:
+                    query_change = f"{result['queries'] - base['queries']:+g}"
+                line += f" {change:>+11.1f}% {query_change:>16}"
+            self.stdout.write(line)
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews import recommendations
+from reviews.ratings import RATED_FIELDS
+
+KINDS = {RATED_FIELDS[review_model]: review_model for review_model in recommendations.NEIGHBOUR_MODELS}
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the "travellers who liked this also liked" neighbours of destinations and '
+        'accommodations from the reviews. Run it periodically, e.g. nightly from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kinds', nargs='*', help=f'What to recompute: {", ".join(sorted(KINDS))} (default: all)')
+        parser.add_argument('--top-k', type=int, default=recommendations.TOP_K, help='Neighbours kept per item')
+        parser.add_argument('--min-common', type=int, default=recommendations.MIN_COMMON_USERS,
+                            help='Fewest reviewers two items must share to count as similar')
+
+    def handle(self, *args, **options):
+        unknown = set(options['kinds']) - set(KINDS)
+        if unknown:
+            raise CommandError(f'Unknown kind: {", ".join(sorted(unknown))}.')
+        for kind in options['kinds'] or sorted(KINDS):
+            started = time.perf_counter()
+            written = recommendations.refresh_neighbours(
+                KINDS[kind], k=options['top_k'], min_common=options['min_common']
+            )
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(f'Stored {written} {kind} neighbours in {elapsed:.1f}s.'))
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from reviews.export import CHUNK_SIZE, FORMATS, export_lines
+from reviews.models import DestinationReview, AccommodationReview, GuideReview
+
+REVIEW_MODELS = {
+    'destination': DestinationReview,
+    'accommodation': AccommodationReview,
+    'guide': GuideReview,
+}
+
+
+class Command(BaseCommand):
+    help = 'Stream destination, accommodation or guide reviews to a CSV or JSON Lines file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(REVIEW_MODELS))
+        parser.add_argument('--format', choices=sorted(FORMATS),
+                            help='Output format (default: from the output extension, else csv)')
+        parser.add_argument('--output', '-o', default='-', help='File to write, or "-" for standard output')
+        status = parser.add_mutually_exclusive_group()
+        status.add_argument('--approved', action='store_true', help='Only approved reviews')
+        status.add_argument('--pending', action='store_true', help='Only reviews awaiting approval')
+        parser.add_argument('--since', help='Only reviews created on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows fetched per query')
+
+    def handle(self, *args, **options):
+        queryset = REVIEW_MODELS[options['kind']].objects.all()
+        if options['approved'] or options['pending']:
+            queryset = queryset.filter(is_approved=options['approved'])
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError(f'Invalid date for --since: {options["since"]}')
+            queryset = queryset.filter(created_at__date__gte=since)
+
+        path = options['output']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        lines = export_lines(queryset, fmt, options['chunk_size'])
+        if path == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        try:
+            f = open(path, 'w', newline='', encoding='utf-8')
+        except OSError as e:
+            raise CommandError(e)
+        count = 0
+        with f:
+            for count, line in enumerate(lines, 1):
+                f.write(line)
+        if fmt == 'csv':
+            count = max(count - 1, 0)  # the header
+        self.stdout.write(self.style.SUCCESS(f'Wrote {count} reviews to {path}.'))
@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
+
+from django.core.management.base import BaseCommand
+from PIL import UnidentifiedImageError
+
+from safar_sathi import images
+
+
+class Command(BaseCommand):
+    help = 'Create the resized WebP/JPEG derivatives for images already in media storage.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Images processed in parallel (default: CPU count)')
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate derivatives that already exist')
+
+    def handle(self, *args, **options):
+        jobs = []
+        for model, field_names in images.registry.items():
+            storage_names = set()
+            for field_name in field_names:
+                storage = model._meta.get_field(field_name).storage
+                names = (
+                    model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                    .values_list(field_name, flat=True).distinct()
+                )
+                storage_names.update((storage, name) for name in names)
+            jobs.extend(storage_names)
+
+        present = [(storage, name) for storage, name in jobs if storage.exists(name)]
+        missing = len(jobs) - len(present)
+
+        generated = failed = 0
+        # Pillow releases the GIL while decoding, resizing and encoding, so
+        # threads keep every core busy without pickling files to processes.
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {
+                pool.submit(images.generate_derivatives, storage, name, options['force']): name
+                for storage, name in present
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                    generated += 1
+                except (OSError, UnidentifiedImageError) as e:
+                    failed += 1
+                    self.stderr.write(f'{futures[future]}: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {generated} images ({missing} missing, {failed} failed).'
+        ))
+
@@ -0,0 +1,194 @@
+import csv
+import json
+import sys
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.forms import modelform_factory
+
+from accounts.models import User
+from bookings.forms import AccommodationForm
+from bookings.models import Accommodation
+from bookings.search import accommodation_index, accommodation_suggestions
+from destinations.forms import DestinationForm
+from destinations.models import Destination
+from destinations.search import destination_index, destination_suggestions
+from safar_sathi import geo
+from safar_sathi.detail_cache import invalidate_detail
+from safar_sathi.facets import invalidate_facets
+
+
+class RowError(Exception):
+    pass
+
+
+class DestinationImporter:
+    model = Destination
+    form_class = DestinationForm
+    index = destination_index
+    suggestions = destination_suggestions
+
+    def __init__(self, created_by):
+        self.created_by = created_by
+        self.form = modelform_factory(self.model, form=self.form_class, fields=self.form_fields())
+
+    def form_fields(self):
+        return self.form_class._meta.fields
+
+    def new_instance(self, row):
+        return self.model(created_by=self.created_by)
+
+    def build(self, row):
+        """Validate ``row`` with the model form and return an unsaved instance."""
+        form = self.form(data=row, instance=self.new_instance(row))
+        if not form.is_valid():
+            raise RowError('; '.join(
+                f'{field}: {" ".join(errors)}' for field, errors in form.errors.items()
+            ))
+        instance = form.save(commit=False)
+        # bulk_create() skips the pre_save hook that fills this in.
+        geo.set_geohash(instance)
+        return instance
+
+    def after_chunk(self, objects):
+        pks = [obj.pk for obj in objects]
+        self.index.refresh(pks)
+        self.suggestions.refresh(pks)
+        # bulk_create() sends no post_save, so the list pages' counts are
+        # dropped here, again once the chunk commits.
+        invalidate_facets(self.model)
+
+
+class AccommodationImporter(DestinationImporter):
+    model = Accommodation
+    form_class = AccommodationForm
+    index = accommodation_index
+    suggestions = accommodation_suggestions
+
+    def __init__(self, created_by):
+        super().__init__(created_by)
+        # Destination names -> ids, read once instead of one lookup per row
+        # as the form's ModelChoiceField would do. Shared names are ambiguous.
+        self.destinations = {}
+        for name, pk in Destination.objects.values_list('name', 'pk').iterator():
+            key = name.strip().casefold()
+            self.destinations[key] = None if key in self.destinations else pk
+
+    def form_fields(self):
+        # The destination is resolved by name below; images can't come from a file.
+        return [field for field in self.form_class._meta.fields if field not in ('destination', 'image')]
+
+    def new_instance(self, row):
+        name = (row.get('destination') or '').strip().casefold()
+        if not name:
+            raise RowError('destination: This field is required.')
+        if name not in self.destinations:
+            raise RowError(f'destination: No destination named "{row["destination"]}".')
+        if self.destinations[name] is None:
+            raise RowError(f'destination: More than one destination is named "{row["destination"]}".')
+        return self.model(created_by=self.created_by, destination_id=self.destinations[name])
+
+    def build(self, row):
+        # Files written before accommodations had several rooms leave it out.
+        if not row.get('rooms'):
+            row = {**row, 'rooms': self.model._meta.get_field('rooms').default}
+        return super().build(row)
+
+    def after_chunk(self, objects):
+        super().after_chunk(objects)
+        # New accommodations are listed on their destinations' pages.
+        invalidate_detail(Destination, {obj.destination_id for obj in objects})
+
+
+IMPORTERS = {
+    'destinations': DestinationImporter,
+    'accommodations': AccommodationImporter,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream destinations or accommodations from a CSV or JSON Lines file into the catalog, '
+        'validating each row like the add forms do.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('path', help='CSV or JSONL file, or "-" for standard input')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Input format (default: from the file extension)')
+        parser.add_argument('--created-by', help='Username recorded as the creator (default: first superuser)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per INSERT')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per transaction')
+
+    def handle(self, *args, **options):
+        importer = IMPORTERS[options['kind']](self.get_creator(options['created_by']))
+        fmt = options['format'] or ('jsonl' if options['path'].endswith(('.jsonl', '.ndjson')) else 'csv')
+
+        if options['path'] == '-':
+            self.run(importer, self.read_rows(sys.stdin, fmt), options)
+        else:
+            try:
+                f = open(options['path'], newline='', encoding='utf-8-sig')
+            except OSError as e:
+                raise CommandError(e)
+            with f:
+                self.run(importer, self.read_rows(f, fmt), options)
+
+    def get_creator(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+        else:
+            user = User.objects.filter(is_superuser=True).order_by('pk').first()
+        if user is None:
+            raise CommandError('No creator found; pass --created-by USERNAME.')
+        return user
+
+    def read_rows(self, f, fmt):
+        """Yield ``(line number, row dict)`` one row at a time."""
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, RowError(f'Invalid JSON: {e}')
+                continue
+            if not isinstance(row, dict):
+                row = RowError('Each line must be a JSON object.')
+            yield line_number, row
+
+    def valid_objects(self, importer, rows):
+        for line_number, row in rows:
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                yield importer.build(row)
+            except RowError as e:
+                self.failed += 1
+                self.stderr.write(f'line {line_number}: {e}')
+
+    def run(self, importer, rows, options):
+        self.failed = 0
+        imported = 0
+        started = time.perf_counter()
+        objects = self.valid_objects(importer, rows)
+        while chunk := list(islice(objects, options['chunk_size'])):
+            with transaction.atomic():
+                importer.model.objects.bulk_create(chunk, batch_size=options['batch_size'])
+                importer.after_chunk(chunk)
+            imported += len(chunk)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'  {imported} rows imported ({imported / elapsed:.0f} rows/s)')
+
+        elapsed = time.perf_counter() - started
+        rate = imported / elapsed if elapsed else 0
+        message = f'Imported {imported} {options["kind"]} in {elapsed:.1f}s ({rate:.0f} rows/s), {self.failed} rows rejected.'
+        self.stdout.write(self.style.WARNING(message) if self.failed else self.style.SUCCESS(message))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from safar_sathi.search import registry
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search indexes from the catalog tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('indexes', nargs='*', help='Indexes to rebuild (default: all)')
+
+    def handle(self, *args, **options):
+        names = options['indexes'] or sorted(registry)
+        unknown = set(names) - set(registry)
+        if unknown:
+            raise CommandError(f"Unknown search index: {', '.join(sorted(unknown))}")
+
+        for name in names:
+            count = registry[name].rebuild()
+            self.stdout.write(self.style.SUCCESS(f'Indexed {count} rows into "{name}".'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from itinerary.models import Itinerary
+from itinerary.rollups import recompute_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored item counts and costs of itineraries from their items.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('itineraries', nargs='*', type=int, help='Itinerary ids (default: all)')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Itineraries updated per statement, to keep write locks short')
+
+    def handle(self, *args, **options):
+        ids = Itinerary.objects.order_by('pk').values_list('pk', flat=True)
+        if options['itineraries']:
+            ids = ids.filter(pk__in=options['itineraries'])
+
+        updated = 0
+        batch_size = options['batch_size']
+        last_pk = 0
+        while True:
+            batch = list(ids.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            updated += recompute_rollups(batch)
+            last_pk = batch[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'Recomputed rollups for {updated} itineraries.'))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reviews import rankings
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the trending and top rated lists shown on the home page from the reviews. '
+        'Run it periodically, e.g. every 15 minutes from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=rankings.LIST_SIZE, help='Entries kept per list')
+        parser.add_argument('--window-days', type=int, default=rankings.TRENDING_WINDOW_DAYS,
+                            help='Days of reviews counted towards trending')
+        parser.add_argument('--half-life-days', type=float, default=rankings.HALF_LIFE_DAYS,
+                            help='Age at which a review counts half as much towards trending')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = rankings.refresh_rankings(
+            size=options['size'],
+            window_days=options['window_days'],
+            half_life_days=options['half_life_days'],
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Stored {written} rankings in {elapsed:.1f}s.'))
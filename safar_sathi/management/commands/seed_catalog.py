@@ -0,0 +1,274 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import User, LocalGuide
+from bookings.models import Accommodation
+from destinations.models import Destination, Photo
+from itinerary.models import Itinerary, ItineraryItem
+from itinerary.rollups import recompute_rollups
+from reviews.models import DestinationReview, AccommodationReview, GuideReview
+from reviews.ratings import recompute_ratings
+from safar_sathi import geo
+from safar_sathi.search import registry
+
+PLACES = [
+    "Cox's Bazar", 'Sajek', 'Sundarbans', 'Srimangal', 'Bandarban', 'Saint Martin', 'Kuakata',
+    'Rangamati', 'Sylhet', 'Paharpur', 'Mahasthangarh', 'Ratargul', 'Jaflong', 'Nilgiri',
+    'Bichanakandi', 'Lalbagh', 'Sonargaon', 'Tanguar Haor', 'Madhabkunda', 'Khagrachari',
+]
+LOCATIONS = ['Chattogram', 'Dhaka', 'Sylhet', 'Khulna', 'Rajshahi', 'Barishal', 'Rangpur', 'Mymensingh']
+COUNTRIES = ['Bangladesh'] * 8 + ['India', 'Nepal', 'Bhutan']
+WORDS = (
+    'beach hill forest river lake tea garden temple mosque fort palace market village waterfall '
+    'sunset sunrise trail valley island mangrove tiger boat cruise heritage ruins museum bazaar '
+    'quiet crowded scenic peaceful historic colourful remote lush rocky sandy misty green'
+).split()
+HOTEL_WORDS = ['Sea', 'Hill', 'Green', 'Royal', 'Blue', 'Palm', 'Golden', 'River', 'Cloud', 'Sky']
+FIRST_NAMES = ['Rahim', 'Karim', 'Ayesha', 'Nusrat', 'Tanvir', 'Farhana', 'Sabbir', 'Mim', 'Arif', 'Sadia']
+LAST_NAMES = ['Hossain', 'Rahman', 'Ahmed', 'Islam', 'Chowdhury', 'Khan', 'Sarker', 'Das', 'Roy', 'Akter']
+# (south, north, west, east) around Bangladesh.
+BOUNDS = (20.7, 26.6, 88.0, 92.7)
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with a large synthetic catalog for local benchmarking.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5000)
+        parser.add_argument('--destinations', type=int, default=20000)
+        parser.add_argument('--photos-per-destination', type=int, default=3)
+        parser.add_argument('--accommodations-per-destination', type=int, default=4)
+        parser.add_argument('--guides', type=int, default=2000)
+        parser.add_argument('--reviews-per-item', type=int, default=8)
+        parser.add_argument('--itineraries', type=int, default=5000)
+        parser.add_argument('--items-per-itinerary', type=int, default=10)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            user_ids = self.create_users(options['users'])
+            destination_ids = self.create_destinations(options['destinations'], user_ids)
+            self.create_photos(destination_ids, options['photos_per_destination'], user_ids)
+            accommodation_ids = self.create_accommodations(
+                destination_ids, options['accommodations_per_destination'], user_ids
+            )
+            guide_ids = self.create_guides(options['guides'])
+            reviews_per_item = options['reviews_per_item']
+            self.create_reviews(DestinationReview, 'destination', destination_ids, user_ids, reviews_per_item)
+            self.create_reviews(AccommodationReview, 'accommodation', accommodation_ids, user_ids, reviews_per_item)
+            self.create_reviews(GuideReview, 'guide', guide_ids, user_ids, reviews_per_item)
+            self.create_itineraries(
+                options['itineraries'], options['items_per_itinerary'],
+                user_ids, destination_ids, accommodation_ids,
+            )
+
+            # bulk_create skips signals, so derived data is rebuilt in bulk.
+            for review_model in (DestinationReview, AccommodationReview, GuideReview):
+                recompute_ratings(review_model)
+            recompute_rollups()
+            for index in registry.values():
+                index.rebuild()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Seeded catalog in {elapsed:.1f}s.'))
+
+    def bulk_insert(self, model, objects):
+        """Insert ``objects`` in batches and return the new primary keys."""
+        ids = []
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                ids.extend(o.pk for o in model.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            ids.extend(o.pk for o in model.objects.bulk_create(batch))
+        self.stdout.write(f'  {model._meta.verbose_name_plural}: {len(ids)}')
+        return ids
+
+    def sentence(self, words):
+        return ' '.join(self.rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+    def create_users(self, count):
+        password = make_password('password')
+        start = User.objects.count()
+        users = (
+            User(
+                username=f'seed_user_{start + i}',
+                email=f'seed_user_{start + i}@example.com',
+                first_name=self.rng.choice(FIRST_NAMES),
+                last_name=self.rng.choice(LAST_NAMES),
+                password=password,
+            )
+            for i in range(count)
+        )
+        ids = self.bulk_insert(User, users)
+
+        # The benchmark_views login; it also owns some of the seeded itineraries.
+        benchmark = User.objects.filter(username='benchmark').first()
+        if benchmark is None:
+            benchmark = User.objects.create_superuser('benchmark', 'benchmark@example.com', 'password')
+        ids.append(benchmark.pk)
+        return ids
+
+    def point(self, around=None, spread_km=15):
+        """Random coordinates in ``BOUNDS``, or within ``spread_km`` of ``around``."""
+        if around is None:
+            south, north, west, east = BOUNDS
+            return round(self.rng.uniform(south, north), 6), round(self.rng.uniform(west, east), 6)
+        spread = spread_km / geo.KM_PER_DEGREE
+        return (
+            round(around[0] + self.rng.uniform(-spread, spread), 6),
+            round(around[1] + self.rng.uniform(-spread, spread), 6),
+        )
+
+    def create_destinations(self, count, user_ids):
+        categories = [value for value, _ in Destination.CATEGORY_CHOICES]
+        points = [self.point() for _ in range(count)]
+        destinations = (
+            self.located(Destination(
+                name=f'{self.rng.choice(PLACES)} {self.rng.choice(WORDS).title()} {i}',
+                description=' '.join(self.sentence(12) for _ in range(self.rng.randint(3, 12))),
+                category=self.rng.choice(categories),
+                location=self.rng.choice(LOCATIONS),
+                country=self.rng.choice(COUNTRIES),
+                best_time_to_visit=self.rng.choice(['October to March', 'All year', 'Monsoon']),
+                entry_fee=self.rng.choice([0, 0, 0, 20, 50, 100, 500]),
+                created_by_id=self.rng.choice(user_ids),
+            ), points[i])
+            for i in range(count)
+        )
+        ids = self.bulk_insert(Destination, destinations)
+        self.destination_points = dict(zip(ids, points))
+        return ids
+
+    def create_photos(self, destination_ids, per_destination, user_ids):
+        photos = (
+            Photo(
+                destination_id=destination_id,
+                image=f'destinations/seed_{destination_id}_{n}.jpg',
+                caption=self.sentence(4),
+                uploaded_by_id=self.rng.choice(user_ids),
+            )
+            for destination_id in destination_ids
+            for n in range(self.rng.randint(0, per_destination * 2))
+        )
+        return self.bulk_insert(Photo, photos)
+
+    def create_accommodations(self, destination_ids, per_destination, user_ids):
+        types = [value for value, _ in Accommodation.ACCOMMODATION_TYPES]
+        accommodations = (
+            self.located(Accommodation(
+                name=f'{self.rng.choice(HOTEL_WORDS)} {self.rng.choice(WORDS).title()} {destination_id}-{n}',
+                accommodation_type=self.rng.choice(types),
+                destination_id=destination_id,
+                address=f'{self.rng.randint(1, 300)} {self.rng.choice(WORDS).title()} Road, '
+                        f'{self.rng.choice(LOCATIONS)}',
+                description=self.sentence(30),
+                amenities='Wi-Fi, Parking, Breakfast',
+                price_per_night=self.rng.randrange(800, 25000, 100),
+                max_guests=self.rng.randint(1, 8),
+                phone='01700000000',
+                email='stay@example.com',
+                is_available=self.rng.random() > 0.1,
+                created_by_id=self.rng.choice(user_ids),
+            ), self.point(self.destination_points[destination_id]))
+            for destination_id in destination_ids
+            for n in range(self.rng.randint(0, per_destination * 2))
+        )
+        return self.bulk_insert(Accommodation, accommodations)
+
+    @staticmethod
+    def located(obj, point):
+        obj.latitude, obj.longitude = point
+        geo.set_geohash(obj)
+        return obj
+
+    def create_guides(self, count):
+        password = make_password('password')
+        start = User.objects.count()
+        guide_users = (
+            User(
+                username=f'seed_guide_{start + i}',
+                email=f'seed_guide_{start + i}@example.com',
+                first_name=self.rng.choice(FIRST_NAMES),
+                last_name=self.rng.choice(LAST_NAMES),
+                password=password,
+            )
+            for i in range(count)
+        )
+        guide_user_ids = self.bulk_insert(User, guide_users)
+        guides = (
+            LocalGuide(
+                user_id=user_id,
+                region=self.rng.choice(LOCATIONS),
+                description=self.sentence(25),
+                experience_years=self.rng.randint(1, 25),
+                languages='Bangla, English',
+                hourly_rate=self.rng.randrange(200, 3000, 50),
+                phone='01800000000',
+                is_verified=self.rng.random() > 0.05,
+            )
+            for user_id in guide_user_ids
+        )
+        return self.bulk_insert(LocalGuide, guides)
+
+    def create_reviews(self, model, field, item_ids, user_ids, per_item):
+        reviews = (
+            model(
+                **{f'{field}_id': item_id},
+                user_id=user_id,
+                content=self.sentence(20),
+                rating=self.rng.choices([1, 2, 3, 4, 5], weights=[1, 2, 4, 6, 5])[0],
+                is_approved=self.rng.random() > 0.05,
+            )
+            for item_id in item_ids
+            for user_id in self.rng.sample(user_ids, min(len(user_ids), self.rng.randint(0, per_item * 2)))
+        )
+        return self.bulk_insert(model, reviews)
+
+    def create_itineraries(self, count, items_per_itinerary, user_ids, destination_ids, accommodation_ids):
+        today = date.today()
+        itineraries = []
+        for i in range(count):
+            start = today + timedelta(days=self.rng.randint(-365, 365))
+            itineraries.append(Itinerary(
+                user_id=self.rng.choice(user_ids),
+                title=f'Trip to {self.rng.choice(PLACES)}',
+                start_date=start,
+                end_date=start + timedelta(days=self.rng.randint(1, 21)),
+                status=self.rng.choice([value for value, _ in Itinerary.TRIP_STATUS_CHOICES]),
+            ))
+        itinerary_ids = self.bulk_insert(Itinerary, itineraries)
+
+        def items():
+            for itinerary in itineraries:
+                days = (itinerary.end_date - itinerary.start_date).days
+                for order in range(self.rng.randint(0, items_per_itinerary * 2)):
+                    day = itinerary.start_date + timedelta(days=self.rng.randint(0, days))
+                    if accommodation_ids and self.rng.random() < 0.3:
+                        kind = {'item_type': 'accommodation', 'accommodation_id': self.rng.choice(accommodation_ids)}
+                    else:
+                        kind = {'item_type': 'destination', 'destination_id': self.rng.choice(destination_ids)}
+                    yield ItineraryItem(
+                        itinerary_id=itinerary.pk,
+                        title=self.sentence(3),
+                        start_date=day,
+                        end_date=day + timedelta(days=self.rng.randint(0, 2)),
+                        estimated_cost=self.rng.randrange(0, 20000, 100),
+                        order=order,
+                        **kind,
+                    )
+
+        self.bulk_insert(ItineraryItem, items())
+        return itinerary_ids
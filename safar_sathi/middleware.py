@@ -0,0 +1,335 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.base import Template
+
+from .budgets import get_query_budget
+from .nplusone import NPlusOneError, detect_n_plus_one, install
+from .routers import route_request
+
+logger = logging.getLogger('safar_sathi.performance')
+
+# Metrics for the request being handled on this thread/task, or None.
+_current = ContextVar('request_timing', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.view_name = None
+        self.query_budget = None
+        self.queries = []
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.view_start = None
+        self.view_time = 0.0
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+
+def _params_shape(params):
+    # Types only: parameter values may hold personal data.
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    return [
+        f'list[{len(value)}]' if isinstance(value, (list, tuple)) else type(value).__name__
+        for value in params
+    ]
+
+
+def _timed_render(original):
+    def render(self, context):
+        metrics = _current.get()
+        if metrics is None:
+            return original(self, context)
+        # Only the outermost render is timed; {% include %} and
+        # {% extends %} render nested templates inside it.
+        metrics.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            metrics.template_depth -= 1
+            if metrics.template_depth == 0:
+                metrics.template_time += time.perf_counter() - start
+
+    render.timed = True
+    return render
+
+
+def install_template_timing():
+    """Time template renders for RequestTimingMiddleware; safe to call more than once."""
+    if not getattr(Template.render, 'timed', False):
+        Template.render = _timed_render(Template.render)
+
+
+def _time_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        if metrics is not None:
+            metrics.db_time += duration
+            metrics.queries.append((sql, params, duration))
+
+
+def install_query_timing(connection, **kwargs):
+    """
+    Time every query of ``connection`` that runs for a timed request.
+
+    Connected to ``connection_created`` while RequestTimingMiddleware is on,
+    so async requests, whose queries run on threads the middleware never
+    sees, are timed too. Does nothing outside timed requests.
+    """
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+@contextmanager
+def timed_queries():
+    """
+    Count the queries of this thread's connections towards the current
+    request's metrics, if it is being timed. Threads that run queries for
+    a request (see concurrency.py) use this too.
+    """
+    if _current.get() is None:
+        yield
+        return
+    with ExitStack() as stack:
+        for connection in connections.all():
+            if _time_query not in connection.execute_wrappers:
+                stack.enter_context(connection.execute_wrapper(_time_query))
+        yield
+
+
+class HybridMiddleware:
+    """
+    Base for middleware that runs natively under both WSGI and ASGI, so an
+    async request doesn't pay a thread switch for each one. Subclasses
+    implement ``__call__`` for sync requests and ``__acall__`` for async
+    ones.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+
+class RequestTimingMiddleware(HybridMiddleware):
+    """
+    Measure query count, database, template and view time per request.
+
+    The totals are sent back in a ``Server-Timing`` header, and requests or
+    individual queries slower than ``SLOW_REQUEST_MS`` / ``SLOW_QUERY_MS``
+    are logged to ``safar_sathi.performance`` as JSON, as are requests that
+    run more queries than the view's ``query_budget``. With
+    ``REQUEST_TIMING_ENABLED = False`` the middleware removes itself at
+    startup, so it costs nothing. Template time is measured by a wrapper
+    around ``Template.render`` that the app installs once at startup (see
+    apps.py) and that does nothing outside timed requests.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_TIMING_ENABLED', False):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.slow_request = getattr(settings, 'SLOW_REQUEST_MS', 500) / 1000
+        self.slow_query = getattr(settings, 'SLOW_QUERY_MS', 100) / 1000
+        connection_created.connect(install_query_timing, dispatch_uid='request-timing')
+        if self.is_async:
+            # Django would otherwise run the sync hook in a thread.
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with timed_queries():
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, start)
+
+    async def __acall__(self, request):
+        # The view's queries run on other threads, on connections timed by
+        # install_query_timing(); the metrics reach them through the context.
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, start)
+
+    def _finish(self, request, response, metrics, start):
+        total = time.perf_counter() - start
+        if metrics.view_start is not None:
+            metrics.view_time = time.perf_counter() - metrics.view_start
+        request.metrics = metrics
+        response['Server-Timing'] = self._server_timing(metrics, total)
+        self._log(request, metrics, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self._start_view(request, view_func)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self._start_view(request, view_func)
+
+    def _start_view(self, request, view_func):
+        metrics = _current.get()
+        if metrics is not None:
+            match = request.resolver_match
+            metrics.view_name = match.view_name if match else view_func.__name__
+            metrics.query_budget = get_query_budget(view_func)
+            metrics.view_start = time.perf_counter()
+
+    @staticmethod
+    def _server_timing(metrics, total):
+        return ', '.join([
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.query_count} queries"',
+            f'tpl;dur={metrics.template_time * 1000:.1f}',
+            f'view;dur={metrics.view_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+    def _log(self, request, metrics, total):
+        for sql, params, duration in metrics.queries:
+            if duration >= self.slow_query:
+                logger.warning('slow_query %s', json.dumps({
+                    'view': metrics.view_name,
+                    'path': request.path,
+                    'duration_ms': round(duration * 1000, 2),
+                    'sql': sql,
+                    'params': _params_shape(params),
+                }))
+
+        if total >= self.slow_request:
+            logger.warning('slow_request %s', json.dumps({
+                'view': metrics.view_name,
+                'method': request.method,
+                'path': request.path,
+                'duration_ms': round(total * 1000, 2),
+                'view_ms': round(metrics.view_time * 1000, 2),
+                'db_ms': round(metrics.db_time * 1000, 2),
+                'template_ms': round(metrics.template_time * 1000, 2),
+                'queries': metrics.query_count,
+            }))
+
+        if metrics.query_budget is not None and metrics.query_count > metrics.query_budget:
+            logger.warning('query_budget_exceeded %s', json.dumps({
+                'view': metrics.view_name,
+                'path': request.path,
+                'queries': metrics.query_count,
+                'budget': metrics.query_budget,
+            }))
+
+
+class NPlusOneMiddleware(HybridMiddleware):
+    """
+    Report relations lazily loaded row by row while handling a request.
+
+    Each problem is logged to ``safar_sathi.performance`` with the model,
+    relation and template line; with ``NPLUSONE_RAISE = True`` the request
+    fails instead. Only active when ``NPLUSONE_DETECTION`` is on.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'NPLUSONE_DETECTION', False):
+            raise MiddlewareNotUsed
+        install()
+        super().__init__(get_response)
+        self.raise_errors = getattr(settings, 'NPLUSONE_RAISE', False)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with detect_n_plus_one() as collector:
+            response = self.get_response(request)
+        return self._report(request, response, collector)
+
+    async def __acall__(self, request):
+        # The collector reaches the view's threads through the context.
+        with detect_n_plus_one() as collector:
+            response = await self.get_response(request)
+        return self._report(request, response, collector)
+
+    def _report(self, request, response, collector):
+        problems = collector.problems
+        for problem in problems:
+            logger.warning('n_plus_one %s', json.dumps({'path': request.path, **problem}))
+        if problems and self.raise_errors:
+            raise NPlusOneError(collector.format())
+        return response
+
+
+class ReadYourWritesMiddleware(HybridMiddleware):
+    """
+    Read from one of ``DATABASE_REPLICAS`` while handling GET, HEAD and
+    OPTIONS requests, except for visitors that wrote something in the last
+    ``REPLICA_LAG_SECONDS`` (see routers.py). The marker is a signed cookie
+    expiring with the lag, so it costs no query. Without replicas the
+    middleware removes itself at startup.
+    """
+
+    cookie_name = 'read_primary'
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'DATABASE_REPLICAS', None):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.replicas = list(settings.DATABASE_REPLICAS)
+        self.lag = getattr(settings, 'REPLICA_LAG_SECONDS', 5)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with route_request(self._pick_replica(request)) as routing:
+            response = self.get_response(request)
+        return self._mark_writer(response, routing)
+
+    async def __acall__(self, request):
+        with route_request(self._pick_replica(request)) as routing:
+            response = await self.get_response(request)
+        return self._mark_writer(response, routing)
+
+    def _pick_replica(self, request):
+        if request.method in ('GET', 'HEAD', 'OPTIONS') and not self._wrote_recently(request):
+            return random.choice(self.replicas)
+        return None
+
+    def _mark_writer(self, response, routing):
+        if routing.wrote and self.lag > 0:
+            response.set_signed_cookie(
+                self.cookie_name, '1', salt=self.cookie_name, max_age=self.lag,
+                secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite='Lax',
+            )
+        return response
+
+    def _wrote_recently(self, request):
+        value = request.get_signed_cookie(self.cookie_name, None, salt=self.cookie_name, max_age=self.lag)
+        return value is not None
@@ -0,0 +1,164 @@
+"""
+Detect N+1 queries: one relation lazily loaded for many rows in a request.
+
+``install()`` wraps Django's related-object descriptors and managers so that
+every query run to read a relation (because nothing was cached by
+``select_related()`` or ``prefetch_related()``) is reported to the active
+collector. A relation loaded for ``NPLUSONE_THRESHOLD`` or more different
+rows is an N+1 problem; the report names the model, the relation and the
+template line (or Python line) that triggered the first load.
+"""
+import os
+import sys
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import django
+from django.conf import settings
+from django.db.models.fields import related_descriptors
+from django.db.models.sql.compiler import SQLCompiler
+from django.template.base import Node
+
+_collector = ContextVar('nplusone', default=None)
+
+DJANGO_DIR = os.path.dirname(django.__file__)
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+class NPlusOneCollector:
+    def __init__(self, threshold=None):
+        if threshold is None:
+            threshold = getattr(settings, 'NPLUSONE_THRESHOLD', 3)
+        self.threshold = threshold
+        # (model, relation) -> {row pk: location of the load}
+        self.loads = defaultdict(dict)
+
+    def record(self, instance, relation):
+        rows = self.loads[(type(instance).__name__, relation)]
+        if instance.pk not in rows:
+            rows[instance.pk] = _location()
+
+    @property
+    def problems(self):
+        return [
+            {
+                'model': model,
+                'field': relation,
+                'count': len(rows),
+                'location': next(iter(rows.values())),
+            }
+            for (model, relation), rows in self.loads.items()
+            if len(rows) >= self.threshold
+        ]
+
+    def format(self):
+        return '\n'.join(
+            f"{p['model']}.{p['field']} loaded lazily for {p['count']} rows at {p['location']}"
+            for p in self.problems
+        )
+
+
+@contextmanager
+def detect_n_plus_one(threshold=None):
+    collector = NPlusOneCollector(threshold)
+    token = _collector.set(collector)
+    try:
+        yield collector
+    finally:
+        _collector.reset(token)
+
+
+def _location():
+    # The innermost template node being rendered, else the first frame
+    # outside Django and this module.
+    code_frame = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        if frame.f_code is Node.render_annotated.__code__:
+            node = frame.f_locals.get('self')
+            origin = getattr(node, 'origin', None)
+            token = getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                return f'{origin.template_name}:{token.lineno}'
+        filename = frame.f_code.co_filename
+        if code_frame is None and not filename.startswith(DJANGO_DIR) and filename != __file__:
+            code_frame = f'{os.path.relpath(filename)}:{frame.f_lineno}'
+        frame = frame.f_back
+    return code_frame or 'unknown'
+
+
+def _tag(queryset, instance, relation):
+    # Mark the query rather than recording straight away: prefetch_related()
+    # builds the same querysets but fills their cache without running them.
+    # Query.clone() copies the attribute, so it survives .filter() and friends.
+    if _collector.get() is not None and instance is not None:
+        queryset.query.nplusone_load = (instance, relation)
+    return queryset
+
+
+def _recording_execute_sql(execute_sql):
+    def wrapper(self, *args, **kwargs):
+        load = getattr(self.query, 'nplusone_load', None)
+        collector = _collector.get()
+        if load is not None and collector is not None:
+            collector.record(*load)
+        return execute_sql(self, *args, **kwargs)
+
+    return wrapper
+
+
+def _single_object_get_queryset(get_queryset, relation_name):
+    # Descriptors pass ``instance`` only when loading a single missing
+    # object; prefetch_related() calls get_queryset() without it.
+    def wrapper(self, **hints):
+        queryset = get_queryset(self, **hints)
+        if 'instance' in hints:
+            _tag(queryset, hints['instance'], relation_name(self))
+        return queryset
+
+    return wrapper
+
+
+def _recording_manager_factory(factory, relation_name):
+    def create_manager(superclass, rel, *args, **kwargs):
+        manager_cls = factory(superclass, rel, *args, **kwargs)
+        name = relation_name(rel, *args, **kwargs)
+
+        class RecordingRelatedManager(manager_cls):
+            def get_queryset(self):
+                queryset = super().get_queryset()
+                if queryset._result_cache is None:  # not prefetched
+                    _tag(queryset, self.instance, name)
+                return queryset
+
+        return RecordingRelatedManager
+
+    return create_manager
+
+
+def install():
+    """Wrap the related descriptors; safe to call more than once."""
+    if getattr(related_descriptors, 'nplusone_installed', False):
+        return
+    forward = related_descriptors.ForwardManyToOneDescriptor
+    forward.get_queryset = _single_object_get_queryset(
+        forward.get_queryset, lambda descriptor: descriptor.field.name,
+    )
+    reverse = related_descriptors.ReverseOneToOneDescriptor
+    reverse.get_queryset = _single_object_get_queryset(
+        reverse.get_queryset, lambda descriptor: descriptor.related.get_accessor_name(),
+    )
+    related_descriptors.create_reverse_many_to_one_manager = _recording_manager_factory(
+        related_descriptors.create_reverse_many_to_one_manager,
+        lambda rel: rel.get_accessor_name(),
+    )
+    related_descriptors.create_forward_many_to_many_manager = _recording_manager_factory(
+        related_descriptors.create_forward_many_to_many_manager,
+        lambda rel, reverse: rel.get_accessor_name() if reverse else rel.field.name,
+    )
+    SQLCompiler.execute_sql = _recording_execute_sql(SQLCompiler.execute_sql)
+    related_descriptors.nplusone_installed = True
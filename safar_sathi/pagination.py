@@ -0,0 +1,173 @@
+import hashlib
+from functools import cached_property
+from types import SimpleNamespace
+
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from django.http import Http404
+
+CURSOR_SALT = 'safar_sathi.pagination.cursor'
+
+
+class KeysetPage:
+    def __init__(self, paginator, object_list, has_next, has_previous):
+        self.paginator = paginator
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @cached_property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1], 'next')
+
+    @cached_property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0], 'previous')
+
+
+class KeysetPaginator:
+    """
+    Paginate by seeking past the last row seen instead of using OFFSET.
+
+    ``ordering`` is a list of ``order_by()`` terms that must be unique per
+    row (end it with the primary key); ``.values()`` querysets must select
+    those fields. A page is fetched with a range condition on those
+    columns, so deep pages cost the same as the first one, and no COUNT(*)
+    is run unless ``count`` is read.
+    """
+
+    def __init__(self, queryset, per_page, ordering, count_timeout=300):
+        self.queryset = queryset.order_by(*ordering)
+        self.per_page = per_page
+        self.ordering = list(ordering)
+        self.fields = [term.lstrip('-') for term in self.ordering]
+        self.count_timeout = count_timeout
+
+    @cached_property
+    def count(self):
+        # Exact count, cached per query so repeat visits and later pages of
+        # the same listing don't re-run it.
+        key = 'keyset-count:' + hashlib.md5(str(self.queryset.query).encode()).hexdigest()
+        return cache.get_or_set(key, self.queryset.count, self.count_timeout)
+
+    def encode_cursor(self, obj, direction):
+        values = [self._value(obj, field) for field in self.fields]
+        # No timestamp, so a page links to the same cursors on every request
+        # and responses that include them can be revalidated.
+        return signing.Signer(salt=CURSOR_SALT).sign_object(
+            {'o': self.ordering, 'v': values, 'd': direction},
+            compress=True,
+        )
+
+    def decode_cursor(self, cursor):
+        try:
+            data = signing.Signer(salt=CURSOR_SALT).unsign_object(cursor)
+        except signing.BadSignature:
+            raise Http404('Invalid page cursor.')
+        if data.get('o') != self.ordering or data.get('d') not in ('next', 'previous'):
+            raise Http404('Invalid page cursor.')
+        values = [self._to_python(field, value) for field, value in zip(self.fields, data['v'])]
+        return values, data['d']
+
+    def page(self, cursor=None):
+        if not cursor:
+            rows = list(self.queryset[:self.per_page + 1])
+            return KeysetPage(self, rows[:self.per_page], len(rows) > self.per_page, False)
+
+        values, direction = self.decode_cursor(cursor)
+        if direction == 'next':
+            rows = list(self.queryset.filter(self._seek(values, reverse=False))[:self.per_page + 1])
+            return KeysetPage(self, rows[:self.per_page], len(rows) > self.per_page, True)
+
+        backwards = self.queryset.reverse().filter(self._seek(values, reverse=True))
+        rows = list(backwards[:self.per_page + 1])
+        object_list = rows[:self.per_page][::-1]
+        return KeysetPage(self, object_list, True, len(rows) > self.per_page)
+
+    def _seek(self, values, reverse):
+        # Rows strictly after ``values`` in the ordering, written as
+        # "k1 >= v1 AND (k1 > v1 OR (k2 >= v2 AND (...)))" so the leading
+        # column gives the database an index range to seek into.
+        condition = None
+        for term, value in reversed(list(zip(self.ordering, values))):
+            field = term.lstrip('-')
+            descending = term.startswith('-') != reverse
+            strict = Q(**{f"{field}__{'lt' if descending else 'gt'}": value})
+            inclusive = Q(**{f"{field}__{'lte' if descending else 'gte'}": value})
+            condition = strict if condition is None else inclusive & (strict | condition)
+        return condition
+
+    def _value(self, obj, field):
+        try:
+            model_field = self.queryset.model._meta.get_field(field)
+        except FieldDoesNotExist:
+            # Annotations such as a search rank are plain numbers.
+            return obj[field] if isinstance(obj, dict) else getattr(obj, field)
+        if isinstance(obj, dict):
+            # A .values() row; value_to_string() only reads the attribute.
+            obj = SimpleNamespace(**{model_field.attname: obj[field]})
+        return model_field.value_to_string(obj)
+
+    def _to_python(self, field, value):
+        try:
+            return self.queryset.model._meta.get_field(field).to_python(value)
+        except FieldDoesNotExist:
+            return value
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin that swaps page-number pagination for keyset cursors.
+
+    Views provide ``get_keyset_ordering()``; templates get the usual
+    ``page_obj``/``is_paginated`` plus ``next_querystring`` and
+    ``previous_querystring`` that keep the other GET parameters.
+    """
+
+    cursor_kwarg = 'cursor'
+    keyset_ordering = ('-created_at', '-id')
+
+    def get_keyset_ordering(self):
+        return self.keyset_ordering
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, self.get_keyset_ordering())
+        page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        page = context.get('page_obj')
+        if page is not None:
+            context['next_querystring'] = self._querystring(page.next_cursor)
+            context['previous_querystring'] = self._querystring(page.previous_cursor)
+        return context
+
+    def _querystring(self, cursor):
+        if cursor is None:
+            return None
+        params = self.request.GET.copy()
+        params[self.cursor_kwarg] = cursor
+        params.pop('page', None)
+        return params.urlencode()
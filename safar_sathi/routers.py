@@ -0,0 +1,82 @@
+"""
+Send reads to read replicas and writes to the primary (``default``).
+
+Only reads made while a request is handled go to a replica, one of
+``DATABASE_REPLICAS`` picked per request; management commands, background
+threads and anything inside a transaction read the primary. A request reads
+the primary too unless it is a GET, HEAD or OPTIONS, from its first write
+on, and for ``REPLICA_LAG_SECONDS`` after the same visitor last wrote, so
+users see their own changes while the replicas catch up. ReadYourWritesMiddleware
+sets this up per request.
+
+Sessions are always read from the primary, where a session created a
+moment ago already is, and so is anything read to fill a shared cache (see
+``read_primary()``): a stale copy cached there would outlive the lag.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Routing of the request being handled on this thread/task, or None.
+_current = ContextVar('database_routing', default=None)
+_primary_only = ContextVar('read_primary', default=False)
+
+
+class RequestRouting:
+    def __init__(self, replica):
+        # The replica this request reads from; None to read the primary.
+        self.replica = replica
+        self.wrote = False
+
+
+@contextmanager
+def route_request(replica):
+    """Route the reads of the request being handled to ``replica`` (or the primary, if None)."""
+    routing = RequestRouting(replica)
+    token = _current.set(routing)
+    try:
+        yield routing
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def read_primary():
+    """Read from the primary inside the block, e.g. to fill a shared cache."""
+    token = _primary_only.set(True)
+    try:
+        yield
+    finally:
+        _primary_only.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _current.get()
+        if (
+            routing is None
+            or routing.replica is None
+            or _primary_only.get()
+            or model._meta.app_label == 'sessions'
+            # The transaction's own writes are only visible on its connection.
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = _current.get()
+        if routing is not None:
+            # The rest of the request reads what it wrote from the primary.
+            routing.replica = None
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same rows as the primary.
+        databases = {DEFAULT_DB_ALIAS, *getattr(settings, 'DATABASE_REPLICAS', ())}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -0,0 +1,124 @@
+import re
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# Sentinels wrapped around matched terms by snippet(); they are swapped for
+# <mark> tags after escaping, see the ``highlight`` template filter.
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+registry = {}
+
+
+class SearchIndex:
+    """
+    SQLite FTS5 index over a model.
+
+    ``fields`` maps FTS column names to ORM lookup paths on ``model`` (e.g.
+    ``'destination': 'destination__name'``), so rows can be built with a
+    single INSERT ... SELECT without loading model instances. On databases
+    other than SQLite the index falls back to ``icontains`` filtering.
+    """
+
+    def __init__(self, name, model, fields, weights=None):
+        self.name = name
+        self.model = model
+        self.fields = dict(fields)
+        self.weights = weights or [1.0] * len(self.fields)
+        self.table = f'{model._meta.db_table}_fts'
+        registry[name] = self
+
+    @property
+    def enabled(self):
+        return connection.vendor == 'sqlite'
+
+    def create_sql(self):
+        columns = ', '.join(self.fields)
+        return (
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5('
+            f"{columns}, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+
+    def _source_sql(self, queryset):
+        return queryset.values_list('pk', *self.fields.values()).order_by().query.sql_with_params()
+
+    def _insert(self, cursor, queryset):
+        sql, params = self._source_sql(queryset)
+        columns = ', '.join(self.fields)
+        cursor.execute(f'INSERT INTO {self.table} (rowid, {columns}) {sql}', params)
+
+    def rebuild(self):
+        if not self.enabled:
+            return 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {self.table}')
+            cursor.execute(self.create_sql())
+            self._insert(cursor, self.model._default_manager.all())
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')")
+            cursor.execute(f'SELECT count(*) FROM {self.table}')
+            return cursor.fetchone()[0]
+
+    def refresh(self, pks):
+        """Re-index the rows whose primary keys are in ``pks`` (a list or queryset)."""
+        if not self.enabled:
+            return
+        source = self.model._default_manager.filter(pk__in=pks)
+        try:
+            sql, params = source.values_list('pk').order_by().query.sql_with_params()
+        except EmptyResultSet:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid IN ({sql})', params)
+            self._insert(cursor, source)
+
+    def remove(self, pks):
+        if not self.enabled:
+            return
+        pks = list(pks)
+        with connection.cursor() as cursor:
+            for start in range(0, len(pks), 500):
+                chunk = pks[start:start + 500]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(f'DELETE FROM {self.table} WHERE rowid IN ({placeholders})', chunk)
+
+    @staticmethod
+    def match_expression(query):
+        # Every term is quoted (so FTS operators in user input are inert) and
+        # prefix-matched, so "cox baz" finds "Cox's Bazar" while typing.
+        terms = TOKEN_RE.findall(query or '')
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def filter_queryset(self, queryset, query):
+        """
+        Restrict ``queryset`` to rows matching ``query``, best matches first.
+
+        Each row is annotated with ``search_rank`` (bm25, lower is better) and
+        ``search_snippet`` (matched terms wrapped in MATCH_START/MATCH_END).
+        """
+        if not self.enabled:
+            lookups = [Q(**{f'{path}__icontains': query}) for path in self.fields.values()]
+            return queryset.filter(reduce(or_, lookups))
+
+        expression = self.match_expression(query)
+        if not expression:
+            return queryset.none()
+
+        # The index is joined once, so MATCH runs a single time and bm25()
+        # and snippet() read the matched row. Only the join's index side is
+        # raw SQL: the model's table may be renamed when the queryset ends up
+        # in a subquery.
+        table = self.table
+        weights = ', '.join(str(weight) for weight in self.weights)
+        return queryset.extra(
+            tables=[table], where=[f'{table} MATCH %s'], params=[expression]
+        ).filter(pk=RawSQL(f'{table}.rowid', [])).annotate(
+            search_rank=RawSQL(f'bm25({table}, {weights})', []),
+            search_snippet=RawSQL(f"snippet({table}, -1, char(2), char(3), '…', 16)", []),
+        ).order_by('search_rank', '-pk')
@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'bookings',
     'reviews',
     'itinerary',
+    'api',
     'crispy_forms',
     'crispy_bootstrap5',
     'django.contrib.admin',
@@ -49,8 +50,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'safar_sathi.middleware.RequestTimingMiddleware',
+    'safar_sathi.middleware.NPlusOneMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'safar_sathi.middleware.ReadYourWritesMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -79,6 +83,16 @@ TEMPLATES = [
 WSGI_APPLICATION = 'safar_sathi.wsgi.application'
 
 AUTH_USER_MODEL = 'accounts.User'
+
+# Logged-in users are read from the cache rather than the database on each
+# request, for up to USER_CACHE_TIMEOUT seconds (see accounts/backends.py)
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.CachedModelBackend',
+    # Sessions logged in before the cached backend still name this one.
+    'django.contrib.auth.backends.ModelBackend',
+]
+USER_CACHE_TIMEOUT = 60
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
@@ -86,9 +100,25 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
 }
 
+# Aliases of read-only copies of the default database. Safe requests read
+# from one of them, except for visitors that wrote in the last
+# REPLICA_LAG_SECONDS, which read their own writes from the primary
+DATABASE_REPLICAS = []
+# Point REPLICA_DATABASE at a copy of db.sqlite3 to try the routing out
+if os.environ.get('REPLICA_DATABASE'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['REPLICA_DATABASE'],
+        # Tests read the test database through the replica alias.
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append('replica')
+REPLICA_LAG_SECONDS = 5
+DATABASE_ROUTERS = ['safar_sathi.routers.PrimaryReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -147,3 +177,61 @@ LOGOUT_REDIRECT_URL = '/'
 
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+
+# Caching. Local memory is per process; use Redis or Memcached when running
+# more than one worker so invalidations reach every process.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Sessions are read from the cache, falling back to the database on a miss;
+# changes are written to both
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+# Seconds a cached detail page lives; signals invalidate it sooner on change
+DETAIL_CACHE_TIMEOUT = 600
+
+# Seconds cached facet counts on list pages live; saves drop them sooner
+FACET_CACHE_TIMEOUT = 300
+
+# Seconds between background reloads of the in-process autocomplete indexes,
+# which pick up changes made by other worker processes; None to never reload
+AUTOCOMPLETE_REBUILD_SECONDS = 600
+
+# Threads that run a page's independent queries concurrently, each with its
+# own database connection (see safar_sathi/concurrency.py)
+QUERY_FANOUT_WORKERS = 8
+
+# Widths (px) of the resized WebP/JPEG copies made for each uploaded image
+IMAGE_DERIVATIVE_WIDTHS = (320, 640, 1280)
+
+# Request timing (Server-Timing header and slow request/query log)
+REQUEST_TIMING_ENABLED = DEBUG
+SLOW_REQUEST_MS = 500
+SLOW_QUERY_MS = 100
+
+# N+1 detection: warn when one relation is lazily loaded for this many rows
+NPLUSONE_DETECTION = DEBUG
+NPLUSONE_THRESHOLD = 3
+NPLUSONE_RAISE = False
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'safar_sathi.performance': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
@@ -0,0 +1,43 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from safar_sathi.images import FORMATS, available_widths, derivative_name
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', alt='', loading='lazy', **attrs):
+    """
+    Render ``image`` as a <picture> with WebP and JPEG srcsets.
+
+    ``sizes`` should describe how wide the image is displayed; any other
+    keyword (class, style, width, ...) is passed on to the <img>. Images
+    without derivatives yet fall back to a plain <img> of the original.
+    """
+    if not image:
+        return ''
+    img_attrs = format_html_join(' ', '{}="{}"', attrs.items())
+    widths = available_widths(image)
+    if not widths:
+        return format_html(
+            '<img src="{}" alt="{}" loading="{}" decoding="async" {}>',
+            image.url, alt, loading, img_attrs,
+        )
+
+    storage = image.storage
+
+    def srcset(ext):
+        return ', '.join(f'{storage.url(derivative_name(image.name, width, ext))} {width}w' for width in widths)
+
+    _, webp_type = FORMATS['webp']
+    # display: contents keeps the <img> laid out as if <picture> weren't there.
+    return format_html(
+        '<picture style="display: contents">'
+        '<source type="{}" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="{}" decoding="async" {}>'
+        '</picture>',
+        webp_type, srcset('webp'), sizes,
+        storage.url(derivative_name(image.name, widths[-1], 'jpg')), srcset('jpg'), sizes,
+        alt, loading, img_attrs,
+    )
@@ -0,0 +1,16 @@
+from django import template
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from safar_sathi.search import MATCH_START, MATCH_END
+
+register = template.Library()
+
+
+@register.filter
+def highlight(snippet):
+    """Render an FTS snippet with matched terms wrapped in <mark>."""
+    if not snippet:
+        return ''
+    html = escape(snippet).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+    return mark_safe(html)
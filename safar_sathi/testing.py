@@ -0,0 +1,185 @@
+import re
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+from .budgets import get_query_budget
+from .nplusone import detect_n_plus_one, install
+
+# A bare "SCAN <table>" step reads the whole table; "SCAN <table> USING
+# INDEX ..." walks an index in order and is fine.
+TABLE_SCAN_RE = re.compile(r'^SCAN (\w+)$')
+TEMP_SORT_RE = re.compile(r'USE TEMP B-TREE')
+
+
+def explain(sql):
+    """Return the detail column of SQLite's EXPLAIN QUERY PLAN for ``sql``."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class QueryPlanTestMixin:
+    """Assert that the queries behind a page are all served by indexes."""
+
+    def assertIndexedQueries(self, url, warm=False):
+        # ``warm`` requests the page once first, for pages whose cached
+        # aggregates (such as facet counts) read the whole table by design.
+        if warm:
+            self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        tables = set(connection.introspection.table_names())
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            for step in explain(sql):
+                scan = TABLE_SCAN_RE.match(step)
+                if (scan and scan.group(1) in tables) or TEMP_SORT_RE.search(step):
+                    self.fail(f'{url} regressed to "{step}" in:\n{sql}')
+        return response
+
+
+class QueryBudgetTestMixin:
+    """
+    Fail when a page runs more queries than its view's ``query_budget`` or
+    loads a relation row by row. Use with ``grow_catalog()`` so lists have
+    enough rows for an N+1 to show up.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        install()
+        super().setUpClass()
+
+    def assertWithinQueryBudget(self, url, data=None, method='get', status_code=200):
+        budget = get_query_budget(resolve(urlsplit(url).path).func)
+        self.assertIsNotNone(budget, f'The view behind {url} has no query_budget.')
+
+        with detect_n_plus_one() as lazy_loads, CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data)
+        self.assertEqual(response.status_code, status_code)
+
+        if lazy_loads.problems:
+            self.fail(f'{url} has N+1 queries:\n{lazy_loads.format()}')
+        if len(context) > budget:
+            queries = '\n'.join(query['sql'] for query in context.captured_queries)
+            self.fail(f'{url} ran {len(context)} queries, over its budget of {budget}:\n{queries}')
+        return response
+
+
+def create_catalog():
+    """Create one of everything so list and detail pages render real rows."""
+    from accounts.models import User, LocalGuide
+    from bookings.models import Accommodation
+    from destinations.models import Destination, Photo
+    from itinerary.models import Itinerary, ItineraryItem
+    from reviews.models import DestinationReview, AccommodationReview, GuideReview
+
+    user = User.objects.create_user(
+        username='traveller', email='traveller@example.com', password='password',
+        first_name='Test', last_name='Traveller',
+    )
+    guide_user = User.objects.create_user(
+        username='guide', email='guide@example.com', password='password',
+        first_name='Local', last_name='Guide',
+    )
+    destination = Destination.objects.create(
+        name="Cox's Bazar", description='The longest natural sea beach in the world.',
+        category='beach', location='Chattogram', best_time_to_visit='November to March',
+        created_by=user,
+    )
+    photo = Photo.objects.create(
+        destination=destination, image='destinations/beach.jpg', caption='Sunset', uploaded_by=user,
+    )
+    accommodation = Accommodation.objects.create(
+        name='Sea Pearl Resort', accommodation_type='resort', destination=destination,
+        address='Inani Beach', description='Beachfront resort.', amenities='Pool, Wi-Fi',
+        price_per_night=8500, phone='01700000000', email='stay@example.com', created_by=user,
+    )
+    guide = LocalGuide.objects.create(
+        user=guide_user, region='Chattogram', description='Coastal tours.', experience_years=5,
+        languages='Bangla, English', hourly_rate=500, phone='01800000000',
+    )
+    DestinationReview.objects.create(destination=destination, user=user, content='Lovely.', rating=5)
+    AccommodationReview.objects.create(accommodation=accommodation, user=user, content='Clean.', rating=4)
+    GuideReview.objects.create(guide=guide, user=user, content='Helpful.', rating=5)
+
+    start = date.today()
+    itinerary = Itinerary.objects.create(
+        user=user, title='Beach week', start_date=start, end_date=start + timedelta(days=6),
+    )
+    ItineraryItem.objects.create(
+        itinerary=itinerary, item_type='destination', destination=destination,
+        title='Beach day', start_date=start, end_date=start, estimated_cost=1000,
+    )
+    ItineraryItem.objects.create(
+        itinerary=itinerary, item_type='accommodation', accommodation=accommodation,
+        title='Check in', start_date=start, end_date=start + timedelta(days=2), estimated_cost=17000,
+    )
+
+    return {
+        'user': user,
+        'destination': destination,
+        'photo': photo,
+        'accommodation': accommodation,
+        'guide': guide,
+        'itinerary': itinerary,
+    }
+
+
+def grow_catalog(catalog, count=3):
+    """Add ``count`` more reviewers, destinations, guides and trip items to a catalog."""
+    from accounts.models import User, LocalGuide
+    from bookings.models import Accommodation
+    from destinations.models import Destination, Photo
+    from itinerary.models import Itinerary, ItineraryItem
+    from reviews.models import DestinationReview, AccommodationReview, GuideReview
+
+    owner = catalog['user']
+    start = catalog['itinerary'].start_date
+    for n in range(count):
+        user = User.objects.create_user(
+            username=f'reviewer{n}', email=f'reviewer{n}@example.com', password='password',
+            first_name='Reviewer', last_name=str(n),
+        )
+        DestinationReview.objects.create(destination=catalog['destination'], user=user, content='Nice.', rating=4)
+        AccommodationReview.objects.create(accommodation=catalog['accommodation'], user=user, content='Ok.', rating=3)
+        GuideReview.objects.create(guide=catalog['guide'], user=user, content='Great.', rating=5)
+
+        guide = LocalGuide.objects.create(
+            user=user, region='Sylhet', description='Tea garden walks.', experience_years=n + 1,
+            languages='Bangla', hourly_rate=400, phone='01900000000', is_verified=True,
+        )
+        GuideReview.objects.create(guide=guide, user=owner, content='Knows the area.', rating=4)
+
+        destination = Destination.objects.create(
+            name=f'Sreemangal {n}', description='Tea gardens.', category='natural',
+            location='Sylhet', best_time_to_visit='All year', created_by=owner,
+        )
+        Photo.objects.create(destination=destination, image=f'destinations/tea{n}.jpg', uploaded_by=owner)
+        accommodation = Accommodation.objects.create(
+            name=f'Tea Resort {n}', accommodation_type='resort', destination=destination,
+            address='Srimangal', description='Bungalows.', amenities='Wi-Fi',
+            price_per_night=4000, phone='01700000000', email='tea@example.com', created_by=owner,
+        )
+        ItineraryItem.objects.create(
+            itinerary=catalog['itinerary'], item_type='destination', destination=destination,
+            title=f'Visit {n}', start_date=start + timedelta(days=n + 1), end_date=start + timedelta(days=n + 1),
+            estimated_cost=500,
+        )
+        ItineraryItem.objects.create(
+            itinerary=catalog['itinerary'], item_type='accommodation', accommodation=accommodation,
+            title=f'Stay {n}', start_date=start + timedelta(days=n + 1), end_date=start + timedelta(days=n + 2),
+            estimated_cost=4000,
+        )
+        Itinerary.objects.create(
+            user=owner, title=f'Weekend {n}', start_date=start, end_date=start + timedelta(days=2),
+        )
+    return catalog
@@ -0,0 +1,703 @@
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.db import connection, transaction
+from django.template import engines
+from django.test.utils import CaptureQueriesContext
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+from PIL import Image
+
+from accounts.models import User
+from bookings.availability import book, cancel
+from bookings.models import Accommodation
+from bookings.search import accommodation_index
+from destinations.models import Destination, Photo
+from destinations.search import destination_index
+from reviews.models import AccommodationReview, DestinationReview
+from . import concurrency, geo, images
+from .autocomplete import PrefixTrie, tokenize
+from .budgets import get_query_budget
+from .middleware import (
+    NPlusOneMiddleware, ReadYourWritesMiddleware, RequestTimingMiddleware, install_query_timing,
+    install_template_timing,
+)
+from .concurrency import gather, run_concurrently
+from .nplusone import detect_n_plus_one, install
+from .routers import PrimaryReplicaRouter, read_primary, route_request
+from .testing import QueryBudgetTestMixin, create_catalog, grow_catalog
+
+
+def iter_views(patterns=None):
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.app_name != 'admin':
+                yield from iter_views(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern):
+            yield pattern.name, pattern.callback
+
+
+class NPlusOneDetectorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        install()
+        grow_catalog(create_catalog())
+
+    def test_lazy_foreign_key_in_template(self):
+        template = engines['django'].from_string(
+            '{% for review in reviews %}\n{{ review.user.username }}\n{% endfor %}'
+        )
+        with detect_n_plus_one() as collector:
+            template.render({'reviews': DestinationReview.objects.all()})
+        [problem] = collector.problems
+        self.assertEqual(problem['model'], 'DestinationReview')
+        self.assertEqual(problem['field'], 'user')
+        self.assertEqual(problem['count'], 4)
+        self.assertTrue(problem['location'].endswith(':2'), problem['location'])
+
+    def test_reverse_relation(self):
+        with detect_n_plus_one() as collector:
+            for destination in Destination.objects.all():
+                list(destination.photos.all())
+        self.assertEqual([(p['model'], p['field']) for p in collector.problems], [('Destination', 'photos')])
+
+    def test_select_and_prefetch_related(self):
+        with detect_n_plus_one() as collector:
+            for review in DestinationReview.objects.select_related('user'):
+                review.user.username
+            for destination in Destination.objects.prefetch_related('photos'):
+                list(destination.photos.all())
+        self.assertEqual(collector.problems, [])
+
+
+@override_settings(REQUEST_TIMING_ENABLED=True, SLOW_REQUEST_MS=60000, SLOW_QUERY_MS=60000)
+class RequestTimingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        install_template_timing()
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog()
+
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('home'))
+        match = re.fullmatch(
+            r'db;dur=(\d+\.\d);desc="(\d+) queries", tpl;dur=(\d+\.\d), '
+            r'view;dur=(\d+\.\d), total;dur=(\d+\.\d)',
+            response['Server-Timing'],
+        )
+        self.assertIsNotNone(match, response['Server-Timing'])
+        db, count, template, view, total = match.groups()
+        self.assertEqual(int(count), len(queries))
+        self.assertGreater(float(template), 0)
+        self.assertLessEqual(float(view), float(total))
+
+    def test_fast_requests_are_not_logged(self):
+        with self.assertNoLogs('safar_sathi.performance'):
+            self.client.get(reverse('home'))
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_request_logged(self):
+        with self.assertLogs('safar_sathi.performance', 'WARNING') as logs:
+            self.client.get(reverse('home'))
+        [line] = logs.output
+        self.assertIn('slow_request', line)
+        data = json.loads(line.split(' ', 1)[1])
+        self.assertEqual((data['view'], data['method'], data['path']), ('home', 'GET', '/'))
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_slow_queries_logged(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.assertLogs('safar_sathi.performance', 'WARNING') as logs:
+                self.client.get(reverse('home'))
+        self.assertEqual(len(logs.output), len(queries))
+        data = json.loads(logs.output[0].split(' ', 1)[1])
+        self.assertEqual(data['view'], 'home')
+        self.assertIn('SELECT', data['sql'])
+
+    def test_disabled(self):
+        with self.settings(REQUEST_TIMING_ENABLED=False):
+            self.assertNotIn('Server-Timing', self.client_class().get(reverse('home')))
+
+    def test_async_request(self):
+        # Connections opened after the middleware starts are timed from the
+        # start; this one was opened before it.
+        install_query_timing(connection)
+        self.addCleanup(connection.execute_wrappers.clear)
+        destination = Destination.objects.get()
+        with CaptureQueriesContext(connection) as queries:
+            response = async_to_sync(AsyncClient().get)(
+                reverse('destinations:destination_detail_async', args=[destination.pk])
+            )
+        self.assertEqual(response.status_code, 200)
+        count = re.search(r'desc="(\d+) queries"', response['Server-Timing']).group(1)
+        self.assertEqual(int(count), len(queries))
+        self.assertGreater(len(queries), 0)
+        self.assertEqual(response.asgi_request.metrics.view_name, 'destinations:destination_detail_async')
+
+
+@override_settings(REQUEST_TIMING_ENABLED=True, NPLUSONE_DETECTION=True, DATABASE_REPLICAS=['default'])
+class HybridMiddlewareTests(SimpleTestCase):
+    middleware = [RequestTimingMiddleware, NPlusOneMiddleware, ReadYourWritesMiddleware]
+
+    def test_runs_in_the_mode_of_the_chain(self):
+        async def async_view(request):
+            pass
+
+        def sync_view(request):
+            pass
+
+        for middleware in self.middleware:
+            with self.subTest(middleware=middleware.__name__):
+                self.assertTrue(iscoroutinefunction(middleware(async_view)))
+                self.assertFalse(iscoroutinefunction(middleware(sync_view)))
+        # Django would run a sync process_view in a thread.
+        self.assertTrue(iscoroutinefunction(RequestTimingMiddleware(async_view).process_view))
+
+
+class QueryBudgetDeclarationTests(SimpleTestCase):
+    def test_every_view_has_a_budget(self):
+        missing = [name for name, view in iter_views() if get_query_budget(view) is None]
+        self.assertEqual(missing, [], 'Views without a query_budget')
+
+
+class HomeQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    def test_home(self):
+        self.assertWithinQueryBudget(reverse('home'))
+
+
+def jpeg_upload(name='photo.jpg', size=(1000, 500)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'teal').save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class ImageDerivativeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, IMAGE_DERIVATIVE_WIDTHS=(320, 640, 1280))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        cache.clear()
+
+    def upload_photo(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Photo.objects.create(
+                destination=self.catalog['destination'], image=jpeg_upload(),
+                uploaded_by=self.catalog['user'],
+            )
+
+    def test_upload_creates_derivatives(self):
+        photo = self.upload_photo()
+        storage = photo.image.storage
+        # 1280 would upscale, so the original width is the largest.
+        self.assertEqual(images.available_widths(photo.image), [320, 640, 1000])
+        for width in (320, 640, 1000):
+            for ext in ('webp', 'jpg'):
+                name = images.derivative_name(photo.image.name, width, ext)
+                with storage.open(name) as f, Image.open(f) as derivative:
+                    self.assertEqual(derivative.size, (width, width // 2))
+
+    def test_resaving_does_not_regenerate(self):
+        photo = self.upload_photo()
+        with mock.patch.object(images, 'generate_derivatives') as generate:
+            with self.captureOnCommitCallbacks(execute=True):
+                photo.caption = 'Sunset'
+                photo.save()
+        generate.assert_not_called()
+
+    def test_tag_renders_srcset(self):
+        photo = self.upload_photo()
+        html = engines['django'].from_string(
+            '{% load image_tags %}{% responsive_image photo.image sizes="50vw" alt="View" class="card-img-top" %}'
+        ).render({'photo': photo})
+        root = photo.image.url.rsplit('.', 1)[0]
+        self.assertIn(f'<source type="image/webp" srcset="{root}-320w.webp 320w, {root}-640w.webp 640w, {root}-1000w.webp 1000w" sizes="50vw">', html)
+        self.assertIn(f'src="{root}-1000w.jpg"', html)
+        self.assertIn('loading="lazy"', html)
+        self.assertIn('class="card-img-top"', html)
+
+    def test_tag_falls_back_to_original(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            photo = Photo.objects.create(
+                destination=self.catalog['destination'], image=jpeg_upload(),
+                uploaded_by=self.catalog['user'],
+            )
+        html = engines['django'].from_string(
+            '{% load image_tags %}{% responsive_image photo.image %}'
+        ).render({'photo': photo})
+        self.assertIn(f'<img src="{photo.image.url}"', html)
+        self.assertNotIn('srcset', html)
+
+    def test_backfill_command(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            photo = Photo.objects.create(
+                destination=self.catalog['destination'], image=jpeg_upload(),
+                uploaded_by=self.catalog['user'],
+            )
+        call_command('generate_image_derivatives', workers=2, stdout=StringIO())
+        cache.clear()
+        self.assertEqual(images.available_widths(photo.image), [320, 640, 1000])
+
+
+class CatalogImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+
+    def write(self, suffix, text):
+        f = tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False, encoding='utf-8')
+        self.addCleanup(os.remove, f.name)
+        with f:
+            f.write(text)
+        return f.name
+
+    def run_import(self, *args, **options):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_catalog', *args, created_by='traveller', stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def facet_counts(self, url_name, name):
+        response = self.client.get(reverse(url_name))
+        [facet] = [facet for facet in response.context['facets'] if facet['name'] == name]
+        return {option['value']: option['count'] for option in facet['options']}
+
+    def test_csv_destinations(self):
+        path = self.write('.csv', (
+            'name,description,category,location,country,latitude,longitude,best_time_to_visit,entry_fee\n'
+            'Ratargul,Swamp forest.,natural,Sylhet,Bangladesh,25.0,91.9,Monsoon,50\n'
+            'Nowhere,,moon,Sylhet,Bangladesh,,,,\n'
+            'Nilgiri,Hill top.,mountain,Bandarban,Bangladesh,,,Winter,0\n'
+        ))
+        categories = self.facet_counts('destinations:destination_list', 'category')
+        stdout, stderr = self.run_import('destinations', path, batch_size=1, chunk_size=1)
+        self.assertIn('Imported 2 destinations', stdout)
+        # bulk_create() sent no signals; the cached counts were dropped anyway.
+        self.assertEqual(self.facet_counts('destinations:destination_list', 'category'), {
+            **categories,
+            'natural': categories.get('natural', 0) + 1,
+            'mountain': categories.get('mountain', 0) + 1,
+        })
+        self.assertIn('line 3: description: This field is required.', stderr)
+        self.assertIn('category: Select a valid choice.', stderr)
+
+        ratargul = Destination.objects.get(name='Ratargul')
+        self.assertEqual(ratargul.created_by, self.catalog['user'])
+        self.assertEqual(ratargul.entry_fee, 50)
+        self.assertEqual(ratargul.geohash, geo.encode(25.0, 91.9))
+        found = destination_index.filter_queryset(Destination.objects.all(), 'swamp')
+        self.assertEqual(list(found), [ratargul])
+
+    def test_jsonl_accommodations_resolve_destination_by_name(self):
+        Destination.objects.create(
+            name='Twin', description='One.', category='natural', location='A', country='B',
+            created_by=self.catalog['user'],
+        )
+        Destination.objects.create(
+            name='twin ', description='Two.', category='natural', location='A', country='B',
+            created_by=self.catalog['user'],
+        )
+        row = {
+            'name': 'Hilltop Cottage', 'accommodation_type': 'homestay', 'destination': "cox's bazar",
+            'address': 'Marine Drive', 'description': 'Quiet rooms.', 'amenities': 'Wi-Fi',
+            'phone': '01700000000', 'email': 'stay@example.com', 'price_per_night': '2500.00',
+            'max_guests': 3, 'check_in_time': '14:00', 'check_out_time': '11:00',
+        }
+        path = self.write('.jsonl', '\n'.join([
+            json.dumps(row),
+            json.dumps({**row, 'name': 'Lost Inn', 'destination': 'Atlantis'}),
+            json.dumps({**row, 'name': 'Twin Inn', 'destination': 'Twin'}),
+            '{broken',
+        ]))
+        types = self.facet_counts('bookings:accommodation_list', 'type')
+        stdout, stderr = self.run_import('accommodations', path)
+        self.assertIn('Imported 1 accommodations', stdout)
+        self.assertIn('line 2: destination: No destination named "Atlantis".', stderr)
+        self.assertIn('line 3: destination: More than one destination is named "Twin".', stderr)
+        self.assertIn('line 4: Invalid JSON', stderr)
+
+        self.assertEqual(self.facet_counts('bookings:accommodation_list', 'type'), {**types, 'homestay': types.get('homestay', 0) + 1})
+        cottage = Accommodation.objects.get(name='Hilltop Cottage')
+        self.assertEqual(cottage.destination, self.catalog['destination'])
+        found = accommodation_index.filter_queryset(Accommodation.objects.all(), 'cottage')
+        self.assertEqual(list(found), [cottage])
+
+    def test_unknown_creator(self):
+        path = self.write('.csv', 'name\n')
+        with self.assertRaisesMessage(CommandError, 'No creator found'):
+            call_command('import_catalog', 'destinations', path, created_by='nobody')
+
+
+class GeoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+
+    def test_encode(self):
+        self.assertEqual(geo.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(geo.encode(23.8103, 90.4125, 5), 'wh0r3')
+
+    def test_cells_cover_the_box(self):
+        box = geo.bounding_box(23.8103, 90.4125, 10)
+        cells = geo.covering_cells(box)
+        self.assertLessEqual(len(cells), geo.MAX_CELLS)
+        south, north, west, east = box
+        for i in range(11):
+            for j in range(11):
+                point = geo.encode(south + (north - south) * i / 10, west + (east - west) * j / 10)
+                self.assertTrue(any(point.startswith(cell) for cell in cells), point)
+
+    def test_nearby_matches_a_full_scan(self):
+        rng = random.Random(7)
+        for n in range(300):
+            Destination.objects.create(
+                name=f'Spot {n}', description='Somewhere.', category='natural', location='Dhaka',
+                best_time_to_visit='Winter', created_by=self.catalog['user'],
+                latitude=23.8 + rng.uniform(-0.3, 0.3), longitude=90.4 + rng.uniform(-0.3, 0.3),
+            )
+        for radius in (1, 5, 12):
+            found = geo.nearby(Destination.objects.all(), 23.8, 90.4, radius).order_by('distance', 'id')
+            expected = Destination.objects.exclude(latitude=None).annotate(
+                distance=geo.distance_expression(23.8, 90.4)
+            ).filter(distance__lte=radius).order_by('distance', 'id')
+            self.assertEqual(list(found), list(expected))
+        self.assertTrue(expected.exists())
+
+    def test_geohash_follows_coordinates(self):
+        destination = self.catalog['destination']
+        destination.latitude, destination.longitude = 21.4272, 92.0058
+        destination.save()
+        self.assertEqual(destination.geohash, geo.encode(21.4272, 92.0058))
+        destination.latitude = None
+        destination.save()
+        self.assertEqual(Destination.objects.get(pk=destination.pk).geohash, '')
+
+    def test_parse(self):
+        self.assertEqual(geo.parse_point('23.8, 90.4'), (23.8, 90.4))
+        self.assertIsNone(geo.parse_point('91,0'))
+        self.assertIsNone(geo.parse_point('nan,0'))
+        self.assertIsNone(geo.parse_point(None))
+        self.assertEqual(geo.parse_radius('2.5'), 2.5)
+        self.assertEqual(geo.parse_radius('5000'), geo.DEFAULT_RADIUS_KM)
+
+
+class FacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+        nepal = Destination.objects.create(
+            name='Pokhara', description='Lakeside town.', category='natural', location='Gandaki',
+            country='Nepal', best_time_to_visit='October', created_by=cls.catalog['user'],
+        )
+        defaults = {
+            'address': 'Main road', 'description': 'A place to stay.', 'amenities': 'Wi-Fi',
+            'phone': '01700000000', 'email': 'stay@example.com', 'created_by': cls.catalog['user'],
+        }
+        Accommodation.objects.create(
+            name='Hill Hostel', accommodation_type='hostel', destination=cls.catalog['destination'],
+            price_per_night=1500, max_guests=2, **defaults,
+        )
+        cls.lakeside = Accommodation.objects.create(
+            name='Lakeside Resort', accommodation_type='resort', destination=nepal,
+            price_per_night=4000, max_guests=6, rating=3.5, **defaults,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def facets(self, **params):
+        response = self.client.get(reverse('bookings:accommodation_list'), params)
+        return {
+            facet['name']: {option['value']: option['count'] for option in facet['options']}
+            for facet in response.context['facets']
+        }
+
+    def test_counts(self):
+        facets = self.facets()
+        self.assertEqual(facets['type'], {'resort': 2, 'hostel': 1})
+        self.assertEqual(facets['price'], {'0-2000': 1, '2000-5000': 1, '5000-10000': 1})
+        self.assertEqual(facets['rating'], {'4': 1, '3': 2, '2': 2})
+        self.assertEqual(facets['sleeps'], {'2': 3, '4': 1, '6': 1})
+        self.assertEqual(facets['country'], {'Bangladesh': 2, 'Nepal': 1})
+
+    def test_each_facet_is_counted_with_the_other_selections(self):
+        facets = self.facets(type='resort')
+        self.assertEqual(facets['type'], {'resort': 2, 'hostel': 1})
+        self.assertEqual(facets['price'], {'2000-5000': 1, '5000-10000': 1})
+        self.assertEqual(facets['country'], {'Bangladesh': 1, 'Nepal': 1})
+
+        response = self.client.get(reverse('bookings:accommodation_list'), {'type': 'resort', 'country': 'Nepal'})
+        self.assertEqual([a.name for a in response.context['accommodations']], ['Lakeside Resort'])
+
+    def test_unknown_option_is_ignored(self):
+        response = self.client.get(reverse('bookings:accommodation_list'), {'price': 'free'})
+        self.assertEqual(len(response.context['accommodations']), 3)
+
+    def test_counts_are_cached_until_a_row_changes(self):
+        def grouped_queries():
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(reverse('bookings:accommodation_list'), {'sleeps': '4'})
+            return sum('GROUP BY' in query['sql'] for query in context.captured_queries)
+
+        self.assertEqual(grouped_queries(), 5)
+        self.assertEqual(grouped_queries(), 0)
+        self.lakeside.max_guests = 3
+        self.lakeside.save()
+        self.assertEqual(grouped_queries(), 5)
+        self.assertEqual(self.facets()['sleeps'], {'2': 3})
+
+    def test_stay_counts_follow_bookings(self):
+        check_in = timezone.localdate() + timedelta(days=10)
+        stay = {'check_in': check_in, 'check_out': check_in + timedelta(days=2), 'guests': 1}
+        self.assertEqual(self.facets(**stay)['type'], {'resort': 2, 'hostel': 1})
+        booking = book(self.lakeside, self.catalog['user'], stay['check_in'], stay['check_out'], 6)
+        self.assertEqual(self.facets(**stay)['type'], {'resort': 1, 'hostel': 1})
+        cancel(booking)
+        self.assertEqual(self.facets(**stay)['type'], {'resort': 2, 'hostel': 1})
+
+    def test_rating_changes_refresh_counts(self):
+        self.assertEqual(self.facets()['rating'], {'4': 1, '3': 2, '2': 2})
+        AccommodationReview.objects.create(
+            accommodation=self.lakeside, user=self.catalog['user'], content='Calm.', rating=5,
+        )
+        self.assertEqual(self.facets()['rating'], {'4': 2, '3': 2, '2': 2})
+
+
+class PrefixTrieTests(SimpleTestCase):
+    def test_matches_brute_force_through_adds_and_removes(self):
+        rng = random.Random(7)
+        vocabulary = ['sea', 'seaside', 'sealand', 'se', 'hill', 'hilltop', 'tea', 'teak', 'river', 'fort']
+        trie, expected = PrefixTrie(size=5), {}
+        for step in range(3000):
+            key = rng.randrange(50)
+            if rng.random() < 0.3:
+                trie.remove(key)
+                expected.pop(key, None)
+            else:
+                words, weight = rng.sample(vocabulary, rng.randint(1, 3)), rng.randint(0, 50) / 7
+                trie.add(key, words, weight)
+                expected[key] = (weight, words)
+            if step % 100 == 0:
+                for prefix in ['s', 'se', 'sea', 'seas', 'h', 'te', 'river', 'x']:
+                    best = sorted(
+                        (-weight, key) for key, (weight, words) in expected.items()
+                        if any(word.startswith(prefix) for word in words)
+                    )[:5]
+                    self.assertEqual([(-weight, key) for weight, key in trie.search([prefix], 5)], best)
+
+    def test_multi_word_queries_filter_candidates(self):
+        trie = PrefixTrie()
+        trie.add(1, tokenize('Sea Pearl Resort'), 4)
+        trie.add(2, tokenize('Sea View Hotel'), 5)
+        self.assertEqual(trie.search(tokenize('sea pe'), 10), [(4, 1)])
+        self.assertEqual(trie.search(tokenize('se'), 10), [(5, 2), (4, 1)])
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Cox's Bazar — Sea-Beach Café"), ['coxs', 'bazar', 'sea', 'beach', 'café'])
+
+
+def strip_csrf(content):
+    return re.sub(rb'name="csrfmiddlewaretoken" value="[^"]*"', b'', content)
+
+
+class ConcurrencyTests(TransactionTestCase):
+    def setUp(self):
+        self.catalog = create_catalog()
+
+    @staticmethod
+    def count_on_thread(model):
+        return threading.current_thread().name, model.objects.count()
+
+    def test_calls_run_on_the_pool(self):
+        results = run_concurrently(
+            *(lambda model=model: self.count_on_thread(model) for model in (Destination, Accommodation, Photo))
+        )
+        self.assertEqual([count for _, count in results], [1, 1, 1])
+        self.assertEqual(results[0][0], threading.current_thread().name)
+        self.assertTrue(all(name.startswith('query-fanout') for name, _ in results[1:]))
+
+    def test_gather(self):
+        results = async_to_sync(gather)(
+            lambda: self.count_on_thread(Destination), lambda: self.count_on_thread(Accommodation)
+        )
+        self.assertEqual([count for _, count in results], [1, 1])
+        self.assertTrue(results[1][0].startswith('query-fanout'))
+
+    def test_async_detail_views_match_the_sync_ones(self):
+        self.client.force_login(self.catalog['user'])
+        for name, pk in [
+            ('destinations:destination_detail', self.catalog['destination'].pk),
+            ('bookings:accommodation_detail', self.catalog['accommodation'].pk),
+            ('accounts:guide_detail', self.catalog['guide'].pk),
+            ('itinerary:itinerary_detail', self.catalog['itinerary'].pk),
+        ]:
+            with self.subTest(name=name):
+                cache.clear()
+                sync = self.client.get(reverse(name, args=[pk]))
+                cache.clear()
+                concurrent = self.client.get(reverse(f'{name}_async', args=[pk]))
+                self.assertEqual(concurrent.status_code, 200)
+                self.assertEqual(strip_csrf(concurrent.content), strip_csrf(sync.content))
+
+    def test_pool_calls_close_old_connections(self):
+        with mock.patch.object(concurrency, 'close_old_connections') as close:
+            run_concurrently(lambda: self.count_on_thread(Destination), lambda: self.count_on_thread(Accommodation))
+        # Before and after the one call that ran on the pool.
+        self.assertEqual(close.call_count, 2)
+
+    def test_sequential_inside_a_transaction(self):
+        # Other connections wouldn't see the uncommitted row.
+        with transaction.atomic():
+            Destination.objects.create(
+                name='Pokhara', description='Lakeside town.', category='natural', location='Gandaki',
+                country='Nepal', best_time_to_visit='October', created_by=self.catalog['user'],
+            )
+            results = run_concurrently(
+                lambda: self.count_on_thread(Destination), lambda: self.count_on_thread(Destination)
+            )
+        current = threading.current_thread().name
+        self.assertEqual(results, [(current, 2), (current, 2)])
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    def test_router(self):
+        router = PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(Destination), 'default')
+        with route_request('replica') as routing:
+            self.assertEqual(router.db_for_read(Destination), 'replica')
+            self.assertEqual(router.db_for_read(Session), 'default')
+            with read_primary():
+                self.assertEqual(router.db_for_read(Destination), 'default')
+            self.assertEqual(router.db_for_write(Destination), 'default')
+            self.assertTrue(routing.wrote)
+            self.assertEqual(router.db_for_read(Destination), 'default')
+
+
+# The default database stands in for the replica: which one a request
+# reads is told apart by the routing the middleware picks, not by data.
+@override_settings(DATABASE_REPLICAS=['default'], REPLICA_LAG_SECONDS=60)
+class ReplicaRoutingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+
+    def setUp(self):
+        self.reviews_url = reverse(
+            'reviews:destination_review_list', args=[self.catalog['destination'].pk]
+        )
+        patcher = mock.patch('safar_sathi.middleware.route_request', wraps=route_request)
+        self.route_request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def replica_read(self, client=None):
+        """The replica ``client`` read from on a GET of the review list, or None for the primary."""
+        self.route_request.reset_mock()
+        (client or self.client).get(self.reviews_url)
+        [(replica,), _] = self.route_request.call_args
+        return replica
+
+    def test_router_reads_the_primary_in_transactions(self):
+        with route_request('replica'):
+            # TestCase runs each test in one.
+            self.assertTrue(connection.in_atomic_block)
+            self.assertEqual(PrimaryReplicaRouter().db_for_read(Destination), 'default')
+
+    def test_safe_requests_read_the_replica(self):
+        self.assertEqual(self.replica_read(), 'default')
+
+    def test_writers_read_their_writes(self):
+        self.client.force_login(User.objects.create_user('writer', password='x'))
+        self.client.post(
+            reverse('reviews:destination_review', args=[self.catalog['destination'].pk]),
+            {'content': 'Long beach.', 'rating': 5},
+        )
+        self.assertEqual(self.route_request.call_args.args, (None,))
+        self.assertIsNone(self.replica_read())
+        # Other visitors read the replica.
+        self.assertEqual(self.replica_read(self.client_class()), 'default')
+
+        # Once the lag has passed, the writer reads the replica again.
+        with mock.patch('time.time', return_value=time.time() + 61):
+            self.assertEqual(self.replica_read(), 'default')
+
+
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.catalog = create_catalog()
+        user = cls.catalog['user']
+        cls.swamp = Destination.objects.create(
+            name='Ratargul', description='Swamp forest near Sylhet.', category='natural',
+            location='Sylhet', country='Bangladesh', created_by=user,
+        )
+        cls.lake = Destination.objects.create(
+            name='Swamp Lake', description='Still water.', category='natural',
+            location='Gowainghat', country='Bangladesh', created_by=user,
+        )
+
+    def search(self, query, queryset=None):
+        return list(destination_index.filter_queryset(
+            Destination.objects.all() if queryset is None else queryset, query
+        ))
+
+    def test_matches_prefixes_of_every_term(self):
+        self.assertEqual(self.search('rata'), [self.swamp])
+        self.assertEqual(self.search('cox baz'), [self.catalog['destination']])
+        self.assertEqual(self.search('swamp nowhere'), [])
+
+    def test_name_matches_rank_first(self):
+        found = destination_index.filter_queryset(Destination.objects.all(), 'swamp')
+        self.assertEqual(list(found), [self.lake, self.swamp])
+        self.assertLess(found[0].search_rank, found[1].search_rank)
+        self.assertEqual(found[0].search_snippet, '\x02Swamp\x03 Lake')
+
+    def test_index_follows_saves_and_deletes(self):
+        self.swamp.name = 'Jaflong'
+        self.swamp.save()
+        self.assertEqual(self.search('jaflong'), [self.swamp])
+        self.assertEqual(self.search('ratargul'), [])
+        self.swamp.delete()
+        self.assertEqual(self.search('jaflong'), [])
+
+    def test_fts_syntax_is_inert(self):
+        for query in ['"swamp', 'swamp*', 'swamp OR cox', 'NEAR(swamp lake)', 'lake -swamp', '(swamp', '^swamp:']:
+            with self.subTest(query=query):
+                self.search(query)
+        self.assertEqual(self.search('swamp OR cox'), [])
+        self.assertEqual(self.search('"()*:^'), [])
+
+    def test_filters_and_subqueries(self):
+        queryset = Destination.objects.filter(location='Sylhet')
+        self.assertEqual(self.search('swamp', queryset), [self.swamp])
+        found = destination_index.filter_queryset(Destination.objects.all(), 'swamp')
+        self.assertEqual(
+            set(Destination.objects.filter(pk__in=found.values('pk')).values_list('pk', flat=True)),
+            {self.swamp.pk, self.lake.pk},
+        )
+        self.assertEqual(found.count(), 2)
@@ -12,6 +12,7 @@ urlpatterns = [
     path('itinerary/', include('itinerary.urls')),
     # Add this line to include the reviews URLs
     path('reviews/', include('reviews.urls')),
+    path('api/v1/', include('api.urls')),
 ]
 
 if settings.DEBUG:
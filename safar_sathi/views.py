@@ -1,4 +1,13 @@
 from django.shortcuts import render
+from reviews.rankings import ranked_lists
+from reviews.recommendations import picks_for
+from .budgets import query_budget
 
+@query_budget(4)
 def home(request):
-    return render(request, 'home.html')
\ No newline at end of file
+    lists = ranked_lists()
+    return render(request, 'home.html', {
+        'trending': lists['trending'],
+        'top_rated': lists['top_rated'],
+        'picks': picks_for(request.user) if request.user.is_authenticated else [],
+    })
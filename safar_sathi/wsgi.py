@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'safar_sathi.settings')
 
 application = get_wsgi_application()
+
+# Fill the in-process autocomplete indexes from each process's first request.
+from safar_sathi import autocomplete  # noqa: E402
+
+autocomplete.warm_on_first_request()